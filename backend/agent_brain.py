@@ -1,7 +1,465 @@
 import os
 import json
-import google.generativeai as genai
+import queue
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
+from decision_stream import DecisionStreamParser
+from distilled_policy import DecisionLog, DistilledPolicy, state_features
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from lazy_model import LazyGenerativeModel
+from memory_index import MemoryIndex
+from memory_journal import read_legacy_memories
+from memory_store import DEFAULT_PLAYER, MemoryStore, player_id
+from metrics import LLM_CALLS, LLM_TOKENS, MEMORY_SAVE_SECONDS
+from shared_store import SharedStore
+from trace_log import TraceRecorder, annotate, count_decision, observe_stage, trace_stage, traced
+from policy_engine import ACTIONS, ENEMY_STATES, PolicyEngine
+from world_state import WorldState
+
+
+def _health_status(value):
+    """Bucket a 0-100 stat the way the decision prompt describes it"""
+    return "critical" if value < 30 else "low" if value < 60 else "good"
+
+
+def _enemy_threat(distance):
+    """Bucket enemy distance the way the decision prompt describes it"""
+    return "immediate" if distance < 50 else "close" if distance < 100 else "distant"
+
+
+ACTIONS_GUIDE = """🎮 AVAILABLE ACTIONS & WHEN TO USE:
+- ATTACK: Strike enemy (best at 15-50 units, deals damage)
+- JUMP_ATTACK: Aerial assault (high damage, crosses gaps, 50-100 units ideal)
+- DODGE: Quick evasive dash (escape danger, reposition)
+- BLOCK: Defensive stance (reduces damage 65%, use when enemy attacking)
+- RETREAT: Fall back when low health or overwhelmed
+- MOVE_CLOSER: Advance toward enemy (when >100 units away)
+- MOVE_AWAY: Create space (when too close <15 units)
+- WAIT_AND_OBSERVE: Study patterns (use sparingly, when enemy idle)
+
+CRITICAL: Your commander's strategy is paramount. Interpret their instructions and adapt them to this exact situation. If they say "be aggressive", favor ATTACK/JUMP_ATTACK. If "defensive", use DODGE/BLOCK more. If "smart", analyze before acting."""
+
+
+# Prompt segments: the static prefix never changes, the battle segment
+# changes once per battle and only the situation changes every tick
+STATIC_PROMPT_PREFIX = f"""You are RooKnight, an AI combat agent following your commander's tactical orders.
+
+{ACTIONS_GUIDE}
+
+For every combat situation, respond ONLY with valid JSON:
+{{
+  "action": "EXACT_ACTION_NAME",
+  "reasoning": "1-2 sentences explaining how this follows commander's strategy for THIS situation",
+  "confidence": 0.0-1.0
+}}"""
+
+CONTEXT_ACK = "Understood. Send each combat situation and I will answer with the JSON decision only."
+
+# Plan mode: a few actions with preconditions the client checks locally,
+# so it only asks again when a precondition breaks or the plan expires
+PLAN_REQUEST = """Instead of a single decision, plan your next few seconds. Respond ONLY with valid JSON:
+{
+  "plan": [
+    {"action": "EXACT_ACTION_NAME", "reasoning": "1 sentence", "while": {"distance_gt": 40, "enemy_state_not": ["attacking"]}}
+  ],
+  "valid_for_ms": 500-5000,
+  "confidence": 0.0-1.0
+}
+List 1-4 steps in order. A step repeats every tick while all of its "while" conditions hold, then the next step whose conditions hold takes over; when none hold the plan ends.
+Condition keys: health_gt, health_lt, energy_gt, energy_lt, distance_gt, distance_lt, enemy_health_gt, enemy_health_lt, enemy_state_in, enemy_state_not (enemy states: idle, moving, attacking, observing, circling)."""
+
+PLAN_FIELDS = ("health", "energy", "distance", "enemy_health")
+PLAN_MAX_STEPS = 4
+PLAN_MIN_MS = 500
+PLAN_MAX_MS = 5000
+
+# Speculative prefetch: how the next tick most likely differs from this one
+PREFETCH_ENEMY_STRIDE = 80  # enemy advance over one decision interval
+PREFETCH_HIT_DAMAGE = 20    # one typical enemy hit
+PREFETCH_TIMEOUT = 10.0
+
+# Longest a streamed decision may take to finish after its action was sent (seconds)
+STREAM_TIMEOUT = 10.0
+
+# How often decisions check the journal for lessons written by other workers (seconds)
+MEMORY_SYNC_INTERVAL = 1.0
+
+
+def _estimate_tokens(text, chars_per_token=4.0):
+    """Rough token count for text we do not send to count_tokens"""
+    return max(1, int(round(len(text) / chars_per_token)))
+
+
+class BattleContext:
+    """
+    Per-battle chat context for Gemini
+    The static prefix and commander segment are built once and replayed as
+    a fixed chat history; every tick only appends the situation delta
+    """
+
+    def __init__(self, battle_segment):
+        self.battle_segment = battle_segment
+        self.ticks = 0
+        self.history = (
+            {"role": "user", "parts": [f"{STATIC_PROMPT_PREFIX}\n\n{battle_segment}"]},
+            {"role": "model", "parts": [CONTEXT_ACK]}
+        )
+
+    def contents(self, situation):
+        """Chat contents for one tick: the pinned history plus this situation"""
+        self.ticks += 1
+        return list(self.history) + [{"role": "user", "parts": [situation]}]
+
+
+class DecisionCache:
+    """
+    LRU cache of Gemini decisions keyed by quantized combat state
+    Entries expire after a TTL and count how often they were reused;
+    on_evict(key, entry) is called for entries dropped by expiry or LRU.
+    With a SharedStore, misses fall through to (and puts go to) the
+    store, so every worker process sees every other worker's decisions.
+    Async callers use get_async() so store I/O stays off the event loop
+    """
+
+    def __init__(self, max_size=512, ttl=20.0, on_evict=None, shared=None, namespace='decision'):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.shared = shared
+        self.namespace = namespace
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """True if a live entry exists (does not count as a hit or miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry['stored_at'] <= self.ttl
+
+    def get(self, key):
+        """Return a copy of the cached decision, or None on miss/expiry"""
+        decision = self._get_local(key)
+        if decision is not None or not self.shared:
+            return decision
+        return self._get_shared(key)
+
+    async def get_async(self, key):
+        """get() for the event loop thread: the shared-store lookup runs on the loop's executor"""
+        decision = self._get_local(key)
+        if decision is not None or not self.shared:
+            return decision
+        return await asyncio.get_running_loop().run_in_executor(None, self._get_shared, key)
+
+    def put(self, key, decision):
+        """
+        Store a decision, evicting the least recently used entries
+        On an event loop thread the shared-store write runs on the loop's executor
+        """
+        self._store(key, decision)
+        if not self.shared:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._put_shared(key, decision)
+        else:
+            loop.run_in_executor(None, self._put_shared, key, dict(decision))
+
+    def _get_local(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['stored_at'] <= self.ttl:
+                self._entries.move_to_end(key)
+                entry['hits'] += 1
+                self.hits += 1
+                return dict(entry['decision'])
+
+            if entry is not None:
+                del self._entries[key]
+                self._evicted(key, entry)
+            if not self.shared:
+                self.misses += 1
+        return None
+
+    def _get_shared(self, key):
+        decision = self.shared.get(self.namespace, json.dumps(key))
+        with self._lock:
+            if decision is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._store(key, decision)
+        return dict(decision)
+
+    def _put_shared(self, key, decision):
+        self.shared.put(self.namespace, json.dumps(key), decision, self.ttl)
+
+    def _store(self, key, decision):
+        with self._lock:
+            self._entries[key] = {
+                "decision": dict(decision),
+                "stored_at": time.monotonic(),
+                "hits": 0
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._evicted(*self._entries.popitem(last=False))
+
+    def purge(self):
+        """Drop expired entries"""
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry['stored_at'] < cutoff]:
+                self._evicted(key, self._entries.pop(key))
+
+    def clear(self):
+        """Drop every cached decision"""
+        with self._lock:
+            self._entries.clear()
+
+    def _evicted(self, key, entry):
+        if self.on_evict is not None:
+            self.on_evict(key, entry)
+
+    def stats(self):
+        """Cache size, hit/miss totals and the most reused entries"""
+        with self._lock:
+            top = sorted(self._entries.items(), key=lambda item: item[1]['hits'], reverse=True)[:5]
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "top_entries": [
+                    {"key": list(key[:6]), "action": entry['decision'].get('action'), "hits": entry['hits']}
+                    for key, entry in top
+                ]
+            }
+
+
+class GatewayOverloaded(Exception):
+    """A model call shed by the gateway instead of queued"""
+
+
+class ModelGateway:
+    """
+    Admission control in front of the Gemini model
+    Identical prompts already in flight share one call (singleflight), and
+    every real call takes a token from a bucket sized to the API quota.
+    Callers wait for a token in a bounded queue; when the queue is full or
+    the wait would exceed max_wait the call raises GatewayOverloaded right
+    away, so the caller can shed the work to the mock policy. Calls are
+    also refused the same way while the circuit breaker is open.
+    Speculative calls never wait and leave `headroom` tokens in the bucket
+    for real decisions
+    """
+
+    def __init__(self, model, rate=1.0, burst=5, max_queue=32, max_wait=2.0, breaker=None, headroom=0.0):
+        self.model = model
+        self.breaker = breaker
+        self.rate = rate
+        self.burst = burst
+        self.headroom = headroom
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.counts = {"calls": 0, "coalesced": 0, "queued": 0, "shed": 0, "open_circuit": 0}
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._inflight = {}        # prompt key -> task (event loop thread only)
+        self._inflight_sync = {}   # prompt key -> concurrent Future
+
+    async def generate_async(self, contents, wait=True, speculative=False):
+        """
+        generate_content_async through the gateway; wait=False sheds rather than queues
+        Speculative calls shed unless a token is free beyond the headroom
+        """
+        key = self._prompt_key(contents)
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count('coalesced')
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._call_async(contents, wait, speculative))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def generate(self, contents, wait=True):
+        """Blocking generate_content through the gateway"""
+        key = self._prompt_key(contents)
+        with self._lock:
+            future = self._inflight_sync.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight_sync[key] = Future()
+            else:
+                self.counts['coalesced'] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            probe = self._admit()
+            started, failed = None, True
+            try:
+                delay = self._reserve(wait)
+                if delay:
+                    try:
+                        time.sleep(delay)
+                    finally:
+                        self._done_waiting()
+                started = time.perf_counter()
+                future.set_result(self.model.generate_content(contents))
+                failed = False
+            finally:
+                self._settle(probe, started, failed)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight_sync.pop(key, None)
+        return future.result()
+
+    async def stream_async(self, contents, wait=True):
+        """
+        Streaming generate_content_async through the bucket (streams are never shared)
+        Yields the text of each chunk; the breaker hears how the call went
+        only once the stream has been read to the end or has failed
+        """
+        probe = self._admit_async()
+        started, failed = None, True
+        try:
+            await self._wait_turn(wait)
+            started = time.perf_counter()
+            response = await self.model.generate_content_async(contents, stream=True)
+            async for chunk in response:
+                yield chunk.text
+            failed = False
+        except GeneratorExit:
+            failed = False  # the caller stopped reading, not a model failure
+            raise
+        finally:
+            self._settle(probe, started, failed)
+
+    async def _call_async(self, contents, wait, speculative=False):
+        probe = self._admit_async()
+        started, failed = None, True
+        try:
+            await self._wait_turn(wait, speculative)
+            started = time.perf_counter()
+            response = await self.model.generate_content_async(contents)
+            failed = False
+            return response
+        finally:
+            self._settle(probe, started, failed)
+
+    def _admit_async(self):
+        if not getattr(self.model, 'loaded', True):
+            # Never import the SDK on the event loop thread; shed until it is warm
+            self.model.warm_up()
+            self._count('shed')
+            raise GatewayOverloaded("Model still loading")
+        return self._admit()
+
+    async def _wait_turn(self, wait, speculative=False):
+        """Take a token, sleeping in the queue for it if need be"""
+        delay = self._reserve(wait, speculative)
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._done_waiting()
+
+    def _admit(self):
+        """Ask the circuit breaker for a call; returns whether it is a half-open probe"""
+        if self.breaker is None:
+            return False
+        try:
+            return self.breaker.acquire()
+        except CircuitOpen as e:
+            self._count('open_circuit')
+            raise GatewayOverloaded(str(e))
+
+    def _settle(self, probe, started, failed):
+        """Report an admitted call's latency and outcome to the breaker"""
+        if self.breaker is None:
+            return
+        if started is None:
+            self.breaker.release(probe)
+        else:
+            self.breaker.record(time.perf_counter() - started, failed, probe)
+
+    def _reserve(self, wait, speculative=False):
+        """Take (or reserve) a token; returns seconds to wait for it or raises GatewayOverloaded"""
+        with self._lock:
+            self.counts['calls'] += 1
+            if self.rate <= 0:
+                return 0.0
+
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if speculative and self._tokens - 1.0 < self.headroom:
+                self.counts['shed'] += 1
+                raise GatewayOverloaded("Model gateway keeping its headroom for real decisions")
+
+            # Tokens go negative while calls are queued, so each waits behind the ones before it
+            delay = max(0.0, (1.0 - self._tokens) / self.rate)
+            if delay > 0:
+                if not wait or self._waiting >= self.max_queue or delay > self.max_wait:
+                    self.counts['shed'] += 1
+                    raise GatewayOverloaded(f"Model gateway over quota ({self._waiting} calls waiting)")
+                self._waiting += 1
+                self.counts['queued'] += 1
+            self._tokens -= 1.0
+            return delay
+
+    def _done_waiting(self):
+        with self._lock:
+            self._waiting -= 1
+
+    def _count(self, counter):
+        with self._lock:
+            self.counts[counter] += 1
+
+    def _prompt_key(self, contents):
+        text = contents if isinstance(contents, str) else json.dumps(contents, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def waiting(self):
+        """Calls currently queued for a token"""
+        return self._waiting
+
+    def stats(self):
+        """Call, coalesced, queued and shed totals plus the bucket settings"""
+        with self._lock:
+            return dict(
+                self.counts,
+                waiting=self._waiting,
+                tokens=round(max(self._tokens, 0.0), 2),
+                rate_per_sec=self.rate,
+                burst=self.burst,
+                headroom=self.headroom,
+                max_queue=self.max_queue,
+                max_wait=self.max_wait
+            )
+
 
 class AgentBrain:
     """
@@ -9,98 +467,1119 @@ class AgentBrain:
     Handles decision-making, learning, and memory
     """
 
-    def __init__(self):
+    def __init__(self, model=None, world_state=None):
         # Configure Gemini API
         # TODO: Set USE_REAL_AI = True to enable actual Gemini AI (requires valid API key)
         USE_REAL_AI = True  # <-- Set to True to use real Gemini AI
 
+        # A stand-in model (fake_gemini) for benchmarks: passed in or GEMINI_FAKE=1
+        if model is None and os.environ.get('GEMINI_FAKE', '').lower() in ('1', 'true', 'yes'):
+            from fake_gemini import FakeGenerativeModel
+            model = FakeGenerativeModel.from_env()
+
         api_key = os.environ.get('GEMINI_API_KEY')
-        if not USE_REAL_AI or not api_key:
+        if model is not None:
+            self.model = model
+            self.mock_mode = False
+            print(f"🧪 Using stand-in model {type(model).__name__}")
+        elif not USE_REAL_AI or not api_key:
             if not USE_REAL_AI:
                 print("🤖 Using simulated AI - Prompt-based gameplay ready!")
             else:
                 print("⚠️  Warning: GEMINI_API_KEY not set. Using mock mode.")
             self.mock_mode = True
         else:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+            # The SDK is imported by warm_up() or on first use, not at start-up
+            self.model = LazyGenerativeModel(api_key, 'gemini-2.0-flash-exp')
             self.mock_mode = False
             print("🧠 Using real Gemini AI")
 
-        # Initialize memory system
-        self.memory = []
-        self.load_memory()
+        # Table-driven mock/fallback brain (seed it for reproducible runs)
+        seed = os.environ.get('MOCK_POLICY_SEED')
+        self.mock_policy = PolicyEngine(seed=int(seed) if seed else None)
+
+        # Decisions shared by every worker process (SQLite; empty path disables)
+        shared_path = os.environ.get('SHARED_STORE_PATH', 'shared_state.db')
+        self.shared_store = SharedStore(shared_path) if shared_path else None
+
+        # Cache Gemini decisions for recently seen (quantized) situations
+        self.decision_cache = DecisionCache(
+            max_size=int(os.environ.get('DECISION_CACHE_SIZE', 512)),
+            ttl=float(os.environ.get('DECISION_CACHE_TTL', 20)),
+            shared=self.shared_store
+        )
+
+        # Per-battle prompt contexts and per-segment token accounting
+        self.battle_contexts = OrderedDict()
+        self.max_battle_contexts = int(os.environ.get('MAX_BATTLE_CONTEXTS', 256))
+        self._context_lock = threading.Lock()
+        # Token counts per segment: an LRU as large as the context cache (plus the
+        # static prefix), with at most one exact count_tokens call per interval
+        self._segment_tokens = OrderedDict()
+        self.token_count_interval = float(os.environ.get('TOKEN_COUNT_INTERVAL_S', 5))
+        self._token_counted_at = None
+        self._chars_per_token = 4.0
+        self.prompt_tokens = {"ticks": 0, "static": 0, "battle": 0, "delta": 0}
+
+        # Hard per-tick deadline for Gemini (0 waits for the model)
+        self.decision_deadline = float(os.environ.get('DECISION_DEADLINE_MS', 1500)) / 1000.0
+
+        # Circuit breaker on model latency and failure rate: while open, ticks go
+        # straight to the mock policy instead of waiting on a degraded API (0s window disables)
+        breaker_window = float(os.environ.get('BREAKER_WINDOW_S', 30))
+        self.breaker = None if self.mock_mode or breaker_window <= 0 else CircuitBreaker(
+            window=breaker_window,
+            min_calls=int(os.environ.get('BREAKER_MIN_CALLS', 10)),
+            error_rate=float(os.environ.get('BREAKER_ERROR_RATE', 0.5)),
+            latency_s=float(os.environ.get('BREAKER_LATENCY_MS', 1500)) / 1000.0,
+            latency_quantile=float(os.environ.get('BREAKER_LATENCY_QUANTILE', 0.9)),
+            open_seconds=float(os.environ.get('BREAKER_OPEN_S', 10)),
+            max_open_seconds=float(os.environ.get('BREAKER_MAX_OPEN_S', 120)),
+            probes=int(os.environ.get('BREAKER_PROBES', 3))
+        )
+
+        # Admission control for model calls: singleflight plus a token bucket sized to
+        # the API quota (per worker process); excess load is shed to the mock policy
+        self.gateway = None if self.mock_mode else ModelGateway(
+            self.model,
+            rate=float(os.environ.get('GEMINI_RPM', 1000)) / 60.0,
+            burst=int(os.environ.get('GEMINI_BURST', 20)),
+            max_queue=int(os.environ.get('GEMINI_MAX_QUEUE', 64)),
+            max_wait=float(os.environ.get('GEMINI_MAX_WAIT_MS', 1000)) / 1000.0,
+            breaker=self.breaker,
+            headroom=float(os.environ.get('GEMINI_PREFETCH_HEADROOM', 5))
+        )
+
+        # How long a mock/fallback plan stays valid on the client
+        self.plan_valid_ms = int(os.environ.get('PLAN_VALID_MS', 2400))
+        self.plan_cache = DecisionCache(
+            max_size=int(os.environ.get('DECISION_CACHE_SIZE', 512)),
+            ttl=float(os.environ.get('DECISION_CACHE_TTL', 20)),
+            shared=self.shared_store,
+            namespace='plan'
+        )
+
+        # Distilled lookup policy (distilled_policy.py) answers situations it is
+        # confident about without Gemini; model decisions are logged to retrain it
+        log_path = os.environ.get('DECISION_LOG_PATH', '')
+        self.decision_log = DecisionLog(
+            log_path,
+            max_bytes=int(float(os.environ.get('DECISION_LOG_MAX_MB', 64)) * 1024 * 1024),
+            max_files=int(os.environ.get('DECISION_LOG_MAX_FILES', 10))
+        ) if log_path and not self.mock_mode else None
+        self.distilled_min_confidence = float(os.environ.get('DISTILLED_MIN_CONFIDENCE', 0.85))
+        self.distilled_policy = self._load_distilled_policy(os.environ.get('DISTILLED_POLICY_PATH', 'distilled_policy.json'))
+        self.distilled_counts = {"answered": 0, "escalated": 0, "agreed": 0, "disagreed": 0}
+        self._distilled_lock = threading.Lock()
 
-    def decide(self, agent_state, enemy_state, environment, user_prompt, memory):
+        # Opt-in trace of every decide/plan/stream/reflect call for replay.py (empty disables)
+        trace_dir = os.environ.get('TRACE_DIR', '')
+        self.tracer = TraceRecorder(
+            trace_dir,
+            max_bytes=int(float(os.environ.get('TRACE_MAX_MB', 64)) * 1024 * 1024),
+            max_files=int(os.environ.get('TRACE_MAX_FILES', 20))
+        ) if trace_dir else None
+
+        # Maximum situations packed into one batch prompt
+        self.batch_size = int(os.environ.get('DECISION_BATCH_SIZE', 8))
+
+        # Speculative prefetch of likely next states on a bounded worker pool
+        # (0 workers disables it); each real request earns PREFETCH_BUDGET calls
+        self.prefetch_workers = int(os.environ.get('PREFETCH_WORKERS', 2))
+        self.prefetch_states = int(os.environ.get('PREFETCH_STATES', 3))
+        self.prefetch_budget = float(os.environ.get('PREFETCH_BUDGET', 2.0))
+        self.prefetch_cache = DecisionCache(
+            max_size=256,
+            ttl=float(os.environ.get('PREFETCH_TTL', 3)),
+            on_evict=self._prefetch_evicted
+        )
+        self.prefetch_counts = {"calls": 0, "hits": 0, "joined": 0, "wasted": 0, "skipped": 0, "shed": 0}
+        self._prefetch_tokens = 0.0
+        self._prefetch_pending = 0
+        self._prefetch_lock = threading.Lock()
+        self._prefetch_pool = None
+        self._prefetch_pid = None
+        self._speculative = set()
+
+        # Async Gemini calls run on a private event loop thread,
+        # started lazily so forked workers get their own
+        self._loop = None
+        self._loop_pid = None
+        self._loop_lock = threading.Lock()
+        self._inflight = {}
+
+        # Initialize memory system: per-player lessons in SQLite shared by every worker,
+        # plus an in-process recall index for each recently active player
+        # (prompts recall the top-k relevant lessons however many are kept)
+        self.world_state = world_state or WorldState()
+        self.memory_retention = int(os.environ.get('MEMORY_RETENTION', 100000))
+        self.memory_top_k = int(os.environ.get('MEMORY_TOP_K', 5))
+        self.memory_index_scan = int(os.environ.get('MEMORY_INDEX_SCAN', 256))
+        self.memory_store = MemoryStore(
+            path=os.environ.get('MEMORY_DB_PATH', 'memory.db'),
+            retention=self.memory_retention
+        )
+        self.max_memory_indexes = int(os.environ.get('MEMORY_INDEX_PLAYERS', 256))
+        self._memory_indexes = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._import_journal(os.environ.get('MEMORY_JOURNAL_PATH', 'memory.jsonl'))
+
+    def decide(self, agent_state, enemy_state, environment, user_prompt, memory, deadline=None, player=None):
         """
         Main decision-making function using user's tactical prompt
         Returns AI action and reasoning
         """
         if self.mock_mode:
+            count_decision(mode='action', source='mock')
             return self._mock_decision(agent_state, enemy_state, user_prompt)
 
-        # Build context prompt with user's instructions
-        prompt = self._build_decision_prompt(
-            agent_state, enemy_state, environment, user_prompt, memory
+        deadline = self.decision_deadline if deadline is None else deadline
+        future = asyncio.run_coroutine_threadsafe(
+            self.decide_async(agent_state, enemy_state, environment, user_prompt, memory, deadline, player),
+            self._event_loop()
         )
 
         try:
-            # Get Gemini's decision
-            response = self.model.generate_content(prompt)
+            return future.result(timeout=deadline + 1.0 if deadline else None)
+        except Exception as e:
+            print(f"Error in AI decision: {e}")
+            count_decision(mode='action', source='fallback')
+            return self._fallback_decision(agent_state, enemy_state)
+
+    @traced('decide')
+    async def decide_async(self, agent_state, enemy_state, environment, user_prompt, memory, deadline=None, player=None):
+        """
+        Race Gemini against the per-tick deadline
+        If the model is late, answer with the mock brain and let the real
+        decision finish in the background to warm the cache
+        """
+        if self.mock_mode:
+            count_decision(mode='action', source='mock')
+            return self._mock_decision(agent_state, enemy_state, user_prompt)
+
+        # Reuse the answer for a situation we have already asked about
+        cache_key = self._decision_cache_key(agent_state, enemy_state, environment, user_prompt)
+        cached, source = await self.decision_cache.get_async(cache_key), 'cache'
+        if cached is None:
+            cached, source = self._claim_prefetched(cache_key), 'prefetch'
+        if cached is not None:
+            count_decision(mode='action', source=source)
+            self._schedule_prefetch(cache_key, agent_state, enemy_state, environment, user_prompt, memory, player)
+            return cached
+
+        features = state_features(agent_state, enemy_state, user_prompt)
+        distilled = self._distilled_decision(features)
+        if distilled is not None:
+            count_decision(mode='action', source='distilled')
+            return distilled
+
+        # Join a call already in flight for this situation instead of asking again
+        task = self._inflight.get(cache_key)
+        if task is not None and cache_key in self._speculative:
+            # A prefetch is already asking; its answer now belongs to this request
+            self._speculative.discard(cache_key)
+            self._count_prefetch('joined')
+        asked = task is None
+        if asked:
+            # Building the prompt is part of the call, so the deadline covers it too
+            task = asyncio.ensure_future(self._ask_for_decision(
+                cache_key, agent_state, enemy_state, environment, user_prompt, memory, player, features
+            ))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+
+        self._schedule_prefetch(cache_key, agent_state, enemy_state, environment, user_prompt, memory, player, earn=asked)
+
+        deadline = self.decision_deadline if deadline is None else deadline
+        try:
+            if not deadline:
+                decision = dict(await task)
+            else:
+                decision = dict(await asyncio.wait_for(asyncio.shield(task), deadline))
+        except asyncio.TimeoutError:
+            print(f"⏱️  Gemini missed the {deadline * 1000:.0f}ms deadline, using mock decision")
+            count_decision(mode='action', source='deadline')
+            return self._mock_decision(agent_state, enemy_state, user_prompt)
+        except GatewayOverloaded:
+            count_decision(mode='action', source='shed')
+            return self._mock_decision(agent_state, enemy_state, user_prompt)
+
+        count_decision(mode='action', source='model')
+        return decision
+
+    async def _ask_for_decision(self, cache_key, agent_state, enemy_state, environment, user_prompt, memory, player,
+                                features):
+        """Build this tick's prompt, then ask Gemini"""
+        # Replay the battle's pinned context and send only this tick's situation
+        with trace_stage('build_prompt'):
+            recalled = await self._relevant_memory_async(memory, user_prompt, enemy_state, environment, player)
+            context = self._battle_context(user_prompt, recalled)
+            situation = self._build_situation_delta(agent_state, enemy_state, environment)
+        self._record_prompt_tokens(context, situation)
+        annotate(recalled=recalled)
+        return await self._gemini_decision(context.contents(situation), cache_key, agent_state, enemy_state, features)
+
+    async def _gemini_decision(self, contents, cache_key, agent_state, enemy_state, features=None):
+        """Ask Gemini for a decision, then cache and log well-formed answers"""
+        kind = 'prefetch' if cache_key in self._speculative else 'decide'
+        annotate(prompt=contents)
+        try:
+            # Get Gemini's decision; speculative calls never queue for quota
+            with trace_stage('generate'):
+                response = await self.gateway.generate_async(contents, speculative=kind == 'prefetch')
             decision_text = response.text
+            annotate(raw=decision_text)
+            LLM_TOKENS.inc(_estimate_tokens(decision_text, self._chars_per_token), segment='response')
 
-            # Parse the response
-            decision = self._parse_decision(decision_text)
+            # Parse the response; only well-formed answers are worth caching
+            with trace_stage('parse'):
+                decision = self._extract_decision(decision_text)
+            if decision is None:
+                self._parse_failed(kind)
+                return self._default_decision()
+            LLM_CALLS.inc(kind=kind, outcome='ok')
+            self._log_decision(features, decision)
 
+            # Unclaimed speculative answers go to the short-lived prefetch cache
+            cache = self.prefetch_cache if cache_key in self._speculative else self.decision_cache
+            cache.put(cache_key, decision)
             return decision
 
+        except GatewayOverloaded:
+            LLM_CALLS.inc(kind=kind, outcome='shed')
+            raise
         except Exception as e:
             print(f"Error in AI decision: {e}")
+            LLM_CALLS.inc(kind=kind, outcome='error')
             return self._fallback_decision(agent_state, enemy_state)
 
+    def decide_stream(self, agent_state, enemy_state, environment, user_prompt, memory, deadline=None, player=None):
+        """
+        Streamed decision: yields {"event": "action"} as soon as the action is
+        known, then {"event": "decision"} with the reasoning once it is written
+        """
+        events = queue.Queue()
+        asyncio.run_coroutine_threadsafe(
+            self._stream_decision(events.put, agent_state, enemy_state, environment, user_prompt, memory, player),
+            self._event_loop()
+        )
+
+        deadline = self.decision_deadline if deadline is None else deadline
+        try:
+            yield events.get(timeout=deadline or STREAM_TIMEOUT)
+        except queue.Empty:
+            # The stream keeps going in the background and caches its answer
+            print(f"⏱️  Gemini missed the {deadline * 1000:.0f}ms deadline, using mock decision")
+            count_decision(mode='stream', source='deadline')
+            decision = self._mock_decision(agent_state, enemy_state, user_prompt)
+            yield {"event": "action", "action": decision['action']}
+            yield dict(decision, event="decision")
+            return
+
+        try:
+            yield events.get(timeout=STREAM_TIMEOUT)
+        except queue.Empty:
+            yield dict(self._default_decision(), event="decision")
+
+    @traced('stream')
+    async def _stream_decision(self, emit, agent_state, enemy_state, environment, user_prompt, memory, player=None):
+        """Stream one Gemini decision, emitting the action as soon as its value is complete"""
+        if self.mock_mode:
+            count_decision(mode='stream', source='mock')
+            return self._emit_decision(emit, self._mock_decision(agent_state, enemy_state, user_prompt))
+
+        cache_key = self._decision_cache_key(agent_state, enemy_state, environment, user_prompt)
+        cached, source = await self.decision_cache.get_async(cache_key), 'cache'
+        if cached is None:
+            cached, source = self._claim_prefetched(cache_key), 'prefetch'
+        if cached is not None:
+            count_decision(mode='stream', source=source)
+            return self._emit_decision(emit, cached)
+
+        features = state_features(agent_state, enemy_state, user_prompt)
+        distilled = self._distilled_decision(features)
+        if distilled is not None:
+            count_decision(mode='stream', source='distilled')
+            return self._emit_decision(emit, distilled)
+
+        with trace_stage('build_prompt'):
+            recalled = await self._relevant_memory_async(memory, user_prompt, enemy_state, environment, player)
+            context = self._battle_context(user_prompt, recalled)
+            situation = self._build_situation_delta(agent_state, enemy_state, environment)
+        self._record_prompt_tokens(context, situation)
+        contents = context.contents(situation)
+        annotate(recalled=recalled, prompt=contents)
+
+        parser = DecisionStreamParser()
+        action = None
+        started = time.perf_counter()
+        stream = self.gateway.stream_async(contents)
+        try:
+            async for text in stream:
+                for field, value in parser.feed(text):
+                    if field == 'action' and action is None and value in ACTIONS:
+                        action = value
+                        observe_stage(time.perf_counter() - started, stage='first_action')
+                        emit({"event": "action", "action": action})
+        except GatewayOverloaded:
+            LLM_CALLS.inc(kind='stream', outcome='shed')
+            count_decision(mode='stream', source='shed')
+            return self._emit_decision(emit, self._mock_decision(agent_state, enemy_state, user_prompt), action)
+        except Exception as e:
+            print(f"Error in streamed AI decision: {e}")
+            LLM_CALLS.inc(kind='stream', outcome='error')
+            count_decision(mode='stream', source='fallback')
+            return self._emit_decision(emit, self._fallback_decision(agent_state, enemy_state), action)
+        finally:
+            await stream.aclose()  # settles the breaker if we stopped reading early
+        observe_stage(time.perf_counter() - started, stage='generate')
+        LLM_TOKENS.inc(_estimate_tokens(parser.text(), self._chars_per_token), segment='response')
+        annotate(raw=parser.text())
+
+        with trace_stage('parse'):
+            decision = self._extract_decision(parser.text())
+        if decision is None:
+            self._parse_failed('stream')
+            count_decision(mode='stream', source='fallback')
+            return self._emit_decision(emit, self._default_decision(), action)
+
+        LLM_CALLS.inc(kind='stream', outcome='ok')
+        count_decision(mode='stream', source='model')
+        self._log_decision(features, decision)
+        self.decision_cache.put(cache_key, decision)
+        self._emit_decision(emit, decision, action)
+
+    def _emit_decision(self, emit, decision, action=None):
+        """Finish a stream: the action event (unless already sent), then the full decision"""
+        annotate(decision=decision)
+        if action is None:
+            emit({"event": "action", "action": decision.get('action')})
+        else:
+            # The client is already acting on the streamed action
+            decision = dict(decision, action=action)
+        emit(dict(decision, event="decision"))
+
+    def _load_distilled_policy(self, path):
+        """The trained lookup table at path, or None to always ask Gemini"""
+        if self.mock_mode or not path or not os.path.exists(path):
+            return None
+        try:
+            policy = DistilledPolicy.load(path)
+            print(f"🧪 Loaded distilled policy with {len(policy)} entries from {path}")
+            return policy
+        except Exception as e:
+            print(f"Error loading distilled policy: {e}")
+            return None
+
+    def _distilled_decision(self, features, count=True):
+        """The distilled policy's answer if it clears the confidence threshold, else None"""
+        if self.distilled_policy is None:
+            return None
+        decision = self.distilled_policy.decide(features, self.distilled_min_confidence)
+        if count:
+            with self._distilled_lock:
+                self.distilled_counts['answered' if decision else 'escalated'] += 1
+        return decision
+
+    def _log_decision(self, features, decision):
+        """Log a model decision for training; score the distilled policy against it"""
+        if features is None:
+            return
+        if self.distilled_policy is not None:
+            entry = self.distilled_policy.lookup(features)
+            if entry is not None:
+                with self._distilled_lock:
+                    self.distilled_counts['agreed' if entry['action'] == decision.get('action') else 'disagreed'] += 1
+        if self.decision_log is not None:
+            try:
+                self.decision_log.append(features, decision)
+            except Exception as e:
+                print(f"Error logging decision: {e}")
+
+    def warm_up(self):
+        """Start loading the Gemini SDK in the background (GEMINI_WARMUP=lazy waits for first use)"""
+        if self.mock_mode or os.environ.get('GEMINI_WARMUP', 'background') != 'background':
+            return
+        if hasattr(self.model, 'warm_up'):
+            self.model.warm_up()
+
+    def readiness(self):
+        """Whether this worker can serve real decisions yet, check by check"""
+        checks = {"model": self.mock_mode or getattr(self.model, 'loaded', True)}
+        try:
+            self.memory_store.count(DEFAULT_PLAYER)
+            checks["memory"] = True
+        except Exception as e:
+            print(f"Memory store not ready: {e}")
+            checks["memory"] = False
+        return checks
+
+    def distilled_stats(self):
+        """Distilled policy counters: model calls saved, escalations, agreement with Gemini"""
+        with self._distilled_lock:
+            counts = dict(self.distilled_counts)
+        scored = counts['agreed'] + counts['disagreed']
+        asked = counts['answered'] + counts['escalated']
+        return dict(
+            counts,
+            loaded=self.distilled_policy is not None,
+            entries=len(self.distilled_policy) if self.distilled_policy is not None else 0,
+            min_confidence=self.distilled_min_confidence,
+            calls_saved=counts['answered'],
+            answer_rate=round(counts['answered'] / asked, 3) if asked else None,
+            agreement=round(counts['agreed'] / scored, 3) if scored else None,
+            logged=self.decision_log.records if self.decision_log is not None else 0,
+            log=self.decision_log.stats() if self.decision_log is not None else None
+        )
+
+    def _predict_next_states(self, agent_state, enemy_state):
+        """Likeliest next-tick states: the enemy closes in, it attacks, or we take a hit"""
+        distance = enemy_state.get('distance', 100)
+        health = agent_state.get('health', 100)
+        return [
+            (agent_state, dict(enemy_state, distance=max(distance - PREFETCH_ENEMY_STRIDE, 0), state='moving')),
+            (agent_state, dict(enemy_state, state='attacking')),
+            (dict(agent_state, health=max(health - PREFETCH_HIT_DAMAGE, 0)), dict(enemy_state, state='attacking'))
+        ]
+
+    def _schedule_prefetch(self, cache_key, agent_state, enemy_state, environment, user_prompt, memory, player=None,
+                           earn=False):
+        """
+        Speculatively decide the likeliest next states, within the prefetch budget
+        Only ticks that made a real model call (earn) add to the budget, so
+        speculation stays within PREFETCH_BUDGET calls per real one
+        """
+        if not self.prefetch_workers:
+            return
+
+        with self._prefetch_lock:
+            if self._prefetch_pid not in (None, os.getpid()):
+                # Forked: the parent's in-flight prefetches do not exist here
+                self._prefetch_pending = 0
+            if earn:
+                self._prefetch_tokens = min(self._prefetch_tokens + self.prefetch_budget, self.prefetch_budget * 4)
+
+        seen = {cache_key}
+        for next_agent, next_enemy in self._predict_next_states(agent_state, enemy_state)[:self.prefetch_states]:
+            key = self._decision_cache_key(next_agent, next_enemy, environment, user_prompt)
+            if key in seen or key in self._inflight or key in self.decision_cache or key in self.prefetch_cache:
+                continue
+            if self._distilled_decision(state_features(next_agent, next_enemy, user_prompt), count=False):
+                continue  # answered locally when it happens
+            seen.add(key)
+
+            with self._prefetch_lock:
+                # Never queue behind a busy pool or past the budget; just skip
+                if self._prefetch_pending >= self.prefetch_workers or self._prefetch_tokens < 1:
+                    self.prefetch_counts['skipped'] += 1
+                    continue
+                self._prefetch_pending += 1
+                self._prefetch_tokens -= 1
+
+            self._prefetch_executor().submit(
+                self._prefetch, key, next_agent, next_enemy, environment, user_prompt, memory, player
+            )
+
+    def _prefetch(self, cache_key, agent_state, enemy_state, environment, user_prompt, memory, player=None):
+        """Prefetch worker: run one speculative Gemini call to completion"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._speculate(cache_key, agent_state, enemy_state, environment, user_prompt, memory, player),
+            self._event_loop()
+        )
+        try:
+            future.result(timeout=PREFETCH_TIMEOUT)
+        except GatewayOverloaded:
+            self._count_prefetch('shed')
+        except Exception as e:
+            future.cancel()
+            print(f"Prefetch failed: {e}")
+        finally:
+            with self._prefetch_lock:
+                self._prefetch_pending -= 1
+
+    async def _speculate(self, cache_key, agent_state, enemy_state, environment, user_prompt, memory, player=None):
+        if cache_key in self._inflight:
+            return
+
+        recalled = await self._relevant_memory_async(memory, user_prompt, enemy_state, environment, player)
+        if cache_key in self._inflight:
+            return  # asked for while recalling
+        context = self._battle_context(user_prompt, recalled)
+        situation = self._build_situation_delta(agent_state, enemy_state, environment)
+        self._record_prompt_tokens(context, situation)
+
+        self._speculative.add(cache_key)
+        task = asyncio.ensure_future(self._gemini_decision(
+            context.contents(situation), cache_key, agent_state, enemy_state,
+            state_features(agent_state, enemy_state, user_prompt)
+        ))
+        self._inflight[cache_key] = task
+
+        def done(_):
+            self._inflight.pop(cache_key, None)
+            self._speculative.discard(cache_key)
+
+        task.add_done_callback(done)
+        self._count_prefetch('calls')
+        await asyncio.shield(task)
+
+    def _claim_prefetched(self, cache_key):
+        """Move a prefetched decision into the decision cache and return it"""
+        decision = self.prefetch_cache.get(cache_key)
+        if decision is None:
+            return None
+        self._count_prefetch('hits')
+        self.decision_cache.put(cache_key, decision)
+        return decision
+
+    def _count_prefetch(self, counter):
+        with self._prefetch_lock:
+            self.prefetch_counts[counter] += 1
+
+    def _prefetch_evicted(self, key, entry):
+        # A prefetched decision that expires unused was a wasted call
+        if not entry['hits']:
+            self._count_prefetch('wasted')
+
+    def _prefetch_executor(self):
+        """Return the prefetch worker pool, creating it on first use in this process"""
+        if self._prefetch_pool is None or self._prefetch_pid != os.getpid():
+            with self._loop_lock:
+                if self._prefetch_pool is None or self._prefetch_pid != os.getpid():
+                    self._prefetch_pool = ThreadPoolExecutor(
+                        max_workers=self.prefetch_workers,
+                        thread_name_prefix='prefetch'
+                    )
+                    self._prefetch_pid = os.getpid()
+        return self._prefetch_pool
+
+    def prefetch_stats(self):
+        """Prefetch counters, hit rate (answered ticks per call) and waste rate"""
+        self.prefetch_cache.purge()
+        with self._prefetch_lock:
+            counts = dict(self.prefetch_counts)
+            pending = self._prefetch_pending
+            tokens = self._prefetch_tokens
+
+        calls = counts['calls']
+        return dict(
+            counts,
+            pending=pending,
+            workers=self.prefetch_workers,
+            budget_tokens=round(tokens, 2),
+            cached=self.prefetch_cache.stats()['size'],
+            hit_rate=round((counts['hits'] + counts['joined']) / calls, 3) if calls else None,
+            waste_rate=round(counts['wasted'] / calls, 3) if calls else None
+        )
+
+    def plan(self, agent_state, enemy_state, environment, user_prompt, memory, deadline=None, player=None):
+        """
+        Plan mode: a short sequence of actions with preconditions and a validity window
+        The client keeps following the plan and only asks again when it breaks or expires
+        """
+        if self.mock_mode:
+            count_decision(mode='plan', source='mock')
+            return self._mock_plan(agent_state, enemy_state)
+
+        deadline = self.decision_deadline if deadline is None else deadline
+        future = asyncio.run_coroutine_threadsafe(
+            self.plan_async(agent_state, enemy_state, environment, user_prompt, memory, deadline, player),
+            self._event_loop()
+        )
+
+        try:
+            return future.result(timeout=deadline + 1.0 if deadline else None)
+        except Exception as e:
+            print(f"Error in AI plan: {e}")
+            count_decision(mode='plan', source='fallback')
+            return self._mock_plan(agent_state, enemy_state)
+
+    @traced('plan')
+    async def plan_async(self, agent_state, enemy_state, environment, user_prompt, memory, deadline=None, player=None):
+        """Race a Gemini plan against the deadline, falling back to the mock brain's plan"""
+        if self.mock_mode:
+            count_decision(mode='plan', source='mock')
+            return self._mock_plan(agent_state, enemy_state)
+
+        cache_key = ('plan',) + self._decision_cache_key(agent_state, enemy_state, environment, user_prompt)
+        cached = await self.plan_cache.get_async(cache_key)
+        if cached is not None:
+            count_decision(mode='plan', source='cache')
+            return cached
+
+        task = self._inflight.get(cache_key)
+        if task is None:
+            # Building the prompt is part of the call, so the deadline covers it too
+            task = asyncio.ensure_future(
+                self._ask_for_plan(cache_key, agent_state, enemy_state, environment, user_prompt, memory, player)
+            )
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+
+        deadline = self.decision_deadline if deadline is None else deadline
+        try:
+            if not deadline:
+                plan = dict(await task)
+            else:
+                plan = dict(await asyncio.wait_for(asyncio.shield(task), deadline))
+        except asyncio.TimeoutError:
+            print(f"⏱️  Gemini missed the {deadline * 1000:.0f}ms deadline, using mock plan")
+            count_decision(mode='plan', source='deadline')
+            return self._mock_plan(agent_state, enemy_state)
+        except GatewayOverloaded:
+            count_decision(mode='plan', source='shed')
+            return self._mock_plan(agent_state, enemy_state)
+
+        count_decision(mode='plan', source='model')
+        return plan
+
+    async def _ask_for_plan(self, cache_key, agent_state, enemy_state, environment, user_prompt, memory, player):
+        """Build the plan prompt, then ask Gemini"""
+        # Same pinned battle context as single decisions; the plan request rides on the delta
+        with trace_stage('build_prompt'):
+            recalled = await self._relevant_memory_async(memory, user_prompt, enemy_state, environment, player)
+            context = self._battle_context(user_prompt, recalled)
+            situation = self._build_situation_delta(agent_state, enemy_state, environment) + "\n\n" + PLAN_REQUEST
+        self._record_prompt_tokens(context, situation)
+        annotate(recalled=recalled)
+        return await self._gemini_plan(context.contents(situation), cache_key, agent_state, enemy_state)
+
+    async def _gemini_plan(self, contents, cache_key, agent_state, enemy_state):
+        """Ask Gemini for a plan and cache well-formed answers"""
+        annotate(prompt=contents)
+        try:
+            with trace_stage('generate'):
+                response = await self.gateway.generate_async(contents)
+            LLM_TOKENS.inc(_estimate_tokens(response.text, self._chars_per_token), segment='response')
+            annotate(raw=response.text)
+
+            with trace_stage('parse'):
+                raw = self._extract_decision(response.text)
+                plan = self._sanitize_plan(raw) if raw is not None else None
+            if plan is None:
+                self._parse_failed('plan')
+                return self._mock_plan(agent_state, enemy_state)
+            LLM_CALLS.inc(kind='plan', outcome='ok')
+
+            self.plan_cache.put(cache_key, plan)
+            return plan
+
+        except GatewayOverloaded:
+            LLM_CALLS.inc(kind='plan', outcome='shed')
+            raise
+        except Exception as e:
+            print(f"Error in AI plan: {e}")
+            LLM_CALLS.inc(kind='plan', outcome='error')
+            return self._mock_plan(agent_state, enemy_state)
+
+    def _sanitize_plan(self, raw):
+        """Keep known actions and precondition keys only; None if no usable step is left"""
+        steps = []
+        for step in (raw.get('plan') or [])[:PLAN_MAX_STEPS]:
+            if not isinstance(step, dict) or step.get('action') not in ACTIONS:
+                continue
+
+            conditions = {}
+            for key, value in (step.get('while') or {}).items():
+                if key in ('enemy_state_in', 'enemy_state_not'):
+                    states = [value] if isinstance(value, str) else value
+                    if isinstance(states, list):
+                        conditions[key] = [state for state in states if state in ENEMY_STATES]
+                elif (key[-3:] in ('_gt', '_lt', '_ge', '_le') and key[:-3] in PLAN_FIELDS
+                        and isinstance(value, (int, float)) and not isinstance(value, bool)):
+                    conditions[key] = value
+
+            steps.append({
+                "action": step['action'],
+                "reasoning": str(step.get('reasoning', '')),
+                "while": conditions
+            })
+
+        if not steps:
+            return None
+
+        try:
+            valid_for_ms = int(raw.get('valid_for_ms', self.plan_valid_ms))
+            confidence = float(raw.get('confidence', 0.7))
+        except (TypeError, ValueError):
+            valid_for_ms, confidence = self.plan_valid_ms, 0.7
+        return self._plan_response(steps, min(max(valid_for_ms, PLAN_MIN_MS), PLAN_MAX_MS), confidence)
+
+    def _plan_response(self, steps, valid_for_ms, confidence):
+        """Plan payload; the first step doubles as this tick's decision for older clients"""
+        return {
+            "action": steps[0]['action'],
+            "reasoning": steps[0]['reasoning'],
+            "confidence": confidence,
+            "plan": steps,
+            "valid_for_ms": valid_for_ms
+        }
+
+    def _mock_plan(self, agent_state, enemy_state):
+        """Mock plan: hold the rule table's pick for as long as its rule keeps matching"""
+        decision = self._mock_decision(agent_state, enemy_state)
+        conditions = self.mock_policy.region(
+            agent_state.get('health', 100),
+            enemy_state.get('health', 100),
+            enemy_state.get('distance', 100),
+            enemy_state.get('state', 'idle')
+        )
+        step = {"action": decision['action'], "reasoning": decision['reasoning'], "while": conditions}
+        return self._plan_response([step], self.plan_valid_ms, decision['confidence'])
+
+    def decide_batch(self, items, deadline=None):
+        """
+        Decide many agent/enemy/environment states in as few Gemini calls as possible
+        Identical (quantized) states are asked once; results keep input order.
+        States still unanswered a second past the deadline get the mock brain
+        """
+        decisions = [None] * len(items)
+        pending = OrderedDict()
+
+        for index, item in enumerate(items):
+            try:
+                agent_state = item.get('agent') or {}
+                enemy_state = item.get('enemy') or {}
+                environment = item.get('environment') or {}
+                user_prompt = item.get('user_prompt') or ''
+
+                if self.mock_mode:
+                    count_decision(mode='batch', source='mock')
+                    decisions[index] = self._mock_decision(agent_state, enemy_state, user_prompt)
+                    continue
+
+                cache_key = self._decision_cache_key(agent_state, enemy_state, environment, user_prompt)
+                if cache_key in pending:
+                    pending[cache_key].append(index)
+                    continue
+
+                cached = self.decision_cache.get(cache_key)
+                if cached is not None:
+                    count_decision(mode='batch', source='cache')
+                    decisions[index] = cached
+                    continue
+
+                distilled = self._distilled_decision(state_features(agent_state, enemy_state, user_prompt))
+                if distilled is not None:
+                    count_decision(mode='batch', source='distilled')
+                    decisions[index] = distilled
+                    continue
+
+                pending[cache_key] = [index]
+
+            except Exception as e:
+                print(f"Error in batch item {index}: {e}")
+                decisions[index] = self._fallback_decision({}, {})
+
+        if pending:
+            deadline = self.decision_deadline if deadline is None else deadline
+            future = asyncio.run_coroutine_threadsafe(self._decide_pending(items, pending), self._event_loop())
+            timed_out = False
+            try:
+                resolved = future.result(timeout=deadline + 1.0 if deadline else None)
+            except FutureTimeout:
+                # Late answers still reach the decision cache when they land
+                print(f"⏱️  Gemini missed the {deadline * 1000:.0f}ms batch deadline, using mock decisions")
+                resolved, timed_out = {}, True
+            except Exception as e:
+                print(f"Error in AI batch decision: {e}")
+                resolved = {}
+
+            for cache_key, indices in pending.items():
+                for index in indices:
+                    decision, source = resolved.get(cache_key), 'model'
+                    if decision is None:
+                        item = items[index]
+                        if timed_out:
+                            decision, source = self._mock_decision(
+                                item.get('agent') or {}, item.get('enemy') or {}, item.get('user_prompt') or ''
+                            ), 'deadline'
+                        elif cache_key in resolved:
+                            # Shed by the gateway: the mock policy answers instead
+                            decision, source = self._mock_decision(item.get('agent') or {}, item.get('enemy') or {}), 'shed'
+                        else:
+                            decision, source = self._fallback_decision(item.get('agent') or {}, item.get('enemy') or {}), 'fallback'
+                    count_decision(mode='batch', source=source)
+                    decisions[index] = dict(decision)
+
+        return decisions
+
+    async def _decide_pending(self, items, pending):
+        """Pack unseen states into multi-state prompts that share strategy and memory"""
+        groups = OrderedDict()
+        for cache_key, indices in pending.items():
+            item = items[indices[0]]
+            user_prompt = item.get('user_prompt') or ''
+            memory = await self._relevant_memory_async(
+                item.get('memory') or [], user_prompt, item.get('enemy') or {}, item.get('environment') or {},
+                item.get('player')
+            )
+            group_key = (user_prompt, tuple(memory))
+            groups.setdefault(group_key, []).append(cache_key)
+
+        calls = []
+        for (user_prompt, memory), cache_keys in groups.items():
+            for start in range(0, len(cache_keys), self.batch_size):
+                chunk = cache_keys[start:start + self.batch_size]
+                calls.append(self._gemini_batch_decision(items, pending, chunk, user_prompt, memory))
+
+        resolved = {}
+        for chunk_result in await asyncio.gather(*calls):
+            resolved.update(chunk_result)
+        return resolved
+
+    async def _gemini_batch_decision(self, items, pending, cache_keys, user_prompt, memory):
+        """Ask Gemini for one chunk of situations and cache each well-formed answer"""
+        states = []
+        for cache_key in cache_keys:
+            item = items[pending[cache_key][0]]
+            states.append((item.get('agent') or {}, item.get('enemy') or {}, item.get('environment') or {}))
+
+        try:
+            with trace_stage('build_prompt'):
+                prompt = self._build_batch_prompt(states, user_prompt, memory)
+            LLM_TOKENS.inc(_estimate_tokens(prompt, self._chars_per_token), segment='batch')
+            with trace_stage('generate'):
+                response = await self.gateway.generate_async(prompt)
+            LLM_TOKENS.inc(_estimate_tokens(response.text, self._chars_per_token), segment='response')
+            with trace_stage('parse'):
+                answers = self._extract_batch_decisions(response.text)
+        except GatewayOverloaded:
+            LLM_CALLS.inc(kind='batch', outcome='shed')
+            return dict.fromkeys(cache_keys)
+        except Exception as e:
+            print(f"Error in AI batch decision: {e}")
+            LLM_CALLS.inc(kind='batch', outcome='error')
+            return {}
+        if len(answers) == len(cache_keys):
+            LLM_CALLS.inc(kind='batch', outcome='ok')
+        else:
+            self._parse_failed('batch')
+
+        resolved = {}
+        for position, cache_key in enumerate(cache_keys, start=1):
+            decision = answers.get(position)
+            if decision is None:
+                continue
+            agent_state, enemy_state, _ = states[position - 1]
+            self._log_decision(state_features(agent_state, enemy_state, user_prompt), decision)
+            self.decision_cache.put(cache_key, decision)
+            resolved[cache_key] = decision
+        return resolved
+
+    def _extract_batch_decisions(self, decision_text):
+        """Map situation number -> decision from Gemini's JSON array response"""
+        start_idx = decision_text.find('[')
+        end_idx = decision_text.rfind(']') + 1
+        if start_idx < 0 or end_idx <= start_idx:
+            raise ValueError("No JSON array found in response")
+
+        answers = {}
+        for position, entry in enumerate(json.loads(decision_text[start_idx:end_idx]), start=1):
+            if not isinstance(entry, dict) or 'action' not in entry:
+                continue
+            situation = entry.pop('situation', position)
+            answers[situation if isinstance(situation, int) else position] = entry
+        return answers
+
+    def _event_loop(self):
+        """Return the background event loop, starting it on first use"""
+        if self._loop is None or self._loop_pid != os.getpid():
+            with self._loop_lock:
+                if self._loop is None or self._loop_pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name='gemini-loop', daemon=True)
+                    thread.start()
+                    self._inflight = {}
+                    self._speculative = set()
+                    self._loop = loop
+                    self._loop_pid = os.getpid()
+        return self._loop
+
+    def _decision_cache_key(self, agent_state, enemy_state, environment, user_prompt):
+        """Quantize a combat situation into a decision cache key"""
+        prompt_hash = hashlib.sha1((user_prompt or '').encode('utf-8')).hexdigest()
+        return (
+            _health_status(agent_state.get('health', 100)),
+            _health_status(agent_state.get('energy', 100)),
+            _enemy_threat(enemy_state.get('distance', 100)),
+            enemy_state.get('type', 'Unknown'),
+            enemy_state.get('state', 'idle'),
+            environment.get('zone', 'arena'),
+            prompt_hash
+        )
+
     def _build_decision_prompt(self, agent_state, enemy_state, environment, user_prompt, memory):
         """Build the prompt for Gemini with user's tactical instructions"""
+        return "\n\n".join([
+            STATIC_PROMPT_PREFIX,
+            self._build_battle_segment(user_prompt, self._relevant_memory(memory, user_prompt, enemy_state, environment)),
+            self._build_situation_delta(agent_state, enemy_state, environment)
+        ])
+
+    def _build_battle_segment(self, user_prompt, memory):
+        """Per-battle prompt segment: commander's strategy and past lessons"""
+        return f"""🎯 COMMANDER'S STRATEGY:
+"{user_prompt}"
+
+📚 PAST LESSONS:
+{self._format_memory(memory)}"""
 
-        health_status = "critical" if agent_state.get('health', 100) < 30 else "low" if agent_state.get('health', 100) < 60 else "good"
-        enemy_threat = "immediate" if enemy_state.get('distance', 100) < 50 else "close" if enemy_state.get('distance', 100) < 100 else "distant"
+    def _build_situation_delta(self, agent_state, enemy_state, environment):
+        """Per-tick prompt segment: the current combat situation"""
+        return f"""⚔️ COMBAT SITUATION:
+{self._format_situation(agent_state, enemy_state, environment)}"""
+
+    def _battle_context(self, user_prompt, memory):
+        """Return the pinned chat context for this strategy and memory, building it once"""
+        battle_segment = self._build_battle_segment(user_prompt, memory)
+        key = hashlib.sha1(battle_segment.encode('utf-8')).hexdigest()
+
+        with self._context_lock:
+            context = self.battle_contexts.get(key)
+            if context is not None:
+                self.battle_contexts.move_to_end(key)
+                return context
+
+        context = BattleContext(battle_segment)
+        with self._context_lock:
+            context = self.battle_contexts.setdefault(key, context)
+            while len(self.battle_contexts) > self.max_battle_contexts:
+                self.battle_contexts.popitem(last=False)
+        return context
+
+    def _count_tokens(self, text):
+        """
+        Token count for a reused prompt segment, memoized
+        Starts as an estimate and is replaced by Gemini's exact count in the background
+        """
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        with self._context_lock:
+            tokens = self._segment_tokens.get(key)
+            if tokens is not None:
+                self._segment_tokens.move_to_end(key)
+                return tokens
+
+            tokens = _estimate_tokens(text, self._chars_per_token)
+            now = time.monotonic()
+            # Rate-limited: other segments keep the (calibrated) estimate
+            exact = self._token_counted_at is None or now - self._token_counted_at >= self.token_count_interval
+            if exact:
+                self._token_counted_at = now
+            self._segment_tokens[key] = tokens
+            while len(self._segment_tokens) > self.max_battle_contexts + 1:
+                self._segment_tokens.popitem(last=False)
+        if exact:
+            asyncio.ensure_future(self._exact_token_count(key, text))
+        return tokens
+
+    async def _exact_token_count(self, key, text):
+        if not getattr(self.model, 'loaded', True):
+            with self._context_lock:
+                self._segment_tokens.pop(key, None)  # estimate again, count once the model is up
+                self._token_counted_at = None
+            return
+        try:
+            tokens = (await self.model.count_tokens_async(text)).total_tokens
+        except Exception as e:
+            print(f"Could not count tokens: {e}")
+            return
+        with self._context_lock:
+            if key in self._segment_tokens:
+                self._segment_tokens[key] = tokens
+        self._chars_per_token = len(text) / max(tokens, 1)
+
+    def _record_prompt_tokens(self, context, situation):
+        """Account one tick's tokens per prompt segment"""
+        static_tokens = self._count_tokens(STATIC_PROMPT_PREFIX)
+        battle_tokens = self._count_tokens(context.battle_segment)
+        delta_tokens = _estimate_tokens(situation, self._chars_per_token)
+        with self._context_lock:
+            self.prompt_tokens['ticks'] += 1
+            self.prompt_tokens['static'] += static_tokens
+            self.prompt_tokens['battle'] += battle_tokens
+            self.prompt_tokens['delta'] += delta_tokens
+        LLM_TOKENS.inc(static_tokens, segment='static')
+        LLM_TOKENS.inc(battle_tokens, segment='battle')
+        LLM_TOKENS.inc(delta_tokens, segment='delta')
+
+    def prompt_stats(self):
+        """
+        Token counts per prompt segment and how much of each tick repeats a prefix
+        The whole prompt is sent every tick: the repeated prefix only saves
+        tokens where the provider caches prompt prefixes implicitly
+        """
+        with self._context_lock:
+            totals = dict(self.prompt_tokens)
+            battles = len(self.battle_contexts)
+            static = self._segment_tokens.get(
+                hashlib.sha1(STATIC_PROMPT_PREFIX.encode('utf-8')).hexdigest(), _estimate_tokens(STATIC_PROMPT_PREFIX)
+            )
+
+        ticks = totals['ticks']
+        prefix = totals['static'] + totals['battle']
+        sent = prefix + totals['delta']
+        return {
+            "ticks": ticks,
+            "battle_contexts": battles,
+            "segment_tokens": {
+                "static_prefix": static,
+                "battle_avg": round(totals['battle'] / ticks, 1) if ticks else None,
+                "delta_avg": round(totals['delta'] / ticks, 1) if ticks else None
+            },
+            "total_tokens": sent,
+            "repeated_prefix_tokens": prefix,
+            "fresh_delta_tokens": totals['delta'],
+            "repeated_prefix_share": round(prefix / sent, 3) if sent else None,
+            "prefix_note": "Every tick sends the full prompt; the repeated prefix only saves tokens "
+                           "if the provider caches prompt prefixes implicitly"
+        }
+
+    def _build_batch_prompt(self, states, user_prompt, memory):
+        """Build one prompt asking Gemini to decide several situations at once"""
+
+        situations = "\n\n".join(
+            f"[{index}]\n{self._format_situation(agent_state, enemy_state, environment)}"
+            for index, (agent_state, enemy_state, environment) in enumerate(states, start=1)
+        )
 
         prompt = f"""You are RooKnight, an AI combat agent following your commander's tactical orders.
 
 🎯 COMMANDER'S STRATEGY:
 "{user_prompt}"
 
-⚔️ COMBAT SITUATION:
-Your Status: {agent_state.get('health', 100)}/100 HP ({health_status}), {agent_state.get('energy', 100)}/100 energy
-Enemy: {enemy_state.get('type', 'Unknown')} - {enemy_state.get('health', 100)}/100 HP ({enemy_threat} threat)
-Distance: {enemy_state.get('distance', 0):.0f} units | Enemy is: {enemy_state.get('state', 'idle')}
-Position: {"grounded" if agent_state.get('onGround') else "airborne"} in {environment.get('zone', 'arena')}
+⚔️ COMBAT SITUATIONS (decide each one independently):
+{situations}
 
 📚 PAST LESSONS:
 {self._format_memory(memory)}
 
-🎮 AVAILABLE ACTIONS & WHEN TO USE:
-- ATTACK: Strike enemy (best at 15-50 units, deals damage)
-- JUMP_ATTACK: Aerial assault (high damage, crosses gaps, 50-100 units ideal)
-- DODGE: Quick evasive dash (escape danger, reposition)
-- BLOCK: Defensive stance (reduces damage 65%, use when enemy attacking)
-- RETREAT: Fall back when low health or overwhelmed
-- MOVE_CLOSER: Advance toward enemy (when >100 units away)
-- MOVE_AWAY: Create space (when too close <15 units)
-- WAIT_AND_OBSERVE: Study patterns (use sparingly, when enemy idle)
-
-CRITICAL: Your commander's strategy is paramount. Interpret their instructions and adapt them to this exact situation. If they say "be aggressive", favor ATTACK/JUMP_ATTACK. If "defensive", use DODGE/BLOCK more. If "smart", analyze before acting.
+{ACTIONS_GUIDE}
 
-Respond ONLY with valid JSON:
-{{
-  "action": "EXACT_ACTION_NAME",
-  "reasoning": "1-2 sentences explaining how this follows commander's strategy for THIS situation",
-  "confidence": 0.0-1.0
-}}"""
+Respond ONLY with a valid JSON array containing exactly {len(states)} objects, one per situation in order:
+[
+  {{
+    "situation": 1,
+    "action": "EXACT_ACTION_NAME",
+    "reasoning": "1-2 sentences explaining how this follows commander's strategy for THIS situation",
+    "confidence": 0.0-1.0
+  }}
+]"""
 
         return prompt
 
-    def _parse_decision(self, decision_text):
-        """Parse Gemini's response into structured decision"""
+    def _format_situation(self, agent_state, enemy_state, environment):
+        """Describe one combat situation for a prompt"""
+        health_status = _health_status(agent_state.get('health', 100))
+        enemy_threat = _enemy_threat(enemy_state.get('distance', 100))
+
+        return f"""Your Status: {agent_state.get('health', 100)}/100 HP ({health_status}), {agent_state.get('energy', 100)}/100 energy
+Enemy: {enemy_state.get('type', 'Unknown')} - {enemy_state.get('health', 100)}/100 HP ({enemy_threat} threat)
+Distance: {enemy_state.get('distance', 0):.0f} units | Enemy is: {enemy_state.get('state', 'idle')}
+Position: {"grounded" if agent_state.get('onGround') else "airborne"} in {environment.get('zone', 'arena')}"""
+
+    def _extract_decision(self, decision_text):
+        """Extract the JSON decision from Gemini's response, or None if malformed"""
         try:
             # Try to extract JSON from the response
             start_idx = decision_text.find('{')
@@ -109,133 +1588,45 @@ Respond ONLY with valid JSON:
             if start_idx >= 0 and end_idx > start_idx:
                 json_str = decision_text[start_idx:end_idx]
                 decision = json.loads(json_str)
-                return decision
+                if isinstance(decision, dict):
+                    return decision
+                raise ValueError("Decision is not a JSON object")
             else:
                 raise ValueError("No JSON found in response")
 
         except Exception as e:
             print(f"Error parsing decision: {e}")
-            # Return default decision
-            return {
-                "action": "WAIT_AND_OBSERVE",
-                "reasoning": "Analyzing the situation...",
-                "confidence": 0.5
-            }
-
-    def _mock_decision(self, agent_state, enemy_state, user_prompt=''):
-        """Mock decision - simulates smart AI behavior (for demo without real API)"""
-        import random
-
-        distance = enemy_state.get('distance', 100)
-        health = agent_state.get('health', 100)
-        enemy_health = enemy_state.get('health', 100)
-        enemy_state_str = enemy_state.get('state', 'idle')
-
-        # Log user prompt for debugging (in real mode, Gemini would use this)
-        if user_prompt:
-            print(f"📋 User Prompt: {user_prompt[:80]}...")
-
-        # Critical health - always retreat
-        if health < 25:
-            return {
-                "action": "RETREAT",
-                "reasoning": "Critical health! Must retreat to survive",
-                "confidence": 0.95
-            }
-
-        # Low health but enemy almost dead - finish them
-        elif health < 40 and enemy_health < 30:
-            return {
-                "action": "JUMP_ATTACK",
-                "reasoning": "Both wounded - finishing blow!",
-                "confidence": 0.88
-            }
-
-        # Low health - defensive
-        elif health < 40:
-            if random.random() < 0.7:
-                return {
-                    "action": "DODGE",
-                    "reasoning": "Low health - staying mobile and defensive",
-                    "confidence": 0.82
-                }
-            else:
-                return {
-                    "action": "BLOCK",
-                    "reasoning": "Low health - blocking incoming attacks",
-                    "confidence": 0.78
-                }
-
-        # Enemy attacking - counter or dodge
-        elif enemy_state_str == 'attacking':
-            if distance < 30:
-                return {
-                    "action": "DODGE",
-                    "reasoning": "Enemy attacking! Evading now!",
-                    "confidence": 0.92
-                }
-            else:
-                return {
-                    "action": "MOVE_AWAY",
-                    "reasoning": "Enemy attacking - creating distance",
-                    "confidence": 0.85
-                }
+            return None
 
-        # Perfect attack range
-        elif distance < 25 and distance > 10:
-            actions = ["ATTACK", "JUMP_ATTACK"]
-            action = random.choice(actions)
-            return {
-                "action": action,
-                "reasoning": f"Perfect range! {'Aerial assault' if action == 'JUMP_ATTACK' else 'Strike now'}!",
-                "confidence": 0.90
-            }
-
-        # Too close - might get hit
-        elif distance < 10:
-            if random.random() < 0.6:
-                return {
-                    "action": "ATTACK",
-                    "reasoning": "Point-blank range - quick strike!",
-                    "confidence": 0.87
-                }
-            else:
-                return {
-                    "action": "DODGE",
-                    "reasoning": "Too close - need space to maneuver",
-                    "confidence": 0.83
-                }
+    def _parse_decision(self, decision_text):
+        """Parse Gemini's response into structured decision"""
+        decision = self._extract_decision(decision_text)
+        if decision is None:
+            return self._default_decision()
+        return decision
 
-        # Too far - close distance
-        elif distance > 80:
-            return {
-                "action": "MOVE_CLOSER",
-                "reasoning": "Enemy too far - closing the gap",
-                "confidence": 0.80
-            }
+    def _parse_failed(self, kind):
+        """Count an unparseable model answer, against the circuit breaker too"""
+        LLM_CALLS.inc(kind=kind, outcome='parse_error')
+        if self.breaker is not None:
+            self.breaker.record_parse_failure()
 
-        # Medium range - tactical choice
-        elif distance > 40:
-            if random.random() < 0.4:
-                return {
-                    "action": "MOVE_CLOSER",
-                    "reasoning": "Moving into attack range",
-                    "confidence": 0.75
-                }
-            else:
-                return {
-                    "action": "WAIT_AND_OBSERVE",
-                    "reasoning": "Studying enemy patterns and timing",
-                    "confidence": 0.72
-                }
+    def _default_decision(self):
+        """Decision used when Gemini's response cannot be parsed"""
+        return {
+            "action": "WAIT_AND_OBSERVE",
+            "reasoning": "Analyzing the situation...",
+            "confidence": 0.5
+        }
 
-        # Default - observe
-        else:
-            return {
-                "action": "WAIT_AND_OBSERVE",
-                "reasoning": "Analyzing the situation...",
-                "confidence": 0.70
-            }
+    def _mock_decision(self, agent_state, enemy_state, user_prompt=''):
+        """Mock decision - simulates smart AI behavior (for demo without real API)"""
+        return self.mock_policy.decide(
+            agent_state.get('health', 100),
+            enemy_state.get('health', 100),
+            enemy_state.get('distance', 100),
+            enemy_state.get('state', 'idle')
+        )
 
     def _fallback_decision(self, agent_state, enemy_state):
         """Fallback decision if AI fails"""
@@ -249,18 +1640,62 @@ Respond ONLY with valid JSON:
         """
         Post-battle reflection and learning
         """
+        return self.reflect_batch([(battle_data, outcome)])[0]
+
+    @traced('reflect')
+    def reflect_batch(self, battles):
+        """
+        Reflect on several finished battles with one Gemini call and one memory write
+        battles is a list of (battle_data, outcome); reflections come back in order
+        """
         if self.mock_mode:
-            return self._mock_reflection(battle_data, outcome)
+            reflections = [self._mock_reflection(battle_data, outcome) for battle_data, outcome in battles]
+        else:
+            reflections = self._gemini_reflections(battles)
+
+        # Store every lesson in memory at once, tagged with where it was learned
+        self.add_memories([
+            dict(self._memory_tags(battle_data), memory=reflection.get('lesson', 'Battle completed'))
+            for (battle_data, _), reflection in zip(battles, reflections)
+        ])
+        return reflections
 
-        prompt = f"""You are RooKnight. You just finished a battle.
+    def _gemini_reflections(self, battles):
+        prompt = self._reflection_prompt(battles)
+        annotate(prompt=prompt)
+        try:
+            response = self.gateway.generate(prompt)
+            annotate(raw=response.text)
+            answers = self._parse_reflections(response.text, len(battles))
+            LLM_CALLS.inc(kind='reflect', outcome='ok')
+
+        except GatewayOverloaded:
+            LLM_CALLS.inc(kind='reflect', outcome='shed')
+            answers = []
+        except Exception as e:
+            print(f"Error in reflection: {e}")
+            LLM_CALLS.inc(kind='reflect', outcome='error')
+            answers = []
+
+        # Battles the model skipped get a mock reflection
+        reflections = []
+        for index, (battle_data, outcome) in enumerate(battles):
+            answer = answers[index] if index < len(answers) else None
+            if isinstance(answer, dict) and answer.get('lesson'):
+                answer.pop('battle', None)
+                reflections.append(answer)
+            else:
+                reflections.append(self._mock_reflection(battle_data, outcome))
+        return reflections
+
+    def _reflection_prompt(self, battles):
+        """Reflection prompt for one battle, or one asking for a JSON array covering several"""
+        if len(battles) == 1:
+            battle_data, outcome = battles[0]
+            return f"""You are RooKnight. You just finished a battle.
 
 BATTLE DATA:
-- Enemy Type: {battle_data.get('enemy_type', 'Unknown')}
-- Duration: {battle_data.get('duration', 0)} seconds
-- Damage Taken: {battle_data.get('damage_taken', 0)}
-- Damage Dealt: {battle_data.get('damage_dealt', 0)}
-- Actions Used: {', '.join(battle_data.get('actions', []))}
-- Outcome: {outcome}
+{self._format_battle(battle_data, outcome)}
 
 Reflect on this battle. What did you learn? What would you do differently?
 
@@ -271,24 +1706,46 @@ Respond in JSON format:
   "confidence_change": "More confident / Less confident / Same"
 }}"""
 
-        try:
-            response = self.model.generate_content(prompt)
-            reflection_text = response.text
+        battles_text = "\n\n".join(
+            f"[{index}]\n{self._format_battle(battle_data, outcome)}"
+            for index, (battle_data, outcome) in enumerate(battles, start=1)
+        )
+        return f"""You are RooKnight. You just finished {len(battles)} separate battles.
 
-            # Parse reflection
-            start_idx = reflection_text.find('{')
-            end_idx = reflection_text.rfind('}') + 1
-            json_str = reflection_text[start_idx:end_idx]
-            reflection = json.loads(json_str)
+BATTLE DATA:
+{battles_text}
 
-            # Store lesson in memory
-            self.add_memory(reflection.get('lesson', 'Battle completed'))
+Reflect on each battle independently. What did you learn? What would you do differently?
 
-            return reflection
+Respond ONLY with a valid JSON array containing exactly {len(battles)} objects, one per battle in order:
+[
+  {{
+    "battle": 1,
+    "lesson": "One sentence key takeaway",
+    "improvements": ["specific improvement 1", "specific improvement 2"],
+    "confidence_change": "More confident / Less confident / Same"
+  }}
+]"""
 
-        except Exception as e:
-            print(f"Error in reflection: {e}")
-            return self._mock_reflection(battle_data, outcome)
+    def _parse_reflections(self, reflection_text, count):
+        """The reflection objects in Gemini's response: one object, or an array for several battles"""
+        if count == 1:
+            start_idx = reflection_text.find('{')
+            end_idx = reflection_text.rfind('}') + 1
+            return [json.loads(reflection_text[start_idx:end_idx])]
+        start_idx = reflection_text.find('[')
+        end_idx = reflection_text.rfind(']') + 1
+        return json.loads(reflection_text[start_idx:end_idx])
+
+    def _format_battle(self, battle_data, outcome):
+        """Describe one finished battle for a reflection prompt"""
+        actions = battle_data.get('actions', [])
+        return f"""- Enemy Type: {battle_data.get('enemy_type', 'Unknown')}
+- Duration: {battle_data.get('duration', 0)} seconds
+- Damage Taken: {battle_data.get('damage_taken', 0)}
+- Damage Dealt: {battle_data.get('damage_dealt', 0)}
+- Actions Used: {', '.join(actions) if isinstance(actions, list) else actions}
+- Outcome: {outcome}"""
 
     def _mock_reflection(self, battle_data, outcome):
         """Mock reflection when API is not available - generates dynamic insights"""
@@ -328,7 +1785,6 @@ Respond in JSON format:
             improvements.append("End fights faster - too drawn out")
 
         lesson = random.choice(lessons)
-        self.add_memory(lesson)
 
         confidence_changes = {
             "victory": ["More confident", "Much more confident"],
@@ -343,46 +1799,169 @@ Respond in JSON format:
             "confidence_change": confidence_change
         }
 
-    def add_memory(self, memory_text):
-        """Add a memory to the agent's history"""
-        memory_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "memory": memory_text
-        }
-        self.memory.append(memory_entry)
+    def add_memory(self, memory_text, enemy=None, biome=None, player=None):
+        """Add a memory to a player's history"""
+        tags = self._memory_tags({"enemy_type": enemy, "biome": biome, "player": player})
+        self.add_memories([dict(tags, memory=memory_text)])
 
-        # Keep only last 50 memories
-        if len(self.memory) > 50:
-            self.memory = self.memory[-50:]
+    def add_memories(self, lessons):
+        """
+        Add several memories, one batched insert per player
+        Each lesson is a dict with the "memory" text and optional "enemy"/"biome"/"player" tags
+        """
+        by_player = OrderedDict()
+        for lesson in lessons:
+            by_player.setdefault(player_id(lesson.get('player')), []).append(lesson)
+
+        for player, player_lessons in by_player.items():
+            try:
+                with MEMORY_SAVE_SECONDS.time():
+                    self.memory_store.add_many(player, player_lessons)
+            except Exception as e:
+                print(f"Could not save memory: {e}")
+                continue
+
+            # Index them now rather than at the next sync
+            slot = self._memory_indexes.get(player)
+            if slot is not None:
+                self._sync_memory(player, slot)
+
+    def get_memory(self, player=None, limit=50, before=None, enemy=None):
+        """
+        One page of a player's lessons, oldest first, ending just before the
+        `before` id (the newest page without it); returns (lessons, next_before)
+        """
+        return self.memory_store.page(player_id(player), limit, before, enemy)
 
-        self.save_memory()
+    def memory_count(self, player=None):
+        return self.memory_store.count(player_id(player))
 
-    def get_memory(self):
-        """Get all memories"""
-        return self.memory
+    def recall(self, enemy=None, biome=None, user_prompt='', player=None):
+        """Lessons a prompt would recall against this enemy and biome"""
+        return self._relevant_memory([], user_prompt, {"type": enemy}, {"zone": biome}, player)
+
+    def memory_index(self, player=None):
+        """The recall index over a player's lessons, caught up with other workers' writes"""
+        player = player_id(player)
+        with self._memory_lock:
+            slot = self._memory_indexes.get(player)
+            if slot is None:
+                slot = self._memory_indexes[player] = {
+                    "index": MemoryIndex(max_scan=self.memory_index_scan),
+                    "last_id": 0,
+                    "oldest_id": 0,
+                    "checked": 0.0,
+                    "lock": threading.Lock()
+                }
+                while len(self._memory_indexes) > self.max_memory_indexes:
+                    self._memory_indexes.popitem(last=False)
+            else:
+                self._memory_indexes.move_to_end(player)
+
+        now = time.monotonic()
+        if now - slot['checked'] >= MEMORY_SYNC_INTERVAL:
+            slot['checked'] = now
+            self._sync_memory(player, slot)
+        return slot['index']
+
+    async def _relevant_memory_async(self, memory, user_prompt, enemy_state, environment, player=None):
+        """
+        _relevant_memory for the event loop thread
+        When the player's index is due a sync (a store read, and on first use
+        indexing every lesson) the whole lookup runs on the loop's executor
+        """
+        slot = self._memory_indexes.get(player_id(player))
+        if slot is not None and time.monotonic() - slot['checked'] < MEMORY_SYNC_INTERVAL:
+            return self._relevant_memory(memory, user_prompt, enemy_state, environment, player)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._relevant_memory, memory, user_prompt, enemy_state, environment, player
+        )
+
+    def _relevant_memory(self, memory, user_prompt, enemy_state, environment, player=None):
+        """
+        Top-k stored lessons of this player for this enemy, biome and strategy,
+        topped up with the most recent lessons the client sent
+        """
+        enemy = (enemy_state or {}).get('type')
+        biome = (environment or {}).get('zone') or self.world_state.get_enemy_biome(enemy)
+        index = self.memory_index(player)
+        lessons = index.search(self._memory_query(user_prompt, enemy, biome), enemy, biome, self.memory_top_k)
+
+        for lesson in reversed(memory or []):
+            if len(lessons) >= self.memory_top_k:
+                break
+            text = lesson.get('memory') if isinstance(lesson, dict) else lesson
+            if text and text not in lessons:
+                lessons.append(text)
+        return lessons
+
+    def _memory_query(self, user_prompt, enemy, biome):
+        """Recall query: the strategy plus what WorldState knows about the enemy and biome"""
+        parts = [user_prompt or '', enemy or '']
+        enemy_info = self.world_state.get_enemy_types().get(enemy)
+        if enemy_info:
+            parts += [enemy_info['attack_pattern'], enemy_info['weakness']] + enemy_info['abilities']
+        biome_info = self.world_state.biomes.get(biome)
+        if biome_info:
+            parts += biome_info['hazards']
+        return " ".join(parts)
+
+    def _memory_tags(self, battle_data):
+        """Player, enemy and biome a lesson was learned against (biome inferred from the enemy)"""
+        enemy = battle_data.get('enemy_type')
+        biome = battle_data.get('biome') or self.world_state.get_enemy_biome(enemy)
+        tags = (("player", battle_data.get('player')), ("enemy", enemy), ("biome", biome))
+        return {tag: value for tag, value in tags if value}
 
     def _format_memory(self, recent_memory):
         """Format memory for prompt"""
         if not recent_memory:
             return "No past lessons yet."
 
-        formatted = "\n".join([f"- {mem}" for mem in recent_memory[-5:]])
+        formatted = "\n".join([f"- {mem}" for mem in recent_memory[-self.memory_top_k:]])
         return formatted
 
-    def load_memory(self):
-        """Load memory from file"""
-        try:
-            if os.path.exists('memory.json'):
-                with open('memory.json', 'r') as f:
-                    self.memory = json.load(f)
-        except Exception as e:
-            print(f"Could not load memory: {e}")
-            self.memory = []
+    def _sync_memory(self, player, slot):
+        """
+        Index a player's lessons stored since the slot last looked (by any worker),
+        and drop indexed lessons the store's retention has since deleted
+        """
+        with slot['lock']:
+            try:
+                entries = self.memory_store.since(player, slot['last_id'])
+                oldest_id = self.memory_store.oldest_id(player)
+            except Exception as e:
+                print(f"Could not read memories: {e}")
+                return
+            for entry in entries:
+                slot['index'].add(entry['memory'], entry.get('enemy'), entry.get('biome'), entry['id'])
+            if entries:
+                slot['last_id'] = entries[-1]['id']
+            if oldest_id is not None and oldest_id > slot['oldest_id']:
+                slot['index'].prune(oldest_id)
+                slot['oldest_id'] = oldest_id
 
-    def save_memory(self):
-        """Save memory to file"""
+    def _import_journal(self, path):
+        """Seed an empty store with the old shared journal (or memory.json) as the default player's history"""
+        # memory.json predates the journal and sat next to the memory files
+        legacy_path = os.path.join(os.path.dirname(os.path.abspath(self.memory_store.path)), 'memory.json')
+        if not path or not (os.path.exists(path) or os.path.exists(legacy_path)):
+            return
+        source = path if os.path.exists(path) else legacy_path
         try:
-            with open('memory.json', 'w') as f:
-                json.dump(self.memory, f, indent=2)
+            if not self.memory_store.is_empty():
+                return
+            lessons = []
+            source, entries = read_legacy_memories(path, legacy_path, window=self.memory_retention)
+            for entry in entries:
+                if isinstance(entry, str):
+                    entry = {"memory": entry}
+                try:
+                    created_at = datetime.fromisoformat(entry['timestamp']).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    created_at = time.time()
+                lessons.append(dict(entry, created_at=created_at))
+            self.memory_store.add_many(DEFAULT_PLAYER, lessons)
+            print(f"📦 Imported {len(lessons)} lessons from {source} for player '{DEFAULT_PLAYER}'")
         except Exception as e:
-            print(f"Could not save memory: {e}")
+            print(f"Could not import {source}: {e}")
@@ -1,80 +1,451 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from flask_sock import Sock
+from concurrent.futures import ThreadPoolExecutor
 import os
+import json
+import time
 from dotenv import load_dotenv
 from agent_brain import AgentBrain
 from world_state import WorldState
+from battle_sessions import SessionStore
+from memory_store import player_id
+from circuit_breaker import STATE_VALUES
+from decision_channel import DecisionChannel
+from reflection_jobs import ReflectionQueue
+import wire_format
+from metrics import REGISTRY, DECIDE_STAGE_SECONDS, HTTP_REQUESTS, HTTP_SECONDS
+
+STARTED_AT = time.monotonic()
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app)
 
 # Initialize game systems
-agent_brain = AgentBrain()
 world_state = WorldState()
+agent_brain = AgentBrain(world_state=world_state)
+battle_sessions = SessionStore(
+    max_sessions=int(os.environ.get('MAX_BATTLE_SESSIONS', 1024)),
+    idle_timeout=float(os.environ.get('SESSION_IDLE_TIMEOUT', 300)),
+    shared=agent_brain.shared_store  # visible to every worker process
+)
+
+# Workers answering frames from persistent decision channels
+channel_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('CHANNEL_DECISION_WORKERS', 8)),
+    thread_name_prefix='decision-channel'
+)
+
+# Post-battle reflections run in the background; ones that finish together share a model call
+reflection_queue = ReflectionQueue(
+    agent_brain.reflect_batch,
+    workers=int(os.environ.get('REFLECTION_WORKERS', 2)),
+    coalesce_window=float(os.environ.get('REFLECTION_COALESCE_MS', 250)) / 1000.0,
+    max_batch=int(os.environ.get('REFLECTION_MAX_BATCH', 8)),
+    shared=agent_brain.shared_store  # pollable from every worker process
+)
+
+# Longest a GET /api/reflect/<job_id>?wait=... may block
+MAX_REFLECTION_WAIT = 30.0
+
+# Largest number of states accepted by /api/decide/batch
+MAX_BATCH_STATES = int(os.environ.get('MAX_BATCH_STATES', 64))
+
+# Largest page of lessons returned by GET /api/memory
+MAX_MEMORY_PAGE = 500
+
+# Scrape-time gauges for in-process state
+REGISTRY.gauge('hollowzoo_decision_cache_entries', 'Decisions held in this worker\'s cache',
+               lambda: len(agent_brain.decision_cache))
+REGISTRY.gauge('hollowzoo_decision_cache_hit_ratio', 'Decision cache hits / lookups in this worker',
+               lambda: agent_brain.decision_cache.hits / max(agent_brain.decision_cache.hits + agent_brain.decision_cache.misses, 1))
+REGISTRY.gauge('hollowzoo_battle_contexts', 'Pinned per-battle prompt contexts',
+               lambda: len(agent_brain.battle_contexts))
+REGISTRY.gauge('hollowzoo_breaker_state', 'Model circuit breaker in this worker (0 closed, 0.5 half-open, 1 open)',
+               lambda: STATE_VALUES[agent_brain.breaker.stats()['state']] if agent_brain.breaker else 0)
+REGISTRY.gauge('hollowzoo_gateway_waiting', 'Gemini calls queued for a quota token in this worker',
+               lambda: agent_brain.gateway.waiting() if agent_brain.gateway else 0)
+REGISTRY.gauge('hollowzoo_reflection_jobs_pending', 'Reflections queued in this worker',
+               reflection_queue.pending)
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    started = g.get('request_started')
+    if started is not None and request.url_rule is not None:
+        endpoint = request.url_rule.rule
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+@app.after_request
+def _compress_response(response):
+    """gzip (or brotli) larger JSON and text responses the client accepts compressed"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in ('application/json', 'text/plain')):
+        return response
+
+    encoding = wire_format.pick_encoding(request.accept_encodings)
+    if encoding is None or (response.content_length or 0) < wire_format.MIN_COMPRESS_BYTES:
+        return response
+
+    response.set_data(wire_format.compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _player_id(data=None):
+    """The calling player: a "player" body field, the X-Player-Id header or ?player="""
+    player = (data or {}).get('player') or request.headers.get('X-Player-Id') or request.args.get('player')
+    return player_id(player)
+
+def _decision_args(data, session=None):
+    """
+    Turn a decide request body (or channel frame) into _decide arguments
+    With a session, the body only carries changed fields
+    """
+    if session is not None:
+        agent_state, enemy_state, environment = battle_sessions.apply(session, data)
+        user_prompt, memory, player = session.user_prompt, session.memory, session.player
+    else:
+        agent_state = data.get('agent', {})
+        enemy_state = data.get('enemy', {})
+        environment = data.get('environment', {})
+        user_prompt = data.get('user_prompt', '')  # User's tactical instructions
+        memory = data.get('memory', [])
+        player = _player_id(data)
+
+    deadline_ms = data.get('deadline_ms')  # Optional per-request Gemini deadline
+
+    return {
+        "mode": data.get('mode', 'action'),  # 'plan' asks for a multi-step plan
+        "agent_state": agent_state,
+        "enemy_state": enemy_state,
+        "environment": environment,
+        "user_prompt": user_prompt,
+        "memory": memory,
+        "player": player,
+        "deadline": float(deadline_ms) / 1000.0 if deadline_ms is not None else None
+    }
+
+def _decide(mode='action', **kwargs):
+    """Answer with one action, or with a multi-step plan in plan mode"""
+    if mode == 'plan':
+        return agent_brain.plan(**kwargs)
+    return agent_brain.decide(**kwargs)
 
 @app.route('/api/health', methods=['GET'])
+@app.route('/api/health/live', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness check: the worker is up and answering (the model may still be loading)"""
     return jsonify({"status": "ok", "service": "HollowZoo AI Backend"})
 
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness check: 200 once this worker can serve model decisions, 503 while
+    the Gemini SDK is still loading (decisions meanwhile come from the mock policy)
+    """
+    try:
+        checks = agent_brain.readiness()
+        ready = all(checks.values())
+        body = {
+            "status": "ready" if ready else "warming",
+            "checks": checks,
+            "uptime": round(time.monotonic() - STARTED_AT, 3)
+        }
+        if hasattr(getattr(agent_brain, 'model', None), 'stats'):
+            body["model"] = agent_brain.model.stats()
+        return jsonify(body), 200 if ready else 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/decide', methods=['POST'])
 def decide_action():
     """
     Main AI decision endpoint
     Receives game state and user's tactical prompt, returns AI decision
+    With "mode": "plan" the decision carries a plan and valid_for_ms
+    """
+    try:
+        with DECIDE_STAGE_SECONDS.time(stage='parse_request'):
+            if request.mimetype == wire_format.STATE_MIMETYPE:
+                data = wire_format.decode_state(request.get_data())
+            else:
+                data = request.json
+
+        # Get AI decision from agent brain using user's prompt
+        decision = _decide(**_decision_args(data))
+
+        with DECIDE_STAGE_SECONDS.time(stage='serialize'):
+            # JSON unless the client explicitly accepts the binary decision format
+            if request.accept_mimetypes.best_match(['application/json', wire_format.DECISION_MIMETYPE]) \
+                    == wire_format.DECISION_MIMETYPE:
+                return Response(wire_format.encode_decision(decision), mimetype=wire_format.DECISION_MIMETYPE)
+            return jsonify(decision)
+
+    except wire_format.WireFormatError as e:
+        return jsonify({"error": str(e)}), 415
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/decide/stream', methods=['POST'])
+def decide_stream():
+    """
+    Streaming AI decision endpoint
+    Answers with NDJSON: an {"event": "action"} line as soon as the model has
+    written the action, then an {"event": "decision"} line with the reasoning
+    """
+    try:
+        with DECIDE_STAGE_SECONDS.time(stage='parse_request'):
+            args = _decision_args(request.json)
+        args.pop('mode')  # single actions only
+
+        events = agent_brain.decide_stream(**args)
+        return Response(
+            (json.dumps(event) + '\n' for event in events),
+            mimetype='application/x-ndjson',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/decide/batch', methods=['POST'])
+def decide_batch():
+    """
+    Batched AI decision endpoint
+    Receives many agent/enemy/environment states, returns decisions in input order
     """
     try:
         data = request.json
+        states = data.get('states', [])
 
-        agent_state = data.get('agent', {})
-        enemy_state = data.get('enemy', {})
-        environment = data.get('environment', {})
-        user_prompt = data.get('user_prompt', '')  # User's tactical instructions
-        memory = data.get('memory', [])
+        if not isinstance(states, list):
+            return jsonify({"error": "states must be a list"}), 400
+        if len(states) > MAX_BATCH_STATES:
+            return jsonify({"error": f"At most {MAX_BATCH_STATES} states per batch"}), 400
 
-        # Get AI decision from agent brain using user's prompt
-        decision = agent_brain.decide(
-            agent_state=agent_state,
-            enemy_state=enemy_state,
-            environment=environment,
-            user_prompt=user_prompt,
-            memory=memory
+        # Top-level prompt and memory apply to every state that omits its own
+        player = _player_id(data)
+        items = []
+        for state in states:
+            state = state if isinstance(state, dict) else {}
+            items.append({
+                "agent": state.get('agent', {}),
+                "enemy": state.get('enemy', {}),
+                "environment": state.get('environment', {}),
+                "user_prompt": state.get('user_prompt', data.get('user_prompt', '')),
+                "memory": state.get('memory', data.get('memory', [])),
+                "player": player
+            })
+
+        deadline_ms = data.get('deadline_ms')  # Optional per-request Gemini deadline
+        decisions = agent_brain.decide_batch(items, float(deadline_ms) / 1000.0 if deadline_ms is not None else None)
+
+        return jsonify({"decisions": decisions})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/session', methods=['POST'])
+def open_session():
+    """
+    Open a battle session
+    The prompt, memory and enemy info are stored server-side so ticks only send deltas
+    """
+    try:
+        data = request.json
+
+        player = _player_id(data)
+        memory = data.get('memory')
+        if memory is None:
+            # Default to the player's most recent lessons
+            memory = [m['memory'] for m in agent_brain.get_memory(player, limit=5)[0]]
+
+        session = battle_sessions.open(
+            user_prompt=data.get('user_prompt', ''),
+            memory=memory,
+            player=player,
+            enemy_info=world_state.get_enemy_info(data.get('enemy_type', 'Unknown')),
+            environment=data.get('environment', {})
         )
 
-        return jsonify(decision)
+        response = session.to_dict()
+        response["idle_timeout"] = battle_sessions.idle_timeout
+        return jsonify(response), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/session/<session_id>/decide', methods=['POST'])
+def session_decide(session_id):
+    """
+    Session decision endpoint
+    Receives only the agent/enemy/environment fields that changed since the last tick
+    """
+    try:
+        session = battle_sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": "Unknown or expired session"}), 404
+
+        with DECIDE_STAGE_SECONDS.time(stage='parse_request'):
+            data = request.json or {}
+        decision = _decide(**_decision_args(data, session))
+
+        with DECIDE_STAGE_SECONDS.time(stage='serialize'):
+            return jsonify(decision)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/session/<session_id>', methods=['DELETE'])
+def close_session(session_id):
+    """Close a battle session"""
+    if not battle_sessions.close(session_id):
+        return jsonify({"error": "Unknown or expired session"}), 404
+    return jsonify({"status": "closed", "session_id": session_id})
+
+@sock.route('/api/ws/decide')
+def decision_channel(ws):
+    """
+    Persistent decision channel
+    Frames: {"tick": n, "session_id": ..., "agent": {...}, ...} up,
+    {"tick": n, "decision": {...}} down; stale decisions are dropped
+    """
+    def prepare(frame):
+        session_id = frame.get('session_id')
+        if not session_id:
+            return _decision_args(frame)
+
+        session = battle_sessions.get(session_id)
+        if session is None:
+            raise LookupError("Unknown or expired session")
+        return _decision_args(frame, session)
+
+    DecisionChannel(ws, prepare, _decide, channel_executor).run()
+
+@app.route('/api/prompt/stats', methods=['GET'])
+def get_prompt_stats():
+    """Token counts per prompt segment (static prefix, battle context, tick delta)"""
+    try:
+        return jsonify(agent_brain.prompt_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/prefetch/stats', methods=['GET'])
+def get_prefetch_stats():
+    """Speculative prefetch counters: calls, hits, wasted calls and budget skips"""
+    try:
+        return jsonify(agent_brain.prefetch_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/distilled/stats', methods=['GET'])
+def get_distilled_stats():
+    """Distilled policy counters: model calls saved, escalations and agreement with Gemini"""
+    try:
+        return jsonify(agent_brain.distilled_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/gateway/stats', methods=['GET'])
+def get_gateway_stats():
+    """Model gateway counters: calls, coalesced (singleflight), queued for quota and shed to the mock policy"""
+    try:
+        return jsonify(agent_brain.gateway.stats() if agent_brain.gateway else {"enabled": False})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
+@app.route('/api/breaker', methods=['GET'])
+def get_breaker_stats():
+    """
+    Model circuit breaker in this worker: state, rolling failure rate and
+    latency percentiles, thresholds, counters and recent state transitions
+    """
+    try:
+        return jsonify(agent_brain.breaker.stats() if agent_brain.breaker else {"enabled": False})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus-format latency histograms and counters for this worker"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/reflect', methods=['POST'])
 def reflect_on_battle():
     """
     Post-battle reflection endpoint
-    AI analyzes what happened and updates memory
+    Queues the reflection and returns a job id right away; poll
+    GET /api/reflect/<job_id> for the lesson
     """
     try:
         data = request.json
 
         battle_data = data.get('battle_data', {})
+        battle_data.setdefault('player', _player_id(data))
         outcome = data.get('outcome', 'unknown')
 
-        # Generate reflection
-        reflection = agent_brain.reflect(battle_data, outcome)
+        # Reflect in the background
+        job = reflection_queue.submit(battle_data, outcome)
+
+        return jsonify({"job_id": job.id, "status": job.status}), 202
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/reflect/<job_id>', methods=['GET'])
+def get_reflection(job_id):
+    """
+    Reflection job status
+    With ?wait=<seconds> the request long-polls until the job finishes;
+    200 with the reflection once done, 202 while still queued or running
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_REFLECTION_WAIT)
+        job = reflection_queue.wait(job_id, wait) if wait > 0 else reflection_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "Unknown or expired reflection job"}), 404
 
-        return jsonify(reflection)
+        return jsonify(job), 200 if job['status'] in ('done', 'failed') else 202
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/reflect/stats', methods=['GET'])
+def get_reflection_stats():
+    """Reflection queue counters: jobs submitted, model batches, coalesced jobs and failures"""
+    return jsonify(dict(reflection_queue.stats, pending=reflection_queue.pending()))
+
 @app.route('/api/memory', methods=['GET'])
 def get_memory():
-    """Get agent's memory history"""
+    """
+    Get a player's memory history, one page at a time
+    ?limit= lessons (50 by default, at most 500) ending before the ?before= cursor,
+    optionally only those against ?enemy=; next_before fetches the page before
+    """
     try:
-        memory = agent_brain.get_memory()
-        return jsonify({"memory": memory})
+        player = _player_id()
+        limit = max(0, min(int(request.args.get('limit', 50)), MAX_MEMORY_PAGE))
+        before = request.args.get('before')
+        memory, next_before = agent_brain.get_memory(
+            player, limit, int(before) if before else None, request.args.get('enemy')
+        )
+        return jsonify({
+            "player": player,
+            "memory": memory,
+            "total": agent_brain.memory_count(player),
+            "next_before": next_before
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -85,32 +456,74 @@ def save_memory():
         data = request.json
         memory_entry = data.get('memory', '')
 
-        agent_brain.add_memory(memory_entry)
+        agent_brain.add_memory(memory_entry, enemy=data.get('enemy'), biome=data.get('biome'), player=_player_id(data))
 
         return jsonify({"status": "saved", "memory": memory_entry})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/memory/recall', methods=['GET'])
+def recall_memory():
+    """Lessons the prompt would recall for ?enemy=, ?biome= and a ?strategy= text"""
+    try:
+        player = _player_id()
+        lessons = agent_brain.recall(
+            request.args.get('enemy'), request.args.get('biome'), request.args.get('strategy', ''), player
+        )
+        return jsonify({"lessons": lessons, "indexed": len(agent_brain.memory_index(player))})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _cached_response(cached):
+    """
+    Serve pre-serialized bytes, or a bare 304 if the client already holds them
+    Compressed bodies are built once per content coding and get their own ETag
+    """
+    body, headers = cached.body, cached.headers
+    encoding = wire_format.pick_encoding(request.accept_encodings)
+    if encoding is not None and len(cached.body) >= wire_format.MIN_COMPRESS_BYTES:
+        if encoding not in cached.encoded:
+            cached.encoded[encoding] = (wire_format.compress(cached.body, encoding), dict(
+                cached.headers,
+                ETag=f'"{cached.etag}-{encoding}"',
+                Vary='Accept-Encoding'
+            ))
+        body, headers = cached.encoded[encoding]
+        headers = dict(headers, **{"Content-Encoding": encoding})
+
+    if request.if_none_match.contains(headers["ETag"].strip('"')):
+        return Response(status=304, headers={k: v for k, v in headers.items() if k != 'Content-Encoding'})
+    return Response(body, mimetype='application/json', headers=headers)
+
 @app.route('/api/world/biome', methods=['GET'])
 def get_biome_info():
     """Get information about a specific biome"""
     try:
         biome_name = request.args.get('name', 'RooSanctum')
-        biome_info = world_state.get_biome(biome_name)
-        return jsonify(biome_info)
+        return _cached_response(world_state.biome_response(biome_name))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/world/enemies', methods=['GET'])
 def get_enemy_types():
-    """Get all enemy types and their characteristics"""
+    """
+    Get all enemy types and their characteristics
+    Optional filters: ?biome=, ?min_/max_aggression, ?min_/max_health, ?min_/max_intelligence
+    """
     try:
-        enemies = world_state.get_enemy_types()
-        return jsonify({"enemies": enemies})
+        ranges = {
+            name: request.args.get(name, type=float)
+            for name in ('min_aggression', 'max_aggression', 'min_health', 'max_health',
+                         'min_intelligence', 'max_intelligence')
+        }
+        return _cached_response(world_state.enemies_response(request.args.get('biome'), **ranges))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
     print("🦘 Starting Hollow Zoo AI Backend...")
     print("🧠 Gemini AI integration active")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; production runs gunicorn -c gunicorn.conf.py app:app
+    debug = os.environ.get('FLASK_DEBUG', 'True').lower() in ('1', 'true', 'yes')
+    agent_brain.warm_up()
+    app.run(debug=debug, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
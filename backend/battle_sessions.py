@@ -0,0 +1,188 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class BattleSession:
+    """
+    Server-side state for one battle
+    The prompt, memory and enemy info are sent once; ticks only send changed fields
+    """
+
+    def __init__(self, session_id, user_prompt, memory, enemy_info, environment, player=None):
+        self.id = session_id
+        self.player = player
+        self.user_prompt = user_prompt
+        self.memory = memory
+        self.enemy_info = enemy_info
+        self.agent = {}
+        self.enemy = {
+            "type": enemy_info.get('type', 'Unknown'),
+            "health": enemy_info.get('health', 100)
+        }
+        self.environment = dict(environment or {})
+        self.ticks = 0
+        self.created_at = time.time()
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+        self.seq = 0               # last shared-store delta merged
+        self.touched = time.monotonic()  # last shared-store lifetime refresh
+
+    def apply(self, delta):
+        """Merge one tick's changed fields and return snapshots of the full state"""
+        with self.lock:
+            self._merge(delta)
+            return self._snapshot()
+
+    def _merge(self, delta):
+        self.agent.update(delta.get('agent') or {})
+        self.enemy.update(delta.get('enemy') or {})
+        self.environment.update(delta.get('environment') or {})
+        if 'user_prompt' in delta:
+            self.user_prompt = delta['user_prompt']
+        if 'memory' in delta:
+            self.memory = delta['memory']
+        self.ticks += 1
+
+    def _snapshot(self):
+        return dict(self.agent), dict(self.enemy), dict(self.environment)
+
+    def to_state(self):
+        """Everything needed to rebuild the session in another worker"""
+        with self.lock:
+            return {
+                "id": self.id,
+                "player": self.player,
+                "user_prompt": self.user_prompt,
+                "memory": self.memory,
+                "enemy_info": self.enemy_info,
+                "agent": self.agent,
+                "enemy": self.enemy,
+                "environment": self.environment,
+                "ticks": self.ticks,
+                "created_at": self.created_at
+            }
+
+    @classmethod
+    def from_state(cls, state):
+        session = cls(state['id'], state['user_prompt'], state['memory'], state['enemy_info'], state['environment'],
+                      state.get('player'))
+        session.agent = state['agent']
+        session.enemy = state['enemy']
+        session.ticks = state['ticks']
+        session.created_at = state['created_at']
+        return session
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "enemy": self.enemy_info,
+            "ticks": self.ticks,
+            "created_at": self.created_at
+        }
+
+
+# Fields of a tick that change the session (the rest is per-request)
+DELTA_FIELDS = ('agent', 'enemy', 'environment', 'user_prompt', 'memory')
+
+
+class SessionStore:
+    """
+    Bounded in-process store of battle sessions
+    Sessions are kept in least-recently-used order and evicted when idle.
+    With a SharedStore the session is written there once when opened, and
+    each tick appends only its changed fields to the session's log there.
+    A worker catches up on other workers' ticks before applying its own,
+    and numbered log records make concurrent ticks queue up rather than
+    overwrite each other, so consecutive ticks may land on any worker
+    """
+
+    def __init__(self, max_sessions=1024, idle_timeout=300.0, shared=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.shared = shared
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, user_prompt, memory, enemy_info, environment=None, player=None):
+        """Create a session and return it"""
+        session = BattleSession(uuid.uuid4().hex, user_prompt, memory, enemy_info, environment, player)
+        if self.shared:
+            self.shared.put('session', session.id, session.to_state(), self.idle_timeout)
+        self._keep(session)
+        return session
+
+    def get(self, session_id):
+        """Return a live session (refreshing its idle timer), or None"""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_seen = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                return session
+
+        # Opened by (or evicted from) this worker: rebuild it from the shared store
+        state = self.shared.get('session', session_id) if self.shared else None
+        if state is None:
+            return None
+        session = BattleSession.from_state(state)
+        self._catch_up(session)
+        return self._keep(session)
+
+    def apply(self, session, delta):
+        """Merge one tick's changed fields into a session and return snapshots of the full state"""
+        if not self.shared:
+            return session.apply(delta)
+
+        record = {field: delta[field] for field in DELTA_FIELDS if field in delta}
+        with session.lock:
+            while True:
+                self._catch_up(session)
+                if self.shared.append('session', session.id, session.seq + 1, record):
+                    break
+            session.seq += 1
+            session._merge(record)
+
+            now = time.monotonic()
+            if now - session.touched > self.idle_timeout / 4:
+                self.shared.touch('session', session.id, self.idle_timeout)
+                session.touched = now
+            return session._snapshot()
+
+    def close(self, session_id):
+        """Drop a session; returns False if it was already gone"""
+        with self._lock:
+            closed = self._sessions.pop(session_id, None) is not None
+        if self.shared:
+            closed = self.shared.delete('session', session_id) or closed
+        return closed
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _keep(self, session):
+        """Add a session to the LRU (or return the copy another thread added first)"""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.setdefault(session.id, session)
+            self._sessions.move_to_end(session.id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def _catch_up(self, session):
+        """Merge the ticks other workers logged since this copy last looked"""
+        for seq, record in self.shared.read_log('session', session.id, session.seq):
+            session._merge(record)
+            session.seq = seq
+
+    def _evict_idle(self):
+        # Oldest sessions sit at the front, so stop at the first live one
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_seen >= cutoff:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,258 @@
+"""
+Headless battle simulator for tuning commander prompts and the mock brain.
+
+Steps thousands of RooKnight-vs-enemy duels at once as NumPy arrays (one
+lane per battle) using enemy stats from WorldState and the decision
+prompt's action set, then reports win rate, time-to-kill and damage
+distributions per enemy.
+
+    python battle_sim.py --battles 20000
+    python battle_sim.py --enemy "Rex, Lion Regent" --battles 50000 --json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from policy_engine import ACTIONS, ENEMY_STATES, PolicyEngine
+from world_state import WorldState
+
+ATTACK, JUMP_ATTACK, DODGE, BLOCK, RETREAT, MOVE_CLOSER, MOVE_AWAY, WAIT_AND_OBSERVE = range(len(ACTIONS))
+IDLE, MOVING, ATTACKING, OBSERVING, CIRCLING = range(len(ENEMY_STATES))
+
+# Combat constants mirrored from frontend/config.js and the entity classes
+PLAYER_HEALTH = 85
+PLAYER_SPEED = 260
+PLAYER_DAMAGE = 22
+CRIT_MULTIPLIER = 1.35
+JUMP_MULTIPLIER = 1.6
+BLOCK_REDUCTION = 0.35
+DODGE_REDUCTION = 0.3
+AERIAL_COOLDOWN = 3.8
+SPAWN_DISTANCE = 300
+ARENA_SPAN = 900  # arena width minus the corner margins on both sides
+MIN_SEPARATION = 5
+ENEMY_SPEED = 100
+ENEMY_ATTACK_COOLDOWN = 1.5
+ENEMY_DAMAGE_VARIANCE = 6
+ENEMY_DAMAGE = {
+    "Nyx, Owl Warden": 18,
+    "Vey, Serpent Matron": 22,
+    "Oran, Leviathan Seal": 27,
+    "Maul, Briar Bear": 32,
+    "Rex, Lion Regent": 38
+}
+DEFAULT_ENEMY_DAMAGE = 18
+
+
+MOCK_POLICY = PolicyEngine()
+
+
+def mock_policy(agent_hp, enemy_hp, distance, enemy_state, rng):
+    """The mock brain's rule table in batch mode: arrays of states -> action codes"""
+    return MOCK_POLICY.evaluate_batch(agent_hp, enemy_hp, distance, enemy_state, rng=rng)
+
+
+def _step_towards(position, target, stride):
+    """Move positions `stride` units towards (negative: away from) a target inside the arena"""
+    direction = np.where(target >= position, 1.0, -1.0)
+    gap = np.abs(target - position)
+    stride = np.minimum(stride, np.maximum(gap - MIN_SEPARATION, 0))
+    position = np.clip(position + direction * stride, 0, ARENA_SPAN)
+    return position, np.abs(target - position)
+
+
+def simulate(enemy_stats, battles=10000, policy=mock_policy, seed=None, tick_seconds=0.8, max_seconds=90.0):
+    """
+    Run `battles` duels against one enemy in lock-step
+    Returns per-lane outcome arrays and the action histogram
+    """
+    rng = np.random.default_rng(seed)
+    n = battles
+
+    enemy_max = float(enemy_stats.get('health', 100))
+    aggression = np.full(n, enemy_stats.get('aggression', 50) / 100.0)
+    intelligence = enemy_stats.get('intelligence', 50) / 100.0
+    base_damage = np.full(n, float(ENEMY_DAMAGE.get(enemy_stats.get('type'), DEFAULT_ENEMY_DAMAGE)))
+
+    agent_hp = np.full(n, float(PLAYER_HEALTH))
+    enemy_hp = np.full(n, enemy_max)
+    agent_x = np.full(n, (ARENA_SPAN - SPAWN_DISTANCE) / 2.0)
+    enemy_x = agent_x + SPAWN_DISTANCE
+    distance = np.full(n, float(SPAWN_DISTANCE))
+    enemy_state = np.full(n, IDLE, dtype=np.int8)
+    enemy_cooldown = np.zeros(n)
+    aerial_cooldown = np.zeros(n)
+    frenzy = np.zeros(n, dtype=bool)
+
+    damage_taken = np.zeros(n)
+    damage_dealt = np.zeros(n)
+    finished_at = np.full(n, np.nan)
+    active = np.ones(n, dtype=bool)
+    action_counts = np.zeros(len(ACTIONS), dtype=np.int64)
+
+    max_ticks = int(max_seconds / tick_seconds)
+    for tick in range(max_ticks):
+        if not active.any():
+            break
+
+        # RooKnight acts on the policy's decision
+        action = policy(agent_hp, enemy_hp, distance, enemy_state, rng)
+        action = np.where(active, action, WAIT_AND_OBSERVE)
+        action_counts += np.bincount(action[active], minlength=len(ACTIONS))
+
+        # A jump attack on cooldown degrades to a grounded strike
+        action = np.where((action == JUMP_ATTACK) & (aerial_cooldown > 0), ATTACK, action)
+
+        is_attack = action == ATTACK
+        is_jump = action == JUMP_ATTACK
+        stride = np.select(
+            [is_attack, is_jump, action == MOVE_CLOSER, (action == RETREAT) | (action == MOVE_AWAY), action == DODGE],
+            [
+                np.clip(distance * 2, 180, PLAYER_SPEED * 1.4) * 0.14,
+                PLAYER_SPEED * 0.2,
+                PLAYER_SPEED * 0.7 * 0.4,
+                -PLAYER_SPEED * 0.5,
+                rng.choice([-72.0, 72.0], n)
+            ],
+            default=0.0
+        )
+        agent_x, distance = _step_towards(agent_x, enemy_x, stride)
+
+        crit = (distance < 50) & (rng.random(n) < 0.4)
+        strike = np.where(is_attack & (distance < 85), PLAYER_DAMAGE * np.where(crit, CRIT_MULTIPLIER, 1.0), 0.0)
+        strike += np.where(is_jump & (distance < 90), PLAYER_DAMAGE * JUMP_MULTIPLIER, 0.0)
+        strike = np.minimum(strike, enemy_hp) * active
+        enemy_hp -= strike
+        damage_dealt += strike
+        aerial_cooldown = np.where(is_jump, AERIAL_COOLDOWN, np.maximum(aerial_cooldown - tick_seconds, 0))
+
+        # Enemies below 35% health enter frenzy: harder hits, more aggression
+        enter_frenzy = ~frenzy & (enemy_hp < enemy_max * 0.35)
+        base_damage = np.where(enter_frenzy, base_damage * 1.2, base_damage)
+        aggression = np.where(enter_frenzy, np.minimum(aggression + 0.2, 1.0), aggression)
+        frenzy |= enter_frenzy
+
+        # Enemy AI (Kangaroo.updateAI); smarter enemies hold strikes into a raised guard
+        guarded = (action == BLOCK) | (action == DODGE)
+        can_strike = (distance < 60) & (enemy_cooldown <= 0)
+        holds = guarded & (rng.random(n) < intelligence * 0.5)
+        strikes = can_strike & ~holds & (enemy_hp > 0)
+        advances = ~strikes & ((distance > 200) | ((distance > 100) & (rng.random(n) < aggression)))
+
+        hit = strikes & (distance < 90)
+        reduction = np.where(action == BLOCK, BLOCK_REDUCTION, np.where(action == DODGE, DODGE_REDUCTION, 1.0))
+        incoming = np.where(hit, (base_damage + rng.random(n) * ENEMY_DAMAGE_VARIANCE) * reduction, 0.0)
+        incoming = np.minimum(incoming, agent_hp) * active
+        agent_hp -= incoming
+        damage_taken += incoming
+
+        enemy_stride = np.select([strikes, advances], [ENEMY_SPEED * 1.5 * 0.4, ENEMY_SPEED * tick_seconds], default=0.0)
+        enemy_x, distance = _step_towards(enemy_x, agent_x, enemy_stride)
+        enemy_cooldown = np.where(strikes, ENEMY_ATTACK_COOLDOWN, np.maximum(enemy_cooldown - tick_seconds, 0))
+        enemy_state = np.select(
+            [strikes, advances, distance > 100],
+            [ATTACKING, MOVING, OBSERVING],
+            default=CIRCLING
+        ).astype(np.int8)
+
+        ended = active & ((agent_hp <= 0) | (enemy_hp <= 0))
+        finished_at[ended] = (tick + 1) * tick_seconds
+        active &= ~ended
+
+    return {
+        "won": enemy_hp <= 0,
+        "lost": agent_hp <= 0,
+        "finished_at": finished_at,
+        "damage_taken": damage_taken,
+        "damage_dealt": damage_dealt,
+        "action_counts": action_counts
+    }
+
+
+def summarize(result):
+    """Win rate, time-to-kill and damage distributions for one enemy"""
+    won = result['won']
+    battles = len(won)
+
+    def distribution(values):
+        if len(values) == 0:
+            return None
+        p10, p50, p90 = np.percentile(values, [10, 50, 90])
+        return {
+            "mean": round(float(values.mean()), 2),
+            "p10": round(float(p10), 2),
+            "p50": round(float(p50), 2),
+            "p90": round(float(p90), 2)
+        }
+
+    actions = result['action_counts']
+    return {
+        "battles": battles,
+        "win_rate": round(float(won.mean()), 4),
+        "loss_rate": round(float(result['lost'].mean()), 4),
+        "timeout_rate": round(float((~won & ~result['lost']).mean()), 4),
+        "time_to_kill": distribution(result['finished_at'][won]),
+        "damage_taken": distribution(result['damage_taken']),
+        "damage_dealt": distribution(result['damage_dealt']),
+        "actions": {
+            action: round(float(count) / max(int(actions.sum()), 1), 4)
+            for action, count in zip(ACTIONS, actions)
+        }
+    }
+
+
+def run(enemy_names=None, battles=10000, seed=None, tick_seconds=0.8):
+    """Simulate every requested enemy and return the report plus throughput"""
+    world = WorldState()
+    enemy_names = enemy_names or list(world.get_enemy_types())
+
+    report = {}
+    total_battles = 0
+    started = time.perf_counter()
+    for index, name in enumerate(enemy_names):
+        result = simulate(
+            world.get_enemy_info(name),
+            battles=battles,
+            seed=None if seed is None else seed + index,
+            tick_seconds=tick_seconds
+        )
+        report[name] = summarize(result)
+        total_battles += battles
+    elapsed = time.perf_counter() - started
+
+    return {
+        "enemies": report,
+        "battles": total_battles,
+        "seconds": round(elapsed, 3),
+        "battles_per_second": round(total_battles / elapsed) if elapsed else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless HollowZoo battle simulator")
+    parser.add_argument('--enemy', action='append', help="Enemy type to simulate (repeatable, default: all)")
+    parser.add_argument('--battles', type=int, default=10000, help="Battles per enemy")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--tick-ms', type=int, default=800, help="AI decision interval in ms")
+    parser.add_argument('--json', action='store_true', help="Print the raw JSON report")
+    args = parser.parse_args()
+
+    report = run(args.enemy, args.battles, args.seed, args.tick_ms / 1000.0)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"🦘 {report['battles']} battles in {report['seconds']}s ({report['battles_per_second']} battles/s)")
+    for name, stats in report['enemies'].items():
+        ttk = stats['time_to_kill'] or {}
+        print(f"\n⚔️  {name}")
+        print(f"   win {stats['win_rate']:.1%}  loss {stats['loss_rate']:.1%}  timeout {stats['timeout_rate']:.1%}")
+        print(f"   time-to-kill p50 {ttk.get('p50', '-')}s  p90 {ttk.get('p90', '-')}s")
+        print(f"   damage taken p50 {stats['damage_taken']['p50']}  dealt p50 {stats['damage_dealt']['p50']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+Load test for the HollowZoo backend.
+
+Drives /api/decide (JSON or the binary wire format), /api/reflect, /api/memory and /api/world/* from a pool
+of keep-alive HTTP clients and reports requests/s and latency percentiles
+per endpoint. By default it serves the app in-process (threaded WSGI server,
+temporary memory journal and shared store) backed by the fake Gemini model,
+so runs are repeatable on a laptop and cost no API quota.
+
+    python benchmark.py --concurrency 16 --duration 10
+    python benchmark.py --latency-ms 800 --error-rate 0.05 --json
+    python benchmark.py --url http://localhost:5000   # a running server (e.g. GEMINI_FAKE=1 gunicorn ...)
+"""
+import os
+import json
+import time
+import logging
+import random
+import argparse
+import tempfile
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import wire_format
+
+ENEMIES = ["Nyx, Owl Warden", "Vey, Serpent Matron", "Oran, Leviathan Seal", "Maul, Briar Bear", "Rex, Lion Regent"]
+ENEMY_STATES = ["idle", "moving", "attacking", "observing", "circling"]
+PROMPTS = ["Be aggressive and press the attack", "Stay defensive, dodge and counter", "Play smart: observe, then strike"]
+
+# Share of requests per scenario; decisions dominate real traffic
+DEFAULT_MIX = {
+    "decide": 70,
+    "decide_plan": 10,
+    "reflect": 3,
+    "memory_get": 7,
+    "memory_post": 2,
+    "world_biome": 4,
+    "world_enemies": 4,
+    "decide_binary": 0  # opt-in via --only, then weighted like "decide" for a side-by-side
+}
+
+
+def _decide_body(rng, mode='action'):
+    return {
+        "agent": {"health": rng.randint(5, 100), "energy": rng.randint(0, 100), "onGround": True},
+        "enemy": {
+            "type": rng.choice(ENEMIES),
+            "health": rng.randint(5, 100),
+            "distance": rng.uniform(0, 400),
+            "state": rng.choice(ENEMY_STATES)
+        },
+        "environment": {"zone": "RooSanctum"},
+        "user_prompt": rng.choice(PROMPTS),
+        "memory": ["Block before countering heavy strikes"],
+        "mode": mode
+    }
+
+
+def scenario_request(name, rng):
+    """(method, path, body) for one request of a scenario"""
+    if name == "decide":
+        return "POST", "/api/decide", _decide_body(rng)
+    if name == "decide_plan":
+        return "POST", "/api/decide", _decide_body(rng, 'plan')
+    if name == "decide_binary":
+        return "POST", "/api/decide", wire_format.encode_state(_decide_body(rng))
+    if name == "reflect":
+        return "POST", "/api/reflect", {
+            "battle_data": {
+                "enemy_type": rng.choice(ENEMIES),
+                "duration": rng.randint(10, 90),
+                "damage_taken": rng.randint(0, 85),
+                "damage_dealt": rng.randint(0, 200),
+                "actions": ["ATTACK", "DODGE", "BLOCK"]
+            },
+            "outcome": rng.choice(["victory", "defeat"])
+        }
+    if name == "memory_get":
+        return "GET", "/api/memory", None
+    if name == "memory_post":
+        return "POST", "/api/memory", {"memory": f"Benchmark lesson {rng.randint(0, 1000)}"}
+    if name == "world_biome":
+        return "GET", "/api/world/biome?name=RooSanctum", None
+    if name == "world_enemies":
+        return "GET", "/api/world/enemies", None
+    raise ValueError(f"Unknown scenario {name!r}")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Client:
+    """One keep-alive HTTP connection"""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {"Accept-Encoding": "gzip"}
+        if isinstance(body, bytes):
+            payload = body
+            headers.update({"Content-Type": wire_format.STATE_MIMETYPE, "Accept": wire_format.DECISION_MIMETYPE})
+        elif body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        else:
+            payload = None
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status
+        except Exception:
+            self.conn.close()
+            self.conn = None
+            raise
+
+
+def run_load(base_url, concurrency=16, duration=10.0, mix=None, seed=None, warmup=1.0):
+    """Hammer base_url with the scenario mix; returns per-scenario latencies and errors"""
+    mix = mix or DEFAULT_MIX
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+
+    results = {name: {"latencies": [], "errors": 0} for name in names}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def worker(index):
+        rng = random.Random(None if seed is None else seed + index)
+        client = Client(base_url)
+        local = {name: {"latencies": [], "errors": 0} for name in names}
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            method, path, body = scenario_request(name, rng)
+            t0 = time.perf_counter()
+            try:
+                ok = client.request(method, path, body) < 500
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - t0
+            if t0 < measure_from:
+                continue
+            if ok:
+                local[name]["latencies"].append(elapsed)
+            else:
+                local[name]["errors"] += 1
+
+        with lock:
+            for name, result in local.items():
+                results[name]["latencies"].extend(result["latencies"])
+                results[name]["errors"] += result["errors"]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+
+    return summarize(results, duration)
+
+
+def summarize(results, duration):
+    """Requests/s and latency percentiles (ms) per scenario and overall"""
+    report = {}
+    everything = []
+    errors = 0
+    for name, result in results.items():
+        latencies = sorted(result["latencies"])
+        everything.extend(latencies)
+        errors += result["errors"]
+        report[name] = _stats(latencies, result["errors"], duration)
+    report["total"] = _stats(sorted(everything), errors, duration)
+    return report
+
+
+def _stats(latencies, errors, duration):
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p90_ms": ms(percentile(latencies, 0.90)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None)
+    }
+
+
+def serve_in_process(args):
+    """Start the app on a free local port with the fake model; returns (base_url, server)"""
+    workdir = tempfile.mkdtemp(prefix='hollowzoo-bench-')
+    os.environ['MEMORY_JOURNAL_PATH'] = os.path.join(workdir, 'memory.jsonl')
+    os.environ['MEMORY_DB_PATH'] = os.path.join(workdir, 'memory.db')
+    os.environ['SHARED_STORE_PATH'] = os.path.join(workdir, 'shared_state.db')
+    os.environ['DECISION_LOG_PATH'] = os.path.join(workdir, 'decision_log.jsonl')
+    os.environ['DISTILLED_POLICY_PATH'] = args.distilled or ''
+    os.environ['GEMINI_FAKE'] = '0' if args.mock else '1'
+    os.environ['GEMINI_FAKE_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['GEMINI_FAKE_MALFORMED_RATE'] = str(args.malformed_rate)
+    os.environ['GEMINI_FAKE_ERROR_RATE'] = str(args.error_rate)
+    if args.mock:
+        os.environ['GEMINI_API_KEY'] = ''
+    if args.seed is not None:
+        os.environ['GEMINI_FAKE_SEED'] = str(args.seed)
+        os.environ['MOCK_POLICY_SEED'] = str(args.seed)
+
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HollowZoo backend load test")
+    parser.add_argument('--url', help="Benchmark a running server instead of an in-process one")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent keep-alive clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Unmeasured seconds before measuring")
+    parser.add_argument('--only', action='append', choices=list(DEFAULT_MIX), help="Scenario to run (repeatable)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--latency-ms', type=float, default=400.0, help="Fake Gemini median latency")
+    parser.add_argument('--malformed-rate', type=float, default=0.03, help="Fake Gemini malformed JSON rate")
+    parser.add_argument('--error-rate', type=float, default=0.01, help="Fake Gemini error rate")
+    parser.add_argument('--mock', action='store_true', help="Use the mock brain instead of the fake model")
+    parser.add_argument('--distilled', help="Distilled policy table to serve with (default: none)")
+    parser.add_argument('--json', action='store_true', help="Print the raw JSON report")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        base_url, server = serve_in_process(args)
+
+    mix = {name: DEFAULT_MIX[name] or DEFAULT_MIX["decide"] for name in args.only} if args.only else DEFAULT_MIX
+    report = run_load(base_url, args.concurrency, args.duration, mix, args.seed, args.warmup)
+
+    if server is not None:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"🏋️  {args.concurrency} clients for {args.duration:.0f}s against {base_url}")
+    print(f"{'endpoint':<15}{'req/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for name, stats in report.items():
+        print(f"{name:<15}{stats['rps']:>9}{str(stats['p50_ms']):>10}{str(stats['p90_ms']):>10}"
+              f"{str(stats['p99_ms']):>10}{str(stats['max_ms']):>10}{stats['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
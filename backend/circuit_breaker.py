@@ -0,0 +1,184 @@
+import time
+import threading
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Breaker state as a gauge value
+STATE_VALUES = {CLOSED: 0.0, HALF_OPEN: 0.5, OPEN: 1.0}
+
+
+class CircuitOpen(Exception):
+    """A model call refused because the breaker is open"""
+
+
+def _quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Latency-aware circuit breaker for model calls (per worker process)
+    Closed, it watches a rolling window of calls: when at least min_calls
+    have completed and the failure rate (errors plus unparseable answers)
+    reaches error_rate, or the latency_quantile latency reaches latency_s,
+    it opens. Open, every call is refused (callers fall back to the mock
+    policy) for open_seconds, doubled on each failed recovery up to
+    max_open_seconds. Then it goes half-open and admits `probes` trial
+    calls one at a time; all fast, successful and parseable closes it,
+    any failure opens it again
+    """
+
+    def __init__(self, window=30.0, min_calls=10, error_rate=0.5, latency_s=1.5, latency_quantile=0.9,
+                 open_seconds=10.0, max_open_seconds=120.0, probes=3, history=50):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency_s = latency_s
+        self.latency_quantile = latency_quantile
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.probes = probes
+        self.state = CLOSED
+        self.open_seconds = open_seconds
+        self.opened_until = 0.0
+        self.counts = {"calls": 0, "failures": 0, "parse_failures": 0, "refused": 0, "probes": 0, "trips": 0}
+        self.history = deque(maxlen=history)
+        self._calls = deque()           # (finished at, latency, failed)
+        self._parse_failures = deque()  # finished at
+        self._probing = False
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Admit one model call; returns True when it is a half-open probe
+        Raises CircuitOpen while open, or while another probe is in flight
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() >= self.opened_until:
+                self._transition(HALF_OPEN, "cool-down over, probing")
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self.counts['probes'] += 1
+                return True
+            self.counts['refused'] += 1
+            raise CircuitOpen(f"Model circuit {self.state.replace('_', '-')}")
+
+    def release(self, probe):
+        """An admitted call that never reached the model (e.g. shed for quota)"""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def record(self, latency, failed, probe=False):
+        """The outcome of an admitted call: its latency and whether it raised"""
+        now = time.monotonic()
+        slow = latency >= self.latency_s
+        with self._lock:
+            self.counts['calls'] += 1
+            self.counts['failures'] += int(failed)
+            self._calls.append((now, latency, failed))
+
+            if probe:
+                self._probing = False
+                if self.state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+                    reason = "probe failed" if failed else f"probe took {latency * 1000:.0f}ms"
+                    self._open(reason, now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self._calls.clear()
+                    self._parse_failures.clear()
+                    self.open_seconds = self.base_open_seconds
+                    self._transition(CLOSED, f"{self.probes} probes succeeded")
+                return
+
+            if self.state == CLOSED:
+                self._check(now)
+
+    def record_parse_failure(self):
+        """A model answer that could not be parsed (counted against the failure rate)"""
+        now = time.monotonic()
+        with self._lock:
+            self.counts['parse_failures'] += 1
+            self._parse_failures.append(now)
+            if self.state == HALF_OPEN:
+                # Answered, but with garbage: the probe failed after all
+                self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+                self._open("probe answer unparseable", now)
+            elif self.state == CLOSED:
+                self._check(now)
+
+    def _check(self, now):
+        self._expire(now)
+        calls = len(self._calls)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for _, _, failed in self._calls if failed) + len(self._parse_failures)
+        if failures / calls >= self.error_rate:
+            self._open(f"failure rate {failures / calls:.0%} over {calls} calls", now)
+            return
+        latency = _quantile([latency for _, latency, _ in self._calls], self.latency_quantile)
+        if latency >= self.latency_s:
+            self._open(f"p{self.latency_quantile * 100:.0f} latency {latency * 1000:.0f}ms over {calls} calls", now)
+
+    def _open(self, reason, now):
+        self.counts['trips'] += 1
+        self.opened_until = now + self.open_seconds
+        self._transition(OPEN, reason)
+
+    def _transition(self, state, reason):
+        self.history.append({"ts": round(time.time(), 3), "from": self.state, "to": state, "reason": reason})
+        print(f"🔌 Model circuit {self.state} -> {state}: {reason}")
+        self.state = state
+        self._probe_successes = 0
+
+    def _expire(self, now):
+        horizon = now - self.window
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+        while self._parse_failures and self._parse_failures[0] < horizon:
+            self._parse_failures.popleft()
+
+    def stats(self):
+        """State, rolling-window rates and percentiles, and recent transitions"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            latencies = [latency for _, latency, _ in self._calls]
+            calls = len(latencies)
+            failures = sum(1 for _, _, failed in self._calls if failed) + len(self._parse_failures)
+            state = self.state
+            if state == OPEN and now >= self.opened_until:
+                state = HALF_OPEN  # the next call will probe
+            return {
+                "state": state,
+                "open_for": round(max(self.opened_until - now, 0.0), 3) if state == OPEN else 0.0,
+                "open_seconds": self.open_seconds,
+                "window": {
+                    "seconds": self.window,
+                    "calls": calls,
+                    "failure_rate": round(min(failures / calls, 1.0), 3) if calls else None,
+                    "p50_ms": round(_quantile(latencies, 0.5) * 1000, 1) if calls else None,
+                    "p90_ms": round(_quantile(latencies, 0.9) * 1000, 1) if calls else None,
+                    "p99_ms": round(_quantile(latencies, 0.99) * 1000, 1) if calls else None
+                },
+                "thresholds": {
+                    "min_calls": self.min_calls,
+                    "error_rate": self.error_rate,
+                    "latency_ms": self.latency_s * 1000,
+                    "latency_quantile": self.latency_quantile,
+                    "probes": self.probes
+                },
+                "counts": dict(self.counts),
+                "history": list(self.history)
+            }
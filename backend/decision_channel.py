@@ -0,0 +1,79 @@
+import json
+import threading
+
+
+class DecisionChannel:
+    """
+    One persistent decision connection (WebSocket)
+    State frames come up tagged with a tick id and decisions go back with
+    the same tick. Work for a tick that has been superseded before it starts
+    is skipped, and a finished decision is dropped if a newer tick has
+    already been answered, so a slow model call never delays the next one.
+    """
+
+    def __init__(self, ws, prepare, decide, executor):
+        self.ws = ws
+        self.prepare = prepare
+        self.decide = decide
+        self.executor = executor
+
+        self.latest_received = -1
+        self.latest_sent = -1
+        self.dropped = 0
+        self._send_lock = threading.Lock()
+
+    def run(self):
+        """Read frames until the client disconnects"""
+        while True:
+            raw = self.ws.receive()
+            if raw is None:
+                break
+
+            try:
+                frame = json.loads(raw)
+                tick = frame['tick']
+                if not isinstance(tick, int):
+                    raise ValueError("tick must be an integer")
+            except (ValueError, KeyError, TypeError) as e:
+                with self._send_lock:
+                    self._write({"error": f"Invalid frame: {e}"})
+                continue
+
+            # Ticks must increase; anything older than what we have is already stale
+            if tick <= self.latest_received:
+                self.dropped += 1
+                continue
+            self.latest_received = tick
+
+            try:
+                # Prepare on the reader thread so session deltas apply in order
+                args = self.prepare(frame)
+            except Exception as e:
+                with self._send_lock:
+                    self._write({"tick": tick, "error": str(e)})
+                continue
+
+            self.executor.submit(self._answer, tick, args)
+
+    def _answer(self, tick, args):
+        if tick < self.latest_received:
+            self.dropped += 1
+            return
+
+        try:
+            payload = {"tick": tick, "decision": self.decide(**args)}
+        except Exception as e:
+            payload = {"tick": tick, "error": str(e)}
+
+        with self._send_lock:
+            if tick < self.latest_sent:
+                self.dropped += 1
+                return
+            self.latest_sent = tick
+            self._write(payload)
+
+    def _write(self, payload):
+        try:
+            self.ws.send(json.dumps(payload))
+        except Exception as e:
+            print(f"Decision channel send failed: {e}")
@@ -0,0 +1,107 @@
+import json
+
+
+class DecisionStreamParser:
+    """
+    Incremental scanner for a JSON decision streamed chunk by chunk
+    feed() returns the top-level scalar fields ("action", "confidence", ...)
+    each chunk completes, so the action can be acted on while the model is
+    still writing its reasoning. Text before the first "{" (code fences)
+    is skipped and nested objects or arrays are stepped over
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self._chunks = []
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._expect = 'key'    # key, colon, value or comma (top level only)
+        self._key = None
+        self._in_string = False
+        self._escape = False
+        self._raw = []          # current top-level string, still escaped
+        self._literal = None    # current top-level number/true/false/null
+
+    def text(self):
+        """Everything fed so far"""
+        return ''.join(self._chunks)
+
+    def feed(self, chunk):
+        """Scan one chunk; returns [(field, value)] completed by it"""
+        self._chunks.append(chunk)
+        completed = []
+        for char in chunk:
+            if self._done:
+                break
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._string_done(completed)
+                    continue
+                if self._depth == 1:
+                    self._raw.append(char)
+                continue
+
+            if self._literal is not None:
+                if char not in ',}]' and not char.isspace():
+                    self._literal.append(char)
+                    continue
+                self._literal_done(completed)
+
+            if char == '"':
+                self._in_string = True
+                self._raw = []
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._done = True
+                elif self._depth == 1 and self._expect == 'value':
+                    self._expect = 'comma'  # a nested value just closed
+            elif self._depth == 1:
+                if char == ':' and self._expect == 'colon':
+                    self._expect = 'value'
+                elif char == ',':
+                    self._expect = 'key'
+                elif not char.isspace() and self._expect == 'value':
+                    self._literal = [char]
+        return completed
+
+    def _string_done(self, completed):
+        try:
+            value = json.loads('"' + ''.join(self._raw) + '"')
+        except ValueError:
+            value = ''.join(self._raw)
+
+        if self._expect == 'key':
+            self._key = value
+            self._expect = 'colon'
+        elif self._expect == 'value':
+            self._complete(value, completed)
+
+    def _literal_done(self, completed):
+        literal, self._literal = ''.join(self._literal), None
+        if self._expect != 'value':
+            return
+        try:
+            self._complete(json.loads(literal), completed)
+        except ValueError:
+            self._expect = 'comma'
+
+    def _complete(self, value, completed):
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._expect = 'comma'
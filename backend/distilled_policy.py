@@ -0,0 +1,345 @@
+"""
+Distilled local policy trained from logged Gemini decisions.
+
+With DECISION_LOG_PATH set, every decision Gemini makes is logged as
+bucketed state features, the commander prompt's class, the action and its
+confidence; the log rotates at DECISION_LOG_MAX_MB.
+Offline, those records become a lookup table from bucketed situation to
+the action Gemini chose most often there. At runtime AgentBrain answers
+from the table when its confidence clears DISTILLED_MIN_CONFIDENCE and
+asks Gemini otherwise.
+
+    python distilled_policy.py --log decision_log.jsonl --out distilled_policy.json
+    python distilled_policy.py --log decision_log.jsonl --report-only --json
+"""
+import os
+import glob
+import json
+import time
+import queue
+import random
+import argparse
+import threading
+from collections import Counter
+
+from policy_engine import ACTIONS
+
+# Commander prompts are free text; the table keys on their intent instead
+PROMPT_CLASSES = {
+    "aggressive": ("aggress", "attack", "press", "rush", "offens", "strike", "kill", "hit hard", "all in"),
+    "defensive": ("defens", "dodge", "block", "safe", "careful", "survive", "retreat", "counter", "patient"),
+    "tactical": ("smart", "observe", "study", "pattern", "wait", "timing", "analy", "balanced", "adapt")
+}
+
+# Bucket edges, aligned with the mock policy's thresholds
+HEALTH_EDGES = (25, 40, 70)
+ENERGY_EDGES = (20, 50)
+DISTANCE_EDGES = (10, 25, 40, 80)
+ENEMY_HEALTH_EDGES = (30, 60)
+
+FEATURES = ("prompt_class", "health", "energy", "distance", "enemy_health", "enemy_type", "enemy_state")
+
+# Coarser keys tried when a situation was rarely seen, finest first
+BACKOFF_LEVELS = (
+    FEATURES,
+    ("prompt_class", "health", "distance", "enemy_health", "enemy_state"),
+    ("prompt_class", "health", "distance", "enemy_state")
+)
+
+DEFAULT_MIN_SAMPLES = 3
+DEFAULT_PRIOR = 1.0
+
+
+def classify_prompt(user_prompt):
+    """Bucket a commander prompt by the intent its keywords suggest"""
+    text = (user_prompt or '').lower()
+    best, hits = 'other', 0
+    for name, keywords in PROMPT_CLASSES.items():
+        count = sum(1 for keyword in keywords if keyword in text)
+        if count > hits:
+            best, hits = name, count
+    return best
+
+
+def _bucket(value, edges):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0
+    for index, edge in enumerate(edges):
+        if value < edge:
+            return index
+    return len(edges)
+
+
+def state_features(agent_state, enemy_state, user_prompt):
+    """Bucketed features of one decision request, by FEATURES name"""
+    return {
+        "prompt_class": classify_prompt(user_prompt),
+        "health": _bucket(agent_state.get('health', 100), HEALTH_EDGES),
+        "energy": _bucket(agent_state.get('energy', 100), ENERGY_EDGES),
+        "distance": _bucket(enemy_state.get('distance', 100), DISTANCE_EDGES),
+        "enemy_health": _bucket(enemy_state.get('health', 100), ENEMY_HEALTH_EDGES),
+        "enemy_type": enemy_state.get('type', 'Unknown'),
+        "enemy_state": enemy_state.get('state', 'idle')
+    }
+
+
+def _key(features, level):
+    return "|".join(str(features.get(name)) for name in level)
+
+
+class DecisionLog:
+    """
+    Append-only JSON lines log of model decisions, the distillation training set
+    append() only queues a record: a writer thread (one per process, started
+    on first use so forked workers get their own) writes whatever is queued
+    as one O_APPEND write, so worker processes can share a file. At max_bytes
+    the file is renamed to <path>.<ms> and rotated files beyond max_files are
+    deleted; records are dropped rather than queued past max_pending
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, max_files=10, max_pending=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_pending = max_pending
+        self.records = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def append(self, features, decision):
+        """Queue one record for the writer thread; never blocks on disk"""
+        record = dict(
+            features,
+            action=decision.get('action'),
+            confidence=decision.get('confidence'),
+            reasoning=decision.get('reasoning', ''),
+            ts=round(time.time(), 3)
+        )
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads do not survive a fork: start this process's writer
+                self._pid = os.getpid()
+                self._queue = queue.Queue(self.max_pending)
+                threading.Thread(target=self._write_loop, args=(self._queue,), name='decision-log', daemon=True).start()
+            try:
+                self._queue.put_nowait(line)
+            except queue.Full:
+                self.dropped += 1
+                return
+            self.records += 1
+
+    def _write_loop(self, pending):
+        while True:
+            lines = [pending.get()]
+            while True:
+                try:
+                    lines.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            data = ''.join(lines).encode('utf-8')
+            try:
+                self._rotate(len(data))
+                with open(self.path, 'ab') as f:
+                    f.write(data)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error writing decision log: {e}")
+
+    def _rotate(self, incoming):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if not size or size + incoming <= self.max_bytes:
+            return
+        try:
+            os.replace(self.path, f"{self.path}.{int(time.time() * 1000)}")
+        except FileNotFoundError:
+            pass  # another worker rotated it first
+
+        # Keep the newest max_files rotated files
+        rotated = log_files(self.path)[:-1]
+        for stale in rotated[:max(len(rotated) - self.max_files, 0)]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    def stats(self):
+        pending = self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+        return {"path": self.path, "records": self.records, "pending": pending, "dropped": self.dropped, "errors": self.errors}
+
+    @staticmethod
+    def read(path):
+        """All well-formed records of a log file"""
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a torn last line from a crashed worker
+                if record.get('action') in ACTIONS:
+                    records.append(record)
+        return records
+
+
+def log_files(path):
+    """A decision log's rotated files, oldest first, then the current file"""
+    rotated = [name for name in glob.glob(glob.escape(path) + '.*') if name.rsplit('.', 1)[1].isdigit()]
+    return sorted(rotated, key=lambda name: int(name.rsplit('.', 1)[1])) + [path]
+
+
+class DistilledPolicy:
+    """
+    Lookup table from bucketed situation to Gemini's most frequent action
+    An entry's confidence is the smoothed share of logged decisions that
+    agree with its action, majority / (samples + prior), so a situation seen
+    3 times out of 3 scores 0.75 and one seen 19 times out of 19 scores 0.95
+    """
+
+    def __init__(self, table=None, min_samples=DEFAULT_MIN_SAMPLES, prior=DEFAULT_PRIOR):
+        self.table = table or {}  # level index -> key -> entry
+        self.min_samples = min_samples
+        self.prior = prior
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.table.values())
+
+    @classmethod
+    def train(cls, records, min_samples=DEFAULT_MIN_SAMPLES, prior=DEFAULT_PRIOR):
+        """Build the table from decision log records"""
+        counts = [{} for _ in BACKOFF_LEVELS]
+        for record in records:
+            for level, names in enumerate(BACKOFF_LEVELS):
+                counts[level].setdefault(_key(record, names), []).append(record)
+
+        table = {}
+        for level, groups in enumerate(counts):
+            entries = {}
+            for key, group in groups.items():
+                if len(group) < min_samples:
+                    continue
+                actions = Counter(record['action'] for record in group)
+                action, majority = actions.most_common(1)[0]
+                reasons = Counter(r.get('reasoning') or '' for r in group if r['action'] == action)
+                entries[key] = {
+                    "action": action,
+                    "reasoning": reasons.most_common(1)[0][0],
+                    "confidence": round(majority / (len(group) + prior), 4),
+                    "samples": len(group)
+                }
+            table[str(level)] = entries
+        return cls(table, min_samples, prior)
+
+    def lookup(self, features):
+        """The finest table entry for these features, or None"""
+        for level, names in enumerate(BACKOFF_LEVELS):
+            entry = self.table.get(str(level), {}).get(_key(features, names))
+            if entry is not None:
+                return entry
+        return None
+
+    def decide(self, features, min_confidence):
+        """A decision if the table is confident enough, else None (ask the model)"""
+        entry = self.lookup(features)
+        if entry is None or entry['confidence'] < min_confidence:
+            return None
+        return {
+            "action": entry['action'],
+            "reasoning": entry['reasoning'],
+            "confidence": entry['confidence']
+        }
+
+    def evaluate(self, records, thresholds):
+        """Coverage (LLM calls saved) and agreement with Gemini per confidence threshold"""
+        entries = [(self.lookup(record), record['action']) for record in records]
+        report = []
+        for threshold in thresholds:
+            answered = [(entry, action) for entry, action in entries if entry and entry['confidence'] >= threshold]
+            agreed = sum(1 for entry, action in answered if entry['action'] == action)
+            report.append({
+                "threshold": threshold,
+                "calls_saved": len(answered),
+                "coverage": round(len(answered) / len(records), 4) if records else 0.0,
+                "agreement": round(agreed / len(answered), 4) if answered else None
+            })
+        return report
+
+    def save(self, path):
+        payload = {
+            "features": FEATURES,
+            "levels": BACKOFF_LEVELS,
+            "min_samples": self.min_samples,
+            "prior": self.prior,
+            "table": self.table
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if [list(level) for level in BACKOFF_LEVELS] != payload.get('levels'):
+            raise ValueError(f"{path} was trained with different features; retrain it")
+        return cls(payload['table'], payload.get('min_samples', DEFAULT_MIN_SAMPLES), payload.get('prior', DEFAULT_PRIOR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill logged Gemini decisions into a local lookup policy")
+    parser.add_argument('--log', default='decision_log.jsonl', help="Decision log to train on (with its rotated files)")
+    parser.add_argument('--out', default='distilled_policy.json', help="Where to write the table")
+    parser.add_argument('--min-samples', type=int, default=DEFAULT_MIN_SAMPLES, help="Fewest records per table entry")
+    parser.add_argument('--holdout', type=float, default=0.2, help="Share of records held out for the report")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report-only', action='store_true', help="Print the report without writing a table")
+    parser.add_argument('--json', action='store_true', help="Print the raw JSON report")
+    args = parser.parse_args()
+
+    records = [record for path in log_files(args.log) if os.path.exists(path) for record in DecisionLog.read(path)]
+    if not records:
+        parser.error(f"No decisions logged in {args.log}")
+
+    # Report on held-out decisions, then ship a table trained on all of them
+    shuffled = list(records)
+    random.Random(args.seed).shuffle(shuffled)
+    split = int(len(shuffled) * (1 - args.holdout)) if args.holdout else len(shuffled)
+    held_out = shuffled[split:] or shuffled
+    policy = DistilledPolicy.train(shuffled[:split], args.min_samples)
+    thresholds = (0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95)
+    report = {
+        "records": len(records),
+        "held_out": len(held_out),
+        "thresholds": policy.evaluate(held_out, thresholds)
+    }
+
+    if not args.report_only:
+        final = DistilledPolicy.train(records, args.min_samples)
+        final.save(args.out)
+        report["entries"] = len(final)
+        report["out"] = args.out
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"🧪 {report['records']} logged decisions, {report['held_out']} held out")
+    print(f"{'threshold':>10} {'calls saved':>12} {'coverage':>9} {'agreement':>10}")
+    for row in report['thresholds']:
+        agreement = f"{row['agreement']:.1%}" if row['agreement'] is not None else '-'
+        print(f"{row['threshold']:>10} {row['calls_saved']:>12} {row['coverage']:>9.1%} {agreement:>10}")
+    if not args.report_only:
+        print(f"\n💾 {report['entries']} table entries written to {report['out']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Local stand-in for google.generativeai.GenerativeModel.
+
+Answers decision, plan, batch and (batched) reflection prompts with plausible JSON
+after a log-normally distributed delay, and occasionally returns malformed
+text or raises, so benchmarks exercise the same parsing, fallback and
+deadline paths as the real model without spending API quota.
+
+    GEMINI_FAKE=1 python app.py
+    GEMINI_FAKE=1 GEMINI_FAKE_LATENCY_MS=600 GEMINI_FAKE_ERROR_RATE=0.05 python app.py
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+
+from policy_engine import ACTIONS
+
+_BATCH_SIZE = re.compile(r"exactly (\d+) objects")
+
+# Streamed responses: share of the latency before the first chunk, chunk size
+FIRST_CHUNK_SHARE = 0.3
+CHUNK_CHARS = 16
+
+
+def _prompt_text(contents):
+    """Flatten a prompt string or chat contents into one string"""
+    if isinstance(contents, str):
+        return contents
+    parts = []
+    for turn in contents:
+        parts.extend(str(part) for part in (turn.get('parts', []) if isinstance(turn, dict) else [turn]))
+    return "\n".join(parts)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    """Async iterator of response chunks, like generate_content_async(stream=True)"""
+
+    def __init__(self, text, delay):
+        self.text = text
+        self.delay = delay
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        chunks = [self.text[i:i + CHUNK_CHARS] for i in range(0, len(self.text), CHUNK_CHARS)]
+        await asyncio.sleep(self.delay * FIRST_CHUNK_SHARE)
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(self.delay * (1 - FIRST_CHUNK_SHARE) / len(chunks))
+            yield FakeResponse(chunk)
+
+
+class FakeTokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class FakeGenerativeModel:
+    """
+    Drop-in for GenerativeModel's generate/count calls used by AgentBrain
+    Latency is log-normal around latency_ms (sigma controls the tail)
+    """
+
+    def __init__(self, latency_ms=400.0, sigma=0.5, malformed_rate=0.03, error_rate=0.01, seed=None):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.malformed_rate = malformed_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls):
+        seed = os.environ.get('GEMINI_FAKE_SEED')
+        return cls(
+            latency_ms=float(os.environ.get('GEMINI_FAKE_LATENCY_MS', 400)),
+            sigma=float(os.environ.get('GEMINI_FAKE_SIGMA', 0.5)),
+            malformed_rate=float(os.environ.get('GEMINI_FAKE_MALFORMED_RATE', 0.03)),
+            error_rate=float(os.environ.get('GEMINI_FAKE_ERROR_RATE', 0.01)),
+            seed=int(seed) if seed else None
+        )
+
+    def generate_content(self, contents):
+        delay, outcome = self._roll()
+        time.sleep(delay)
+        return self._respond(contents, outcome)
+
+    async def generate_content_async(self, contents, stream=False):
+        delay, outcome = self._roll()
+        if stream:
+            return FakeStream(self._respond(contents, outcome).text, delay)
+        await asyncio.sleep(delay)
+        return self._respond(contents, outcome)
+
+    def count_tokens(self, contents):
+        return FakeTokenCount(max(1, len(_prompt_text(contents)) // 4))
+
+    async def count_tokens_async(self, contents):
+        return self.count_tokens(contents)
+
+    def _roll(self):
+        self.calls += 1
+        delay = self.latency_ms * math.exp(self.rng.gauss(0.0, self.sigma)) / 1000.0
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            return delay, 'error'
+        if roll < self.error_rate + self.malformed_rate:
+            return delay, 'malformed'
+        return delay, 'ok'
+
+    def _respond(self, contents, outcome):
+        if outcome == 'error':
+            raise RuntimeError("503 Service Unavailable (fake Gemini)")
+
+        prompt = _prompt_text(contents)
+        if outcome == 'malformed':
+            return FakeResponse("I think RooKnight should probably ATTACK here, because")
+
+        if "just finished a battle" in prompt:
+            body = self._reflection()
+        elif "separate battles" in prompt:
+            match = _BATCH_SIZE.search(prompt)
+            body = [dict(battle=battle, **self._reflection()) for battle in range(1, int(match.group(1)) + 1 if match else 2)]
+        elif "plan your next few seconds" in prompt:
+            body = {
+                "plan": [
+                    {"action": "MOVE_CLOSER", "reasoning": "Close in while it is safe",
+                     "while": {"distance_gt": 60, "enemy_state_not": ["attacking"]}},
+                    {"action": self.rng.choice(["ATTACK", "JUMP_ATTACK"]), "reasoning": "Strike in range",
+                     "while": {"distance_lt": 60}}
+                ],
+                "valid_for_ms": self.rng.choice([1500, 2400, 3200]),
+                "confidence": round(self.rng.uniform(0.6, 0.95), 2)
+            }
+        elif "JSON array" in prompt:
+            match = _BATCH_SIZE.search(prompt)
+            body = [self._decision(situation) for situation in range(1, int(match.group(1)) + 1 if match else 2)]
+        else:
+            body = self._decision()
+
+        return FakeResponse("```json\n" + json.dumps(body) + "\n```")
+
+    def _reflection(self):
+        return {
+            "lesson": self.rng.choice([
+                "Block before countering heavy strikes",
+                "Close distance while the enemy recovers",
+                "Retreat earlier when health drops below a third"
+            ]),
+            "improvements": ["Watch attack wind-ups", "Save energy for dodges"],
+            "confidence_change": self.rng.choice(["More confident", "Same", "Less confident"])
+        }
+
+    def _decision(self, situation=None):
+        decision = {
+            "action": self.rng.choice(ACTIONS),
+            "reasoning": "Following the commander's strategy for this range",
+            "confidence": round(self.rng.uniform(0.55, 0.95), 2)
+        }
+        if situation is not None:
+            decision = dict(situation=situation, **decision)
+        return decision
@@ -0,0 +1,35 @@
+"""
+Production serving for the HollowZoo backend.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Pre-forks WEB_CONCURRENCY workers (default: one per core) from a master
+that has already imported the app, so AgentBrain and WorldState are built
+once and shared copy-on-write. Each worker runs WEB_THREADS threads; a
+WebSocket decision channel holds one thread for as long as it is open.
+Decisions, plans and battle sessions live in the SQLite shared store and
+lessons in memory.db, so every worker sees the same state. Workers answer
+/api/health/live at once and /api/health/ready once the Gemini SDK has loaded.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count())
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS') or 16)
+preload_app = True
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Each worker imports the Gemini SDK in the background, after the fork:
+    # the master stays light and no import is ever in flight across a fork
+    import app
+    app.agent_brain.warm_up()
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+
+class LazyGenerativeModel:
+    """
+    A google.generativeai GenerativeModel built on first use
+    Importing the SDK is most of the backend's start-up time, so workers
+    answer health checks first and import it on a warmup thread (warm_up)
+    or, failing that, on the first attribute access. Until it has loaded,
+    ModelGateway sheds async calls to the mock policy rather than import
+    on the event loop thread
+    """
+
+    def __init__(self, api_key, model_name):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.load_seconds = None
+        self.error = None
+        self._model = None
+        self._warming_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        """Import the SDK and build the model (once; concurrent callers wait for it)"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+                    self.load_seconds = time.perf_counter() - started
+        return self._model
+
+    def warm_up(self):
+        """Load on a background thread, once per process (threads do not survive fork)"""
+        if self._model is not None or self._warming_pid == os.getpid():
+            return
+        self._warming_pid = os.getpid()
+        threading.Thread(target=self._warm, name='gemini-warmup', daemon=True).start()
+
+    def _warm(self):
+        try:
+            self.load()
+            print(f"🔥 Gemini SDK loaded in {self.load_seconds * 1000:.0f}ms")
+        except Exception as e:
+            self.error = str(e)
+            self._warming_pid = None
+            print(f"Could not load the Gemini SDK: {e}")
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "loaded": self.loaded,
+            "load_ms": round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
+            "error": self.error
+        }
+
+    def __getattr__(self, name):
+        # Only reached for attributes of the real model
+        return getattr(self.load(), name)
@@ -0,0 +1,133 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words too common in lessons and prompts to say anything about relevance
+STOP_WORDS = frozenset("""
+a an and are as at be before but by do for from has have if in into is it its
+more of on or so than that the then this to was were when while with after
+""".split())
+
+
+def tokenize(text):
+    return [term for term in _TOKEN.findall(str(text).lower()) if term not in STOP_WORDS and len(term) > 1]
+
+
+class MemoryIndex:
+    """
+    Inverted index over lesson text for relevance-ranked recall
+    Lessons score by TF-IDF against the query terms plus boosts for a
+    matching enemy and biome tag. Only the newest max_scan entries of each
+    posting list are scanned, so a lookup costs the same at 100 or 100k
+    lessons, and results are cached until the next lesson is indexed.
+    Lessons carry the id the store gave them, so prune() can follow the
+    store's retention
+    """
+
+    def __init__(self, max_scan=256, enemy_boost=2.0, biome_boost=1.0, cache_size=256):
+        self.max_scan = max_scan
+        self.enemy_boost = enemy_boost
+        self.biome_boost = biome_boost
+        self.cache_size = cache_size
+        self.lessons = {}      # doc id -> lesson text
+        self._doc_ids = {}     # lesson text -> doc id (repeated lessons share one doc)
+        self._store_ids = {}   # doc id -> newest store id of its lesson
+        self._next_doc = 0
+        self._postings = {}    # term -> [(doc id, term weight)] oldest first
+        self._tags = {}        # (kind, value) -> [doc id] oldest first
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lessons)
+
+    def add(self, text, enemy=None, biome=None, store_id=None):
+        """Index one lesson, tagged with the enemy and biome it was learned against"""
+        if not text:
+            return
+        with self._lock:
+            doc_id = self._doc_ids.get(text)
+            repeated = doc_id is not None
+            if not repeated:
+                doc_id = self._next_doc
+                self._next_doc += 1
+                self.lessons[doc_id] = text
+                self._doc_ids[text] = doc_id
+
+                terms = tokenize(text)
+                for term, count in Counter(terms).items():
+                    self._postings.setdefault(term, []).append((doc_id, count / len(terms)))
+            if store_id is not None:
+                self._store_ids[doc_id] = store_id
+
+            for tag in (('enemy', enemy), ('biome', biome)):
+                if tag[1]:
+                    docs = self._tags.setdefault(tag, [])
+                    if not repeated or doc_id not in docs[-self.max_scan:]:
+                        docs.append(doc_id)
+            if self._cache:
+                self._cache.clear()
+
+    def prune(self, oldest_id):
+        """Drop lessons whose newest copy in the store has an id below oldest_id"""
+        with self._lock:
+            stale = {doc_id for doc_id, store_id in self._store_ids.items() if store_id < oldest_id}
+            if not stale:
+                return 0
+            for doc_id in stale:
+                del self._doc_ids[self.lessons.pop(doc_id)]
+                del self._store_ids[doc_id]
+
+            for term in list(self._postings):
+                kept = [posting for posting in self._postings[term] if posting[0] not in stale]
+                if kept:
+                    self._postings[term] = kept
+                else:
+                    del self._postings[term]
+            for tag in list(self._tags):
+                kept = [doc_id for doc_id in self._tags[tag] if doc_id not in stale]
+                if kept:
+                    self._tags[tag] = kept
+                else:
+                    del self._tags[tag]
+            self._cache.clear()
+            return len(stale)
+
+    def search(self, query, enemy=None, biome=None, k=5):
+        """Top-k lessons for the query text and tags, best first"""
+        terms = tuple(sorted(set(tokenize(query))))
+        key = (terms, enemy, biome, k)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return list(cached)
+
+            total = len(self.lessons)
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + total / len(postings))
+                for doc_id, weight in postings[-self.max_scan:]:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf
+
+            for tag, boost in ((('enemy', enemy), self.enemy_boost), (('biome', biome), self.biome_boost)):
+                if tag[1]:
+                    for doc_id in self._tags.get(tag, ())[-self.max_scan:]:
+                        scores[doc_id] = scores.get(doc_id, 0.0) + boost
+
+            # Newer lessons win ties
+            best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+            results = [self.lessons[doc_id] for doc_id, _ in best]
+
+            self._cache[key] = results
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return list(results)
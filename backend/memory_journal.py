@@ -0,0 +1,29 @@
+import os
+import json
+
+
+def read_legacy_memories(path='memory.jsonl', legacy_path='memory.json', window=50):
+    """
+    The file the most recent window of pre-SQLite lessons was read from, and those lessons
+    Reads the JSON-lines journal, or the older memory.json snapshot when
+    there is no journal; (None, []) when neither exists. Read-only: used
+    once to seed an empty memory store
+    """
+    if path and os.path.exists(path):
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-append
+                    print(f"Skipping malformed memory journal line: {line[:80]}")
+        return path, entries[-window:]
+
+    if legacy_path and os.path.exists(legacy_path):
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            return legacy_path, json.load(f)[-window:]
+    return None, []
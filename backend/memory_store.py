@@ -0,0 +1,164 @@
+import re
+import threading
+import time
+from datetime import datetime
+
+from shared_store import local_connection
+
+DEFAULT_PLAYER = 'default'
+
+_PLAYER_CHARS = re.compile(r'[^A-Za-z0-9_.:-]')
+
+
+def player_id(value):
+    """A safe player id: at most 64 of [A-Za-z0-9_.:-], DEFAULT_PLAYER if empty"""
+    cleaned = _PLAYER_CHARS.sub('', str(value or ''))[:64]
+    return cleaned or DEFAULT_PLAYER
+
+
+class MemoryStore:
+    """
+    Per-player lesson history in a local SQLite database (WAL mode)
+    shared by every worker process on the host
+    Each thread of each process keeps its own connection. Lessons are
+    looked up by (player, id) and (player, enemy, id), ids growing with
+    time, so pages and catch-up reads stay index range scans however many
+    players there are. Concurrent writers are group-committed: whichever
+    thread takes the write lock inserts every queued lesson in one
+    transaction, and each player keeps its newest `retention` lessons
+    """
+
+    def __init__(self, path='memory.db', retention=100000, prune_every=256):
+        self.path = path
+        self.retention = retention
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending = []
+        self._writes = {}
+        self.stats = {"inserted": 0, "commits": 0, "grouped": 0}
+
+        with self._connection() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS lessons (
+                    id INTEGER PRIMARY KEY,
+                    player TEXT NOT NULL,
+                    memory TEXT NOT NULL,
+                    enemy TEXT,
+                    biome TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS lessons_player ON lessons (player, id)")
+            db.execute("CREATE INDEX IF NOT EXISTS lessons_player_enemy ON lessons (player, enemy, id)")
+
+    def add_many(self, player, lessons):
+        """
+        Store lessons ({"memory"} plus optional "enemy", "biome", "created_at") for a player
+        Returns once they are committed, usually alongside other threads' lessons
+        """
+        now = time.time()
+        rows = [
+            (player, lesson['memory'], lesson.get('enemy'), lesson.get('biome'), lesson.get('created_at', now))
+            for lesson in lessons if lesson.get('memory')
+        ]
+        if not rows:
+            return
+        waiter = {"done": threading.Event(), "error": None}
+        with self._pending_lock:
+            self._pending.append((rows, waiter))
+
+        with self._write_lock:
+            if not waiter['done'].is_set():
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                self._commit(batch)
+
+        if waiter['error'] is not None:
+            raise waiter['error']
+
+    def _commit(self, batch):
+        try:
+            with self._connection() as db:
+                db.executemany(
+                    "INSERT INTO lessons (player, memory, enemy, biome, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [row for rows, _ in batch for row in rows]
+                )
+                for player in {rows[0][0] for rows, _ in batch}:
+                    self._maybe_prune(db, player, sum(len(rows) for rows, _ in batch if rows[0][0] == player))
+            self.stats['inserted'] += sum(len(rows) for rows, _ in batch)
+            self.stats['commits'] += 1
+            self.stats['grouped'] += len(batch) - 1
+        except Exception as e:
+            for _, waiter in batch:
+                waiter['error'] = e
+        finally:
+            for _, waiter in batch:
+                waiter['done'].set()
+
+    def _maybe_prune(self, db, player, added):
+        """Every prune_every writes per player, drop lessons past the retention window"""
+        writes = self._writes.get(player, 0) + added
+        if writes < self.prune_every:
+            self._writes[player] = writes
+            return
+        self._writes.pop(player, None)
+        db.execute("""
+            DELETE FROM lessons WHERE player = ? AND id <= (
+                SELECT id FROM lessons WHERE player = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+            )
+        """, (player, player, self.retention))
+
+    def page(self, player, limit=50, before=None, enemy=None):
+        """
+        Newest lessons older than the `before` id (oldest first), plus the
+        cursor for the page before them (None when there is none)
+        """
+        query = "SELECT id, memory, enemy, biome, created_at FROM lessons WHERE player = ?"
+        params = [player]
+        if enemy:
+            query += " AND enemy = ?"
+            params.append(enemy)
+        if before is not None:
+            query += " AND id < ?"
+            params.append(int(before))
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._connection().execute(query, params).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        entries = [self._entry(row) for row in reversed(rows)]
+        return entries, (rows[-1][0] if more and rows else None)
+
+    def since(self, player, after_id=0, limit=None):
+        """Lessons newer than after_id, oldest first (at most the newest `limit`)"""
+        limit = limit or self.retention
+        rows = self._connection().execute(
+            "SELECT id, memory, enemy, biome, created_at FROM lessons WHERE player = ? AND id > ? "
+            "ORDER BY id DESC LIMIT ?",
+            (player, after_id, limit)
+        ).fetchall()
+        return [self._entry(row) for row in reversed(rows)]
+
+    def oldest_id(self, player):
+        """Id of the oldest lesson a player still has (None when there are none)"""
+        return self._connection().execute("SELECT MIN(id) FROM lessons WHERE player = ?", (player,)).fetchone()[0]
+
+    def count(self, player):
+        return self._connection().execute("SELECT COUNT(*) FROM lessons WHERE player = ?", (player,)).fetchone()[0]
+
+    def is_empty(self):
+        return self._connection().execute("SELECT 1 FROM lessons LIMIT 1").fetchone() is None
+
+    def _entry(self, row):
+        entry = {"id": row[0], "memory": row[1], "timestamp": datetime.fromtimestamp(row[4]).isoformat()}
+        if row[2]:
+            entry["enemy"] = row[2]
+        if row[3]:
+            entry["biome"] = row[3]
+        return entry
+
+    def _connection(self):
+        return local_connection(self._local, self.path)
@@ -0,0 +1,174 @@
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, from cache hits (sub-millisecond) to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, '') for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def samples(self):
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"Could not read gauge {self.name}: {e}")
+            return
+        yield self.name, "", value
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram with optional labels
+    observe() is a bisect and a few additions under a lock
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(label, '') for label in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Context manager observing the elapsed wall time of its block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                yield f"{self.name}_bucket", _format_labels(self.labels, key, ("le", le)), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labels, key), total
+            yield f"{self.name}_count", _format_labels(self.labels, key), cumulative
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self.register(Gauge(name, help_text, read))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics; under gunicorn each worker keeps (and serves) its own
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'hollowzoo_http_requests_total', 'HTTP requests by endpoint and status', ('endpoint', 'status'))
+HTTP_SECONDS = REGISTRY.histogram(
+    'hollowzoo_http_request_seconds', 'HTTP request latency by endpoint', ('endpoint',))
+DECIDE_STAGE_SECONDS = REGISTRY.histogram(
+    'hollowzoo_decide_stage_seconds',
+    'Decision latency per stage (parse_request, build_prompt, generate, first_action, parse, serialize)', ('stage',))
+DECISIONS = REGISTRY.counter(
+    'hollowzoo_decisions_total', 'Decisions served by mode and source (mock, cache, prefetch, distilled, model, deadline, shed, fallback)',
+    ('mode', 'source'))
+LLM_CALLS = REGISTRY.counter(
+    'hollowzoo_llm_calls_total', 'Gemini calls by kind and outcome (ok, parse_error, error, shed)', ('kind', 'outcome'))
+LLM_TOKENS = REGISTRY.counter(
+    'hollowzoo_llm_tokens_total', 'Gemini tokens (estimated) by prompt segment (static, battle, delta, batch) and response', ('segment',))
+MEMORY_SAVE_SECONDS = REGISTRY.histogram(
+    'hollowzoo_memory_save_seconds', "Time to write one player's batch of lessons to the SQLite memory store")
@@ -0,0 +1,215 @@
+import random
+
+import numpy as np
+
+# Action names in the order the decision prompt lists them
+ACTIONS = (
+    "ATTACK",
+    "JUMP_ATTACK",
+    "DODGE",
+    "BLOCK",
+    "RETREAT",
+    "MOVE_CLOSER",
+    "MOVE_AWAY",
+    "WAIT_AND_OBSERVE"
+)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+# Enemy states as reported to the decision endpoint (Kangaroo.currentState)
+ENEMY_STATES = ("idle", "moving", "attacking", "observing", "circling")
+ENEMY_STATE_CODES = {state: code for code, state in enumerate(ENEMY_STATES)}
+
+# State fields a rule can test, in evaluator argument order
+FIELDS = ("health", "enemy_health", "distance", "enemy_state")
+
+# The mock/fallback brain as a declarative table, checked top to bottom.
+# Each rule is (name, conditions, outcomes): conditions are (field, op, value)
+# tests that must all hold, outcomes are (weight, action, reasoning, confidence)
+MOCK_POLICY_RULES = (
+    ("critical_health", [("health", "<", 25)], [
+        (1.0, "RETREAT", "Critical health! Must retreat to survive", 0.95)
+    ]),
+    ("finishing_blow", [("health", "<", 40), ("enemy_health", "<", 30)], [
+        (1.0, "JUMP_ATTACK", "Both wounded - finishing blow!", 0.88)
+    ]),
+    ("low_health", [("health", "<", 40)], [
+        (0.7, "DODGE", "Low health - staying mobile and defensive", 0.82),
+        (0.3, "BLOCK", "Low health - blocking incoming attacks", 0.78)
+    ]),
+    ("counter_close", [("enemy_state", "==", "attacking"), ("distance", "<", 30)], [
+        (1.0, "DODGE", "Enemy attacking! Evading now!", 0.92)
+    ]),
+    ("counter_far", [("enemy_state", "==", "attacking")], [
+        (1.0, "MOVE_AWAY", "Enemy attacking - creating distance", 0.85)
+    ]),
+    ("strike_range", [("distance", "<", 25), ("distance", ">", 10)], [
+        (0.5, "ATTACK", "Perfect range! Strike now!", 0.90),
+        (0.5, "JUMP_ATTACK", "Perfect range! Aerial assault!", 0.90)
+    ]),
+    ("point_blank", [("distance", "<", 10)], [
+        (0.6, "ATTACK", "Point-blank range - quick strike!", 0.87),
+        (0.4, "DODGE", "Too close - need space to maneuver", 0.83)
+    ]),
+    ("too_far", [("distance", ">", 80)], [
+        (1.0, "MOVE_CLOSER", "Enemy too far - closing the gap", 0.80)
+    ]),
+    ("medium_range", [("distance", ">", 40)], [
+        (0.4, "MOVE_CLOSER", "Moving into attack range", 0.75),
+        (0.6, "WAIT_AND_OBSERVE", "Studying enemy patterns and timing", 0.72)
+    ]),
+    ("observe", [], [
+        (1.0, "WAIT_AND_OBSERVE", "Analyzing the situation...", 0.70)
+    ])
+)
+
+_NUMPY_OPS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal
+}
+
+
+class PolicyEngine:
+    """
+    Compiles a rule table into a scalar evaluator and a NumPy batch evaluator
+    Responses are built once at compile time and shared between calls,
+    so callers must copy a decision before mutating it
+    """
+
+    def __init__(self, rules=MOCK_POLICY_RULES, seed=None):
+        if not rules or rules[-1][1]:
+            raise ValueError("The last rule must be an unconditional default")
+
+        self.rules = rules
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+
+        self.responses = []
+        self._rule_outcomes = []
+        for name, conditions, outcomes in rules:
+            total = sum(weight for weight, _, _, _ in outcomes)
+            cumulative = 0.0
+            compiled = []
+            for weight, action, reasoning, confidence in outcomes:
+                if action not in ACTION_CODES:
+                    raise ValueError(f"Rule {name!r} uses unknown action {action!r}")
+                cumulative += weight / total
+                compiled.append((cumulative, len(self.responses), ACTION_CODES[action]))
+                self.responses.append({
+                    "action": action,
+                    "reasoning": reasoning,
+                    "confidence": confidence
+                })
+            self._rule_outcomes.append(compiled)
+
+        # For region(): the rule behind each response, and the thresholds each
+        # field is compared against by that rule and every rule above it
+        self._response_rules = []
+        self._rule_thresholds = []
+        thresholds = {}
+        for index, (_, conditions, outcomes) in enumerate(rules):
+            self._response_rules.extend([index] * len(outcomes))
+            for field, _, value in conditions:
+                thresholds.setdefault(field, set()).add(value)
+            self._rule_thresholds.append({field: sorted(values) for field, values in thresholds.items()})
+
+        self._evaluate = self._compile_scalar()
+
+    def decide(self, health, enemy_health, distance, enemy_state):
+        """Return the shared response for one state"""
+        return self.responses[self._evaluate(health, enemy_health, distance, enemy_state, self.rng.random)]
+
+    def candidates(self, health, enemy_health, distance, enemy_state):
+        """Every response the rule matching this state can return"""
+        rule = self._response_rules[self._evaluate(health, enemy_health, distance, enemy_state, float)]
+        return [self.responses[index] for _, index, _ in self._rule_outcomes[rule]]
+
+    def region(self, health, enemy_health, distance, enemy_state):
+        """
+        Preconditions (plan vocabulary) under which the same rule keeps firing
+        Numeric fields get the open interval between the nearest thresholds
+        of the rules up to the one that fired, so none of their tests can flip;
+        a field sitting exactly on a threshold is pinned to it (_ge and _le)
+        """
+        rule = self._response_rules[self._evaluate(health, enemy_health, distance, enemy_state, float)]
+        values = {"health": health, "enemy_health": enemy_health, "distance": distance}
+        conditions = {}
+        for field, thresholds in self._rule_thresholds[rule].items():
+            if field == 'enemy_state':
+                conditions['enemy_state_in'] = [enemy_state]
+                continue
+
+            value = values[field]
+            if value in thresholds:
+                conditions[f"{field}_ge"] = value
+                conditions[f"{field}_le"] = value
+                continue
+            below = [t for t in thresholds if t < value]
+            above = [t for t in thresholds if t > value]
+            if below:
+                conditions[f"{field}_gt"] = below[-1]
+            if above:
+                conditions[f"{field}_lt"] = above[0]
+        return conditions
+
+    def evaluate_batch(self, health, enemy_health, distance, enemy_state, rng=None):
+        """
+        Evaluate arrays of states at once and return an array of action codes
+        enemy_state may hold ENEMY_STATES codes or state names
+        """
+        columns = {
+            "health": np.asarray(health),
+            "enemy_health": np.asarray(enemy_health),
+            "distance": np.asarray(distance),
+            "enemy_state": np.asarray(enemy_state)
+        }
+        by_name = columns['enemy_state'].dtype.kind in 'US'
+        roll = (rng or self.np_rng).random(columns['distance'].shape)
+
+        conditions = []
+        choices = []
+        for (name, rule_conditions, _), outcomes in zip(self.rules, self._rule_outcomes):
+            mask = np.ones(roll.shape, dtype=bool)
+            for field, op, value in rule_conditions:
+                if field == 'enemy_state' and not by_name:
+                    value = ENEMY_STATE_CODES.get(value, -1)
+                mask &= _NUMPY_OPS[op](columns[field], value)
+            conditions.append(mask)
+
+            if len(outcomes) == 1:
+                choices.append(outcomes[0][2])
+            else:
+                choices.append(np.select(
+                    [roll < cumulative for cumulative, _, _ in outcomes[:-1]],
+                    [code for _, _, code in outcomes[:-1]],
+                    default=outcomes[-1][2]
+                ))
+
+        return np.select(conditions, choices, default=ACTION_CODES["WAIT_AND_OBSERVE"]).astype(np.int8)
+
+    def _compile_scalar(self):
+        """Generate a flat if-chain that returns a response index"""
+        lines = ["def evaluate(health, enemy_health, distance, enemy_state, random):"]
+        for (name, conditions, _), outcomes in zip(self.rules, self._rule_outcomes):
+            for field, op, value in conditions:
+                if field not in FIELDS or op not in _NUMPY_OPS:
+                    raise ValueError(f"Rule {name!r} has unsupported condition {field} {op} {value!r}")
+
+            test = " and ".join(f"{field} {op} {value!r}" for field, op, value in conditions) or "True"
+            lines.append(f"    if {test}:  # {name}")
+            if len(outcomes) == 1:
+                lines.append(f"        return {outcomes[0][1]}")
+                continue
+
+            lines.append("        roll = random()")
+            for cumulative, index, _ in outcomes[:-1]:
+                lines.append(f"        if roll < {cumulative!r}:")
+                lines.append(f"            return {index}")
+            lines.append(f"        return {outcomes[-1][1]}")
+
+        namespace = {}
+        exec(compile("\n".join(lines), "<policy_engine>", "exec"), namespace)
+        return namespace['evaluate']
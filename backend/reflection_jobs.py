@@ -0,0 +1,160 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class ReflectionJob:
+    """
+    One post-battle reflection waiting for (or done with) the model
+    status goes queued -> running -> done, or failed if the batch raised
+    """
+
+    def __init__(self, job_id, battle_data, outcome):
+        self.id = job_id
+        self.battle_data = battle_data
+        self.outcome = outcome
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished = threading.Event()
+
+    def to_dict(self):
+        state = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at
+        }
+        if self.status == 'done':
+            state["reflection"] = self.result
+        if self.status == 'failed':
+            state["error"] = self.error
+        return state
+
+
+class ReflectionQueue:
+    """
+    Background queue that takes reflections off the request path
+    Worker threads pull a job, gather whatever else arrives within the
+    coalescing window (up to max_batch) and hand the whole batch to
+    reflect_batch, so reflections that finish together share one model call
+    and one memory write. With a SharedStore job states are published there,
+    so a job can be polled from any worker process
+    """
+
+    def __init__(self, reflect_batch, workers=2, coalesce_window=0.25, max_batch=8,
+                 max_jobs=1024, retention=600, shared=None):
+        self.reflect_batch = reflect_batch
+        self.workers = workers
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.max_jobs = max_jobs
+        self.retention = retention
+        self.shared = shared
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self.stats = {"submitted": 0, "batches": 0, "coalesced": 0, "failed": 0}
+
+    def submit(self, battle_data, outcome):
+        """Queue a reflection and return its job right away"""
+        job = ReflectionJob(uuid.uuid4().hex, battle_data, outcome)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            self.stats["submitted"] += 1
+        self._publish(job)
+        self._work_queue().put(job)
+        return job
+
+    def get(self, job_id):
+        """Current state of a job as a dict, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.shared is not None:
+            return self.shared.get('reflection_job', job_id)
+        return None
+
+    def wait(self, job_id, timeout):
+        """Long-poll: block up to timeout seconds for the job to finish"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.finished.wait(timeout)
+            return job.to_dict()
+
+        # Submitted by another worker process: poll its published state
+        deadline = time.monotonic() + timeout
+        state = self.get(job_id)
+        while state is not None and state['status'] in ('queued', 'running') and time.monotonic() < deadline:
+            time.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
+            state = self.get(job_id)
+        return state
+
+    def pending(self):
+        """Jobs waiting for a worker in this process"""
+        return self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+
+    def _work_queue(self):
+        """Return the job queue, starting the worker threads on first use in this process"""
+        if self._queue is None or self._pid != os.getpid():
+            with self._lock:
+                if self._queue is None or self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    for index in range(self.workers):
+                        threading.Thread(
+                            target=self._worker, args=(self._queue,),
+                            name=f'reflection-{index}', daemon=True
+                        ).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _worker(self, jobs):
+        while True:
+            batch = [jobs.get()]
+            deadline = time.monotonic() + self.coalesce_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(jobs.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        for job in batch:
+            job.status = 'running'
+            self._publish(job)
+
+        try:
+            results = self.reflect_batch([(job.battle_data, job.outcome) for job in batch])
+            for job, result in zip(batch, results):
+                job.result = result
+                job.status = 'done'
+        except Exception as e:
+            print(f"Reflection batch failed: {e}")
+            for job in batch:
+                job.error = str(e)
+                job.status = 'failed'
+
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["coalesced"] += len(batch) - 1
+            self.stats["failed"] += sum(1 for job in batch if job.status == 'failed')
+
+        for job in batch:
+            self._publish(job)
+            job.finished.set()
+
+    def _publish(self, job):
+        if self.shared is not None:
+            self.shared.put('reflection_job', job.id, job.to_dict(), self.retention)
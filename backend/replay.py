@@ -0,0 +1,229 @@
+"""
+Deterministic replay of recorded decision traces (TRACE_DIR, see trace_log.py).
+
+Feeds every record back through this version's prompt builders, response
+parsers and mock/fallback paths, without calling any model, and reports
+throughput plus every record whose prompt or decision would come out
+differently. Run it on traces from one version against the code of the
+next to catch behavior changes before they ship.
+
+    python replay.py traces/
+    python replay.py traces/ --workers 4 --json
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from agent_brain import AgentBrain, PLAN_REQUEST
+from trace_log import read_traces, trace_files
+
+CHUNK_SIZE = 256
+
+_brain = None
+
+
+def _normalize(value):
+    """Compare as recorded: tuples become lists, keys are strings"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def make_brain():
+    """A mock-mode AgentBrain with throwaway storage and no tracing or logging"""
+    workdir = tempfile.mkdtemp(prefix='hollowzoo-replay-')
+    os.environ.update({
+        'GEMINI_API_KEY': '',
+        'GEMINI_FAKE': '0',
+        'TRACE_DIR': '',
+        'DECISION_LOG_PATH': '',
+        'SHARED_STORE_PATH': '',
+        'MEMORY_JOURNAL_PATH': os.path.join(workdir, 'memory.jsonl'),
+        'MEMORY_DB_PATH': os.path.join(workdir, 'memory.db')
+    })
+    return AgentBrain()
+
+
+def _init_worker():
+    global _brain
+    _brain = make_brain()
+
+
+def _rebuilt_prompt(brain, record):
+    request = record['request']
+    if record['kind'] == 'reflect':
+        return brain._reflection_prompt(request['battles'])
+
+    situation = brain._build_situation_delta(request['agent_state'], request['enemy_state'], request['environment'])
+    if record['kind'] == 'plan':
+        situation += "\n\n" + PLAN_REQUEST
+    return brain._battle_context(request['user_prompt'], record['recalled']).contents(situation)
+
+
+def _mock_matches(brain, record, decision):
+    """Whether a mock-policy answer is one the current rule table could give here"""
+    request = record['request']
+    agent_state, enemy_state = request['agent_state'], request['enemy_state']
+    if record['kind'] == 'plan':
+        decision = (decision.get('plan') or [{}])[0]
+    candidates = brain.mock_policy.candidates(
+        agent_state.get('health', 100),
+        enemy_state.get('health', 100),
+        enemy_state.get('distance', 100),
+        enemy_state.get('state', 'idle')
+    )
+    return any(c['action'] == decision.get('action') and c['reasoning'] == decision.get('reasoning') for c in candidates)
+
+
+def replay_record(brain, record):
+    """
+    Replay one trace record; returns (checks run, [divergence])
+    Cache, prefetch and distilled answers depend on server state and only
+    get the prompt check
+    """
+    kind, source = record['kind'], record.get('source')
+    decision = record.get('decision')
+    checks = 0
+    divergences = []
+
+    def diverged(check, expected, actual):
+        divergences.append({"kind": kind, "source": source, "check": check, "ts": record.get('ts'),
+                            "expected": expected, "actual": actual})
+
+    if 'prompt' in record and (kind == 'reflect' or 'recalled' in record):
+        checks += 1
+        rebuilt = _normalize(_rebuilt_prompt(brain, record))
+        if rebuilt != record['prompt']:
+            diverged('prompt', record['prompt'], rebuilt)
+
+    if kind == 'reflect':
+        if record.get('raw') is not None:
+            checks += 1
+            try:
+                lessons = [answer.get('lesson') for answer in brain._parse_reflections(record['raw'], len(decision))]
+            except Exception as e:
+                lessons = f"unparseable: {e}"
+            recorded = [reflection.get('lesson') for reflection in decision]
+            if isinstance(lessons, str) or any(l and l != r for l, r in zip(lessons, recorded)):
+                diverged('parse', recorded, lessons)
+        return checks, divergences
+
+    if source == 'model' and record.get('raw') is not None:
+        checks += 1
+        if kind == 'plan':
+            raw = brain._extract_decision(record['raw'])
+            parsed = brain._sanitize_plan(raw) if raw is not None else None
+            if parsed is None:
+                # An unusable plan is answered by the mock policy
+                if not _mock_matches(brain, record, decision):
+                    diverged('parse', decision, None)
+                return checks, divergences
+        else:
+            parsed = brain._parse_decision(record['raw'])
+        parsed = _normalize(parsed)
+        if parsed != decision:
+            diverged('parse', decision, parsed)
+    elif source in ('mock', 'deadline', 'shed'):
+        checks += 1
+        if not _mock_matches(brain, record, decision):
+            diverged('mock', decision, None)
+    elif source == 'fallback' and kind != 'plan':
+        checks += 1
+        if decision not in (brain._fallback_decision({}, {}), brain._default_decision()):
+            diverged('fallback', decision, brain._fallback_decision({}, {}))
+    return checks, divergences
+
+
+def _replay_chunk(records):
+    kinds = Counter()
+    checks = 0
+    divergences = []
+    for record in records:
+        kinds[record['kind']] += 1
+        record_checks, record_divergences = replay_record(_brain, record)
+        checks += record_checks
+        divergences.extend(record_divergences)
+    return kinds, checks, divergences
+
+
+def _chunks(paths):
+    chunk = []
+    for path in paths:
+        for record in read_traces(path):
+            chunk.append(record)
+            if len(chunk) >= CHUNK_SIZE:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(paths, workers=0):
+    """Replay every record under paths, serially or across a process pool"""
+    files = [f for path in paths for f in trace_files(path)]
+    kinds = Counter()
+    checks = 0
+    divergences = []
+
+    started = time.perf_counter()
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(_replay_chunk, _chunks(files)))
+    else:
+        _init_worker()
+        started = time.perf_counter()  # brain start-up is not replay time
+        results = [_replay_chunk(chunk) for chunk in _chunks(files)]
+    elapsed = time.perf_counter() - started
+
+    for chunk_kinds, chunk_checks, chunk_divergences in results:
+        kinds.update(chunk_kinds)
+        checks += chunk_checks
+        divergences.extend(chunk_divergences)
+
+    records = sum(kinds.values())
+    return {
+        "files": len(files),
+        "records": records,
+        "kinds": dict(kinds),
+        "checks": checks,
+        "diverged": len(divergences),
+        "by_check": dict(Counter(d['check'] for d in divergences)),
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(records / elapsed) if elapsed else None,
+        "divergences": divergences
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded HollowZoo decision traces")
+    parser.add_argument('paths', nargs='+', help="Trace files or TRACE_DIR directories")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (0 replays serially)")
+    parser.add_argument('--show', type=int, default=10, help="Divergences to print")
+    parser.add_argument('--json', action='store_true', help="Print the raw JSON report")
+    args = parser.parse_args()
+
+    report = run(args.paths, args.workers)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    kinds = ", ".join(f"{count} {kind}" for kind, count in sorted(report['kinds'].items()))
+    print(f"🔁 {report['records']} records from {report['files']} files ({kinds})")
+    print(f"   {report['records_per_second']} records/s, {report['checks']} checks in {report['seconds']}s")
+    if not report['diverged']:
+        print("✅ No divergences")
+        return
+
+    by_check = ", ".join(f"{count} {check}" for check, count in sorted(report['by_check'].items()))
+    print(f"❌ {report['diverged']} divergences ({by_check})")
+    for divergence in report['divergences'][:args.show]:
+        print(f"\n   {divergence['kind']}/{divergence['source']} {divergence['check']} at {divergence['ts']}")
+        print(f"   recorded: {json.dumps(divergence['expected'])[:200]}")
+        print(f"   replayed: {json.dumps(divergence['actual'])[:200]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+
+
+def local_connection(local, path):
+    """This thread's WAL-mode connection to path, kept on the threading.local `local`"""
+    # SQLite connections must not cross a fork or be shared between threads
+    db = getattr(local, 'db', None)
+    if db is None or local.pid != os.getpid():
+        db = sqlite3.connect(path, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        local.db = db
+        local.pid = os.getpid()
+    return db
+
+
+class SharedStore:
+    """
+    Key/value store in a local SQLite database (WAL mode) shared by every
+    worker process on the host
+    Values are JSON grouped by namespace and expire after their TTL;
+    each thread of each process keeps its own connection. An entry can
+    also carry an append-only log of numbered records, kept until the
+    entry is deleted or expires
+    """
+
+    def __init__(self, path='shared_state.db', purge_every=256):
+        self.path = path
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+
+        with self._connection() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+            """)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS logs (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (namespace, key, seq)
+                ) WITHOUT ROWID
+            """)
+
+    def get(self, namespace, key):
+        """Return the stored value, or None if missing or expired"""
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            print(f"Shared store read failed: {e}")
+            return None
+
+    def put(self, namespace, key, value, ttl):
+        """Store a value for ttl seconds, replacing any previous one"""
+        try:
+            with self._connection() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, separators=(',', ':')), time.time() + ttl)
+                )
+                self._writes += 1
+                if self._writes % self.purge_every == 0:
+                    self._purge(db)
+        except Exception as e:
+            print(f"Shared store write failed: {e}")
+
+    def touch(self, namespace, key, ttl):
+        """Extend a value's lifetime to ttl seconds from now without rewriting it"""
+        try:
+            with self._connection() as db:
+                db.execute(
+                    "UPDATE entries SET expires_at = ? WHERE namespace = ? AND key = ?",
+                    (time.time() + ttl, namespace, key)
+                )
+        except Exception as e:
+            print(f"Shared store write failed: {e}")
+
+    def append(self, namespace, key, seq, value):
+        """
+        Add record number seq to an entry's log
+        Returns False if another writer already added that number (catch up with read_log and retry)
+        """
+        try:
+            with self._connection() as db:
+                db.execute(
+                    "INSERT INTO logs (namespace, key, seq, value) VALUES (?, ?, ?, ?)",
+                    (namespace, key, seq, json.dumps(value, separators=(',', ':')))
+                )
+                self._writes += 1
+                if self._writes % self.purge_every == 0:
+                    self._purge(db)
+            return True
+        except sqlite3.IntegrityError:
+            return False
+        except Exception as e:
+            print(f"Shared store write failed: {e}")
+            return True  # carry on locally; other workers miss this record
+
+    def read_log(self, namespace, key, after=0):
+        """(seq, value) log records of an entry numbered above `after`, in order"""
+        rows = self._connection().execute(
+            "SELECT seq, value FROM logs WHERE namespace = ? AND key = ? AND seq > ? ORDER BY seq",
+            (namespace, key, after)
+        ).fetchall()
+        return [(seq, json.loads(value)) for seq, value in rows]
+
+    def delete(self, namespace, key):
+        """Remove a value; returns False if it was not there"""
+        try:
+            with self._connection() as db:
+                db.execute("DELETE FROM logs WHERE namespace = ? AND key = ?", (namespace, key))
+                return db.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+                ).rowcount > 0
+        except Exception as e:
+            print(f"Shared store delete failed: {e}")
+            return False
+
+    def _purge(self, db):
+        """Drop expired entries and the logs of entries that are gone"""
+        db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        db.execute("""
+            DELETE FROM logs WHERE NOT EXISTS (
+                SELECT 1 FROM entries WHERE entries.namespace = logs.namespace AND entries.key = logs.key
+            )
+        """)
+
+    def _connection(self):
+        return local_connection(self._local, self.path)
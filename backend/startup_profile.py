@@ -0,0 +1,123 @@
+"""
+Start-up profile of the HollowZoo backend.
+
+Imports the app in a fresh interpreter under `python -X importtime`, with a
+dummy GEMINI_API_KEY so the real-model path is taken, and reports how long
+`import app` takes, the slowest modules it pulls in and (unless --no-warmup)
+how long the background Gemini SDK warmup takes after that. With --budget-ms
+it exits non-zero when the import is slower, so start-up time can be kept
+down in CI.
+
+    python startup_profile.py
+    python startup_profile.py --top 20 --budget-ms 400 --json
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+# Runs in the child: import the app, then wait for the SDK warmup
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+model = getattr(app.agent_brain, 'model', None)
+warmup_ms = None
+if {warmup} and hasattr(model, 'warm_up'):
+    model.warm_up()
+    while not model.loaded and model.error is None and time.perf_counter() - imported < 60:
+        time.sleep(0.005)
+    warmup_ms = (time.perf_counter() - imported) * 1000
+print(json.dumps({{"import_ms": (imported - started) * 1000, "warmup_ms": warmup_ms}}))
+"""
+
+
+def parse_importtime(stderr):
+    """(module, self µs, cumulative µs, depth) rows of `-X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile(warmup=True, top=15):
+    workdir = tempfile.mkdtemp(prefix='hollowzoo-startup-')
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY') or 'startup-profile',
+        GEMINI_FAKE='0',
+        GEMINI_WARMUP='lazy',  # the probe starts the warmup itself, after timing the import
+        TRACE_DIR='',
+        DECISION_LOG_PATH='',
+        SHARED_STORE_PATH=os.path.join(workdir, 'shared_state.db'),
+        MEMORY_DB_PATH=os.path.join(workdir, 'memory.db'),
+        MEMORY_JOURNAL_PATH=os.path.join(workdir, 'memory.jsonl')
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(warmup=warmup)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{result.stderr[-2000:]}")
+
+    timings = json.loads(next(line for line in result.stdout.splitlines() if line.startswith('{"import_ms"')))
+    rows = parse_importtime(result.stderr)
+    # app's subtree: children are listed before their parent, back to the previous
+    # top-level import (interpreter start-up before it, the warmup thread after)
+    app_index = next(i for i, row in enumerate(rows) if row[0] == 'app' and row[3] == 0)
+    first = app_index
+    while first > 0 and rows[first - 1][3] > 0:
+        first -= 1
+    app_rows = rows[first:app_index + 1]
+    top_level = sorted((row for row in app_rows if row[3] <= 1), key=lambda row: row[2], reverse=True)
+    return {
+        "import_ms": round(timings['import_ms'], 1),
+        "warmup_ms": round(timings['warmup_ms'], 1) if timings['warmup_ms'] is not None else None,
+        "modules": len(app_rows),
+        "slowest": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us, _ in top_level[:top]
+        ],
+        "sdk_at_import": any(row[0] == 'google.generativeai' for row in app_rows)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile HollowZoo backend start-up")
+    parser.add_argument('--top', type=int, default=15, help="Slowest top-level imports to list")
+    parser.add_argument('--budget-ms', type=float, default=None, help="Fail when import app takes longer")
+    parser.add_argument('--no-warmup', action='store_true', help="Skip timing the Gemini SDK warmup")
+    parser.add_argument('--json', action='store_true', help="Print the raw JSON report")
+    args = parser.parse_args()
+
+    report = profile(warmup=not args.no_warmup, top=args.top)
+    over_budget = args.budget_ms is not None and report['import_ms'] > args.budget_ms
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"🚀 import app: {report['import_ms']:.0f}ms ({report['modules']} modules)")
+        if report['warmup_ms'] is not None:
+            print(f"🔥 Gemini SDK ready {report['warmup_ms']:.0f}ms later (background warmup)")
+        if report['sdk_at_import']:
+            print("⚠️  google.generativeai is imported at start-up")
+        print(f"{'module':<40} {'self ms':>9} {'total ms':>9}")
+        for row in report['slowest']:
+            print(f"{row['module']:<40} {row['self_ms']:>9.1f} {row['cumulative_ms']:>9.1f}")
+        if over_budget:
+            print(f"❌ Over the {args.budget_ms:.0f}ms budget")
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from battle_sessions import SessionStore
+from shared_store import SharedStore
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two workers' session stores over one shared database"""
+    path = str(tmp_path / 'shared.db')
+    return SessionStore(shared=SharedStore(path)), SessionStore(shared=SharedStore(path))
+
+
+def test_local_apply_merges_changed_fields():
+    sessions = SessionStore()
+    session = sessions.open('be careful', [], {"type": "Nyx, Owl Warden", "health": 80}, {"zone": "LanternAviary"})
+    sessions.apply(session, {"agent": {"health": 90, "energy": 50}})
+    agent, enemy, environment = sessions.apply(session, {"agent": {"health": 70}, "enemy": {"distance": 12}})
+    assert agent == {"health": 70, "energy": 50}
+    assert enemy == {"type": "Nyx, Owl Warden", "health": 80, "distance": 12}
+    assert environment == {"zone": "LanternAviary"}
+    assert session.ticks == 2
+
+
+def test_other_worker_rebuilds_the_session_with_its_ticks(workers):
+    first, second = workers
+    session = first.open('go', ['lesson'], {"type": "Maul, Briar Bear"})
+    first.apply(session, {"agent": {"health": 90}})
+    first.apply(session, {"user_prompt": "retreat", "ignored": True})
+
+    copy = second.get(session.id)
+    assert copy is not session
+    assert copy.agent == {"health": 90}
+    assert copy.user_prompt == 'retreat'
+    assert copy.memory == ['lesson']
+    assert copy.seq == 2
+
+
+def test_ticks_alternating_between_workers_are_not_lost(workers):
+    first, second = workers
+    session = first.open('go', [], {"type": "Maul, Briar Bear"})
+    copy = second.get(session.id)
+
+    first.apply(session, {"agent": {"health": 90}})
+    second.apply(copy, {"agent": {"energy": 40}})
+    agent, enemy, _ = first.apply(session, {"enemy": {"health": 60}})
+    assert agent == {"health": 90, "energy": 40}
+    assert enemy["health"] == 60
+    assert session.seq == 3
+
+
+def test_concurrent_ticks_queue_up(workers):
+    first, second = workers
+    session = first.open('go', [], {})
+    copy = second.get(session.id)
+
+    def tick(store, target, name):
+        for i in range(25):
+            store.apply(target, {"agent": {name: i}})
+
+    threads = [threading.Thread(target=tick, args=(first, session, 'a')),
+               threading.Thread(target=tick, args=(second, copy, 'b'))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first.apply(session, {})
+    second.apply(copy, {})
+    assert session.agent == copy.agent == {"a": 24, "b": 24}
+    assert copy.ticks == copy.seq == 52  # 50 ticks plus one catch-up tick from each worker
+
+
+def test_close_removes_the_session_everywhere(workers):
+    first, second = workers
+    session = first.open('go', [], {})
+    assert second.get(session.id) is not None
+    assert second.close(session.id)
+    assert first.shared.get('session', session.id) is None
+    assert first.close(session.id)  # still in the first worker's memory
+    assert not first.close(session.id)
+    assert first.get(session.id) is None
+
+
+def test_idle_sessions_are_evicted():
+    sessions = SessionStore(idle_timeout=0.0)
+    session = sessions.open('go', [], {})
+    assert sessions.get(session.id) is None
+
+
+def test_lru_bound():
+    sessions = SessionStore(max_sessions=2)
+    opened = [sessions.open('go', [], {}) for _ in range(3)]
+    assert len(sessions) == 2
+    assert sessions.get(opened[0].id) is None
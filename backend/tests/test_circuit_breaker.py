@@ -0,0 +1,140 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+
+def breaker(**overrides):
+    settings = dict(window=30.0, min_calls=4, error_rate=0.5, latency_s=1.0, open_seconds=10.0,
+                    max_open_seconds=40.0, probes=2)
+    settings.update(overrides)
+    return CircuitBreaker(**settings)
+
+
+def call(b, latency=0.1, failed=False):
+    probe = b.acquire()
+    b.record(latency, failed, probe)
+    return probe
+
+
+def trip(b):
+    for _ in range(b.min_calls):
+        call(b, failed=True)
+    assert b.state == OPEN
+
+
+def test_stays_closed_below_min_calls(clock):
+    b = breaker()
+    for _ in range(3):
+        call(b, failed=True)
+    assert b.state == CLOSED
+
+
+def test_opens_on_failure_rate(clock):
+    b = breaker()
+    call(b)
+    call(b)
+    call(b, failed=True)
+    assert b.state == CLOSED
+    call(b, failed=True)
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpen):
+        b.acquire()
+    assert b.counts['refused'] == 1
+
+
+def test_parse_failures_count_as_failures(clock):
+    b = breaker()
+    for _ in range(4):
+        call(b)
+        b.record_parse_failure()
+    assert b.state == OPEN
+
+
+def test_opens_on_slow_quantile(clock):
+    b = breaker(latency_quantile=0.5)
+    for latency in (0.1, 1.2, 1.3, 1.4):
+        call(b, latency)
+    assert b.state == OPEN
+
+
+def test_old_calls_leave_the_window(clock):
+    b = breaker()
+    for _ in range(3):
+        call(b, failed=True)
+    clock.now += 31
+    call(b)
+    assert b.state == CLOSED
+    assert b.stats()['window']['calls'] == 1
+
+
+def test_half_open_admits_one_probe_at_a_time_and_closes(clock):
+    b = breaker()
+    trip(b)
+    clock.now += 10
+    assert b.acquire() is True
+    assert b.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        b.acquire()  # the first probe is still in flight
+    b.record(0.1, False, True)
+    assert b.state == HALF_OPEN
+    call(b)
+    assert b.state == CLOSED
+    assert b.open_seconds == 10.0
+    assert [t['to'] for t in b.history] == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_failed_probe_reopens_with_doubled_cool_down(clock):
+    b = breaker()
+    trip(b)
+    for expected in (20.0, 40.0, 40.0):
+        clock.now += b.open_seconds
+        call(b, failed=True)
+        assert b.state == OPEN
+        assert b.open_seconds == expected
+
+
+def test_slow_or_unparseable_probe_reopens(clock):
+    b = breaker()
+    trip(b)
+    clock.now += 10
+    call(b, latency=2.0)
+    assert b.state == OPEN
+
+    clock.now += b.open_seconds
+    call(b)
+    b.record_parse_failure()
+    assert b.state == OPEN
+
+
+def test_released_probe_frees_the_slot(clock):
+    b = breaker()
+    trip(b)
+    clock.now += 10
+    probe = b.acquire()
+    b.release(probe)
+    assert b.acquire() is True
+
+
+def test_stats_report_half_open_once_the_cool_down_ends(clock):
+    b = breaker()
+    trip(b)
+    assert b.stats()['state'] == OPEN
+    assert b.stats()['open_for'] == 10.0
+    clock.now += 10
+    assert b.stats()['state'] == HALF_OPEN
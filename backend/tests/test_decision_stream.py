@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from decision_stream import DecisionStreamParser
+
+DECISION = {
+    "action": "DODGE",
+    "confidence": 0.9,
+    "aggressive": False,
+    "notes": None,
+    "plan": [{"action": "BLOCK", "while": {"health_gt": 40}}],
+    "meta": {"action": "NESTED", "depth": [1, {"x": "}"}]},
+    "reasoning": "He said \"jump\" — so {dodge}, then [block]\\n"
+}
+
+
+def stream(text, size):
+    parser = DecisionStreamParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return parser, completed
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 1000])
+def test_top_level_scalars_complete_in_order(size):
+    text = "```json\n" + json.dumps(DECISION, ensure_ascii=False) + "\n```"
+    parser, completed = stream(text, size)
+    assert completed == [
+        ("action", "DODGE"),
+        ("confidence", 0.9),
+        ("aggressive", False),
+        ("notes", None),
+        ("reasoning", DECISION['reasoning'])
+    ]
+    assert parser.text() == text
+
+
+def test_action_completes_before_the_reasoning_arrives():
+    parser = DecisionStreamParser()
+    assert parser.feed('{"action": "ATT') == []
+    assert parser.feed('ACK", "reason') == [("action", "ATTACK")]
+    assert parser.feed('ing": "go') == []
+
+
+def test_a_number_completes_on_its_delimiter():
+    parser = DecisionStreamParser()
+    assert parser.feed('{"confidence": 0.8') == []
+    assert parser.feed('5}') == [("confidence", 0.85)]
+
+
+def test_text_after_the_object_is_ignored():
+    parser = DecisionStreamParser()
+    parser.feed('{"action": "BLOCK"} {"action": "ATTACK"}')
+    assert parser.fields == {"action": "BLOCK"}
+
+
+def test_malformed_literal_is_skipped():
+    parser, completed = stream('{"confidence": high, "action": "BLOCK"}', 4)
+    assert completed == [("action", "BLOCK")]
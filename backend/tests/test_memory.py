@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from memory_index import MemoryIndex
+from memory_store import MemoryStore, player_id
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MemoryStore(str(tmp_path / 'memory.db'), retention=5, prune_every=3)
+
+
+def lessons(*texts, **tags):
+    return [dict(memory=text, **tags) for text in texts]
+
+
+def test_player_ids_are_sanitised():
+    assert player_id('ana/../x y') == 'ana..xy'
+    assert player_id('') == 'default'
+
+
+def test_since_returns_newer_lessons_oldest_first(store):
+    store.add_many('ana', lessons('a', 'b', 'c', enemy='Maul, Briar Bear'))
+    store.add_many('bo', lessons('other'))
+    entries = store.since('ana')
+    assert [e['memory'] for e in entries] == ['a', 'b', 'c']
+    assert entries[0]['enemy'] == 'Maul, Briar Bear'
+    assert [e['memory'] for e in store.since('ana', entries[0]['id'])] == ['b', 'c']
+    assert [e['memory'] for e in store.since('ana', limit=2)] == ['b', 'c']
+
+
+def test_empty_lessons_are_skipped(store):
+    store.add_many('ana', lessons('', 'kept'))
+    assert store.count('ana') == 1
+    assert not store.is_empty()
+
+
+def test_page_walks_back_with_its_cursor(store):
+    store.add_many('ana', lessons('a', 'b'))
+    store.add_many('ana', lessons('c', enemy='Nyx, Owl Warden'))
+    page, before = store.page('ana', limit=2)
+    assert [e['memory'] for e in page] == ['b', 'c']
+    page, before = store.page('ana', limit=2, before=before)
+    assert [e['memory'] for e in page] == ['a']
+    assert before is None
+    page, _ = store.page('ana', enemy='Nyx, Owl Warden')
+    assert [e['memory'] for e in page] == ['c']
+
+
+def test_retention_prunes_oldest_per_player(store):
+    store.add_many('bo', lessons('keep'))
+    for i in range(9):
+        store.add_many('ana', lessons(f'lesson {i}'))
+    assert store.count('ana') == 5
+    assert store.oldest_id('ana') == store.since('ana')[0]['id']
+    assert store.since('ana')[0]['memory'] == 'lesson 4'
+    assert store.count('bo') == 1
+    assert store.oldest_id('nobody') is None
+
+
+def test_concurrent_writers_all_commit(tmp_path):
+    store = MemoryStore(str(tmp_path / 'memory.db'))
+    threads = [
+        threading.Thread(target=lambda n=n: [store.add_many('ana', lessons(f'{n}-{i}')) for i in range(20)])
+        for n in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.count('ana') == 160
+    assert store.stats['inserted'] == 160
+
+
+def test_index_ranks_by_terms_and_tags():
+    index = MemoryIndex()
+    index.add('block when the bear charges', 'Maul, Briar Bear')
+    index.add('dodge the owl dive', 'Nyx, Owl Warden', 'LanternAviary')
+    index.add('the bear is slow after a swipe', 'Maul, Briar Bear')
+    assert index.search('bear charges')[0] == 'block when the bear charges'
+    assert index.search('dive', enemy='Nyx, Owl Warden') == ['dodge the owl dive']
+    assert index.search('nothing matches') == []
+    assert index.search('', biome='LanternAviary') == ['dodge the owl dive']
+
+
+def test_index_keeps_repeated_lessons_once():
+    index = MemoryIndex()
+    index.add('retreat at low health', store_id=1)
+    index.add('retreat at low health', store_id=7)
+    assert len(index) == 1
+    assert index.search('retreat', k=5) == ['retreat at low health']
+    assert index.prune(5) == 0
+
+
+def test_index_prune_follows_store_retention(store):
+    index = MemoryIndex()
+    for i in range(9):
+        store.add_many('ana', lessons(f'lesson {i} about blocking'))
+    for entry in store.since('ana', limit=100):
+        index.add(entry['memory'], store_id=entry['id'])
+    for entry in store.since('ana', store.since('ana')[-1]['id']):
+        index.add(entry['memory'], store_id=entry['id'])
+
+    assert index.prune(store.oldest_id('ana')) == 0
+    assert len(index) == store.count('ana')
+    assert 'lesson 3 about blocking' not in index.search('blocking', k=10)
+    assert len(index.search('blocking', k=10)) == 5
+
+
+def test_index_prune_drops_stale_lessons_and_their_postings():
+    index = MemoryIndex()
+    index.add('old lesson about jumping', 'Rex, Lion Regent', store_id=1)
+    index.add('new lesson about blocking', 'Rex, Lion Regent', store_id=2)
+    assert index.search('jumping') == ['old lesson about jumping']
+    assert index.prune(2) == 1
+    assert index.search('jumping') == []
+    assert index.search('', enemy='Rex, Lion Regent') == ['new lesson about blocking']
+    assert len(index) == 1
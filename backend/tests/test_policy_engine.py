@@ -0,0 +1,125 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from policy_engine import ACTION_CODES, ENEMY_STATE_CODES, ENEMY_STATES, MOCK_POLICY_RULES, PolicyEngine
+
+# Every threshold the rules test, one either side of it, and the extremes
+HEALTH = (0, 24, 25, 26, 39, 40, 41, 100)
+ENEMY_HEALTH = (0, 29, 30, 31, 100)
+DISTANCE = (0, 9, 10, 11, 24, 25, 26, 29, 30, 31, 39, 40, 41, 79, 80, 81, 500)
+GRID = list(itertools.product(HEALTH, ENEMY_HEALTH, DISTANCE, ENEMY_STATES))
+
+
+class FixedRoll:
+    """Stands in for a NumPy Generator: every state gets the same roll"""
+
+    def __init__(self, roll):
+        self.roll = roll
+
+    def random(self, shape):
+        return np.full(shape, self.roll)
+
+
+def holds(conditions, health, enemy_health, distance, enemy_state):
+    """Python twin of frontend ActionPlan.holds()"""
+    values = {"health": health, "enemy_health": enemy_health, "distance": distance}
+    for key, bound in conditions.items():
+        if key == 'enemy_state_in':
+            if enemy_state not in bound:
+                return False
+            continue
+        if key == 'enemy_state_not':
+            if enemy_state in bound:
+                return False
+            continue
+        value = values[key[:-3]]
+        passed = {
+            '_gt': value > bound, '_lt': value < bound, '_ge': value >= bound, '_le': value <= bound
+        }[key[-3:]]
+        if not passed:
+            return False
+    return True
+
+
+@pytest.fixture
+def engine():
+    return PolicyEngine(seed=7)
+
+
+@pytest.mark.parametrize('roll', [0.0, 0.35, 0.5, 0.65, 0.99])
+def test_batch_matches_scalar(engine, roll):
+    health, enemy_health, distance, enemy_state = zip(*GRID)
+    batch = engine.evaluate_batch(health, enemy_health, distance, enemy_state, rng=FixedRoll(roll))
+    scalar = [
+        ACTION_CODES[engine.responses[engine._evaluate(*row, lambda: roll)]['action']]
+        for row in GRID
+    ]
+    assert batch.tolist() == scalar
+
+
+def test_batch_accepts_enemy_state_codes(engine):
+    health, enemy_health, distance, enemy_state = zip(*GRID)
+    codes = [ENEMY_STATE_CODES[name] for name in enemy_state]
+    by_name = engine.evaluate_batch(health, enemy_health, distance, enemy_state, rng=FixedRoll(0.5))
+    by_code = engine.evaluate_batch(health, enemy_health, distance, codes, rng=FixedRoll(0.5))
+    assert by_name.tolist() == by_code.tolist()
+
+
+def test_decide_picks_from_the_matching_rule(engine):
+    assert engine.decide(10, 100, 50, 'idle')['action'] == 'RETREAT'
+    assert engine.decide(30, 20, 50, 'idle')['action'] == 'JUMP_ATTACK'
+    assert engine.decide(100, 100, 20, 'attacking')['action'] == 'DODGE'
+    assert engine.decide(100, 100, 60, 'attacking')['action'] == 'MOVE_AWAY'
+    assert engine.decide(100, 100, 100, 'idle')['action'] == 'MOVE_CLOSER'
+    assert engine.decide(100, 100, 40, 'idle')['action'] == 'WAIT_AND_OBSERVE'
+
+
+def test_weighted_outcomes_follow_their_weights():
+    engine = PolicyEngine(seed=3)
+    actions = [engine.decide(100, 100, 5, 'idle')['action'] for _ in range(4000)]
+    assert set(actions) == {'ATTACK', 'DODGE'}
+    assert 0.55 < actions.count('ATTACK') / len(actions) < 0.65
+
+
+def test_region_holds_at_the_state(engine):
+    for row in GRID:
+        assert holds(engine.region(*row), *row), row
+
+
+def test_region_keeps_the_same_rule_firing(engine):
+    rng = random.Random(1)
+    for row in GRID:
+        conditions = engine.region(*row)
+        expected = engine.candidates(*row)
+        for _ in range(20):
+            other = (rng.uniform(-5, 110), rng.uniform(-5, 110), rng.uniform(-5, 600), rng.choice(ENEMY_STATES))
+            if holds(conditions, *other):
+                assert engine.candidates(*other) == expected, (row, conditions, other)
+
+
+def test_region_pins_a_value_on_a_threshold(engine):
+    conditions = engine.region(40, 50, 50, 'idle')
+    assert conditions['health_ge'] == conditions['health_le'] == 40
+    assert 'health_gt' not in conditions
+
+
+def test_region_lower_bound_is_below_the_value(engine):
+    conditions = engine.region(60, 50, 81, 'idle')
+    assert conditions['distance_gt'] == 80
+    assert conditions['health_gt'] == 40
+
+
+def test_rules_must_end_with_a_default():
+    with pytest.raises(ValueError):
+        PolicyEngine(rules=MOCK_POLICY_RULES[:-1])
+
+
+def test_unknown_actions_and_conditions_are_rejected():
+    default = MOCK_POLICY_RULES[-1]
+    with pytest.raises(ValueError):
+        PolicyEngine(rules=(("bad", [], [(1.0, "TAUNT", "", 0.5)]),))
+    with pytest.raises(ValueError):
+        PolicyEngine(rules=(("bad", [("energy", "<", 5)], [(1.0, "BLOCK", "", 0.5)]), default))
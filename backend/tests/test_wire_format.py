@@ -0,0 +1,169 @@
+import os
+import re
+import gzip
+
+import pytest
+
+import wire_format
+from wire_format import (
+    CONDITION_KEYS, ENEMY_TYPES, ZONES, WireFormatError, compress, decode_decision, decode_state,
+    encode_decision, encode_state
+)
+from policy_engine import ACTIONS, ENEMY_STATES
+
+FRONTEND = os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'wire_format.js')
+
+
+def js_table(name):
+    with open(FRONTEND, encoding='utf-8') as f:
+        source = f.read()
+    body = re.search(rf"{name}: \[(.*?)\]", source, re.S).group(1)
+    return tuple(re.findall(r"'([^']*)'", body))
+
+
+def state(**overrides):
+    data = {
+        "agent": {"health": 72, "energy": 40, "onGround": True},
+        "enemy": {"type": ENEMY_TYPES[1], "health": 55, "distance": 33, "state": "attacking"},
+        "environment": {"zone": ZONES[2]},
+        "user_prompt": "stay patient, punish the lunge",
+        "memory": ["dodge the tail sweep", {"memory": "block after the roar", "enemy": ENEMY_TYPES[1]}],
+        "mode": "action"
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.mark.parametrize('name, table', [
+    ('ENEMY_TYPES', ENEMY_TYPES), ('ZONES', ZONES), ('ACTIONS', ACTIONS),
+    ('ENEMY_STATES', ENEMY_STATES), ('CONDITION_KEYS', CONDITION_KEYS)
+])
+def test_frontend_tables_match(name, table):
+    assert js_table(name) == tuple(table)
+
+
+def test_version_1_condition_codes_are_stable():
+    assert CONDITION_KEYS[:10] == (
+        'health_gt', 'health_lt', 'energy_gt', 'energy_lt', 'distance_gt', 'distance_lt',
+        'enemy_health_gt', 'enemy_health_lt', 'enemy_state_in', 'enemy_state_not'
+    )
+
+
+def test_state_round_trip():
+    decoded = decode_state(encode_state(state(deadline_ms=900)))
+    assert decoded == {
+        "agent": {"health": 72, "energy": 40, "onGround": True},
+        "enemy": {"type": ENEMY_TYPES[1], "health": 55, "distance": 33, "state": "attacking"},
+        "environment": {"zone": ZONES[2]},
+        "user_prompt": "stay patient, punish the lunge",
+        "mode": "action",
+        "memory": ["dodge the tail sweep", "block after the roar"],
+        "deadline_ms": 900
+    }
+
+
+def test_state_without_deadline_or_with_plan_mode():
+    decoded = decode_state(encode_state(state(mode='plan')))
+    assert decoded['mode'] == 'plan'
+    assert 'deadline_ms' not in decoded
+
+
+def test_values_outside_the_code_tables_travel_as_strings():
+    data = state(enemy={"type": "Training Dummy", "state": "stunned"}, environment={"zone": "arena"})
+    decoded = decode_state(encode_state(data))
+    assert decoded['enemy']['type'] == "Training Dummy"
+    assert decoded['enemy']['state'] == "stunned"
+    assert decoded['environment'] == {"zone": "arena"}
+
+
+def test_state_encoding_is_lossy_as_documented():
+    data = state(
+        agent={"health": 71.6, "energy": 900, "onGround": False, "x": 12},
+        enemy={"type": ENEMY_TYPES[0], "health": -5, "distance": 70000, "state": "idle"},
+        environment={"zone": ZONES[0], "runes": ["fire"], "hazards": 3},
+        memory=[str(i) for i in range(300)],
+        extra="dropped"
+    )
+    decoded = decode_state(encode_state(data))
+    assert decoded['agent'] == {"health": 72, "energy": 255, "onGround": False}
+    assert decoded['enemy']['health'] == 0
+    assert decoded['enemy']['distance'] == 0xFFFF
+    assert decoded['environment'] == {"zone": ZONES[0]}
+    assert decoded['memory'] == [str(i) for i in range(45, 300)]
+    assert 'extra' not in decoded
+
+
+def test_long_strings_are_clamped_at_a_character_boundary():
+    prompt = 'a' + 'é' * 40000  # 80001 bytes, the 0xFFFF cut falls inside a character
+    decoded = decode_state(encode_state(state(user_prompt=prompt)))
+    assert len(decoded['user_prompt'].encode('utf-8')) == 0xFFFF
+    assert prompt.startswith(decoded['user_prompt'])
+
+
+def test_invalid_utf8_is_a_wire_format_error():
+    payload = encode_state(state(user_prompt='hi'))
+    with pytest.raises(WireFormatError):
+        decode_state(payload.replace(b'hi', b'\xff\xfe'))
+
+
+@pytest.mark.parametrize('cut', [1, 5, 14, 20])
+def test_truncated_state_is_a_wire_format_error(cut):
+    payload = encode_state(state())
+    with pytest.raises(WireFormatError):
+        decode_state(payload[:cut])
+
+
+def test_other_versions_are_rejected():
+    payload = bytearray(encode_state(state()))
+    payload[0] = wire_format.VERSION + 1
+    with pytest.raises(WireFormatError):
+        decode_state(bytes(payload))
+
+
+def test_decision_round_trip():
+    decision = {"action": "DODGE", "reasoning": "evade the lunge", "confidence": 0.874}
+    assert decode_decision(encode_decision(decision)) == {
+        "action": "DODGE", "reasoning": "evade the lunge", "confidence": 0.87
+    }
+
+
+def test_decision_without_confidence_or_with_unknown_action():
+    decoded = decode_decision(encode_decision({"action": "TAUNT", "reasoning": "", "other": 1}))
+    assert decoded == {"action": "TAUNT", "reasoning": ""}
+
+
+def test_plan_round_trip_with_every_condition_kind():
+    plan = {
+        "action": "ATTACK",
+        "reasoning": "press",
+        "confidence": 0.9,
+        "valid_for_ms": 2400,
+        "plan": [
+            {"action": "ATTACK", "reasoning": "in range", "while": {
+                "health_gt": 40, "distance_ge": 25, "distance_le": 25, "enemy_health_lt": 30.5,
+                "enemy_state_in": ["idle", "circling"], "enemy_state_not": ["attacking", "unknown"],
+                "bogus_key": 1
+            }},
+            {"action": "RETREAT", "reasoning": "reset", "while": {}}
+        ]
+    }
+    decoded = decode_decision(encode_decision(plan))
+    assert decoded['valid_for_ms'] == 2400
+    assert decoded['plan'] == [
+        {"action": "ATTACK", "reasoning": "in range", "while": {
+            "health_gt": 40.0, "distance_ge": 25.0, "distance_le": 25.0, "enemy_health_lt": 30.5,
+            "enemy_state_in": ["idle", "circling"], "enemy_state_not": ["attacking"]
+        }},
+        {"action": "RETREAT", "reasoning": "reset", "while": {}}
+    ]
+
+
+def test_truncated_decision_is_a_wire_format_error():
+    payload = encode_decision({"action": "ATTACK", "reasoning": "x" * 20, "confidence": 0.5})
+    with pytest.raises(WireFormatError):
+        decode_decision(payload[:-3])
+
+
+def test_gzip_compression_round_trips():
+    body = b'{"decisions": []}' * 200
+    assert gzip.decompress(compress(body, 'gzip')) == body
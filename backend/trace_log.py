@@ -0,0 +1,240 @@
+"""
+Opt-in decision trace recorder (TRACE_DIR).
+
+Each traced AgentBrain call (decide, plan, stream, reflect) becomes one
+record: the request, the prompt contents sent to the model, the raw model
+text, the served decision, its source and per-stage timings. Records are
+zlib-compressed JSON behind a small binary frame, appended to one file per
+worker process by a writer thread; files rotate at TRACE_MAX_MB and the
+oldest are deleted beyond TRACE_MAX_FILES. replay.py reads them back.
+"""
+import os
+import json
+import glob
+import time
+import zlib
+import queue
+import struct
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from metrics import DECIDE_STAGE_SECONDS, DECISIONS
+
+MAGIC = b'HZTR'
+VERSION = 1
+KINDS = ('decide', 'plan', 'stream', 'reflect')
+
+_FILE_HEADER = struct.Struct('<4sB')
+_FRAME = struct.Struct('<IB')  # compressed payload length, kind code
+
+# The trace of the call running in this thread/task, if it is being recorded
+CURRENT_TRACE = contextvars.ContextVar('current_trace', default=None)
+
+
+def annotate(**fields):
+    """Add fields to the current trace (a no-op when nothing is recorded)"""
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace.update(fields)
+
+
+def observe_stage(seconds, stage):
+    """Record a decide stage in the metrics and the current trace"""
+    DECIDE_STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace['stages'][stage] = round(seconds * 1000, 3)
+
+
+@contextmanager
+def trace_stage(stage):
+    """Time a decide stage into the metrics and the current trace"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(time.perf_counter() - started, stage)
+
+
+def count_decision(mode, source):
+    """Count a served decision and note its source on the current trace"""
+    DECISIONS.inc(mode=mode, source=source)
+    annotate(source=source)
+
+
+def traced(kind):
+    """
+    Record calls of an AgentBrain method (sync or async) when self.tracer is set
+    The method's arguments are stored as the request and its return value as the decision
+    """
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        def begin(self, args, kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            request = {name: value for name, value in bound.arguments.items() if name != 'self' and not callable(value)}
+            return {"kind": kind, "ts": round(time.time(), 3), "request": request, "stages": {}}
+
+        def finish(self, trace, result, started):
+            trace.setdefault('decision', result)
+            trace['total_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            self.tracer.write(trace)
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def wrapper(self, *args, **kwargs):
+                if self.tracer is None:
+                    return await method(self, *args, **kwargs)
+                trace, started = begin(self, args, kwargs), time.perf_counter()
+                token = CURRENT_TRACE.set(trace)
+                try:
+                    result = await method(self, *args, **kwargs)
+                finally:
+                    CURRENT_TRACE.reset(token)
+                finish(self, trace, result, started)
+                return result
+        else:
+            @functools.wraps(method)
+            def wrapper(self, *args, **kwargs):
+                if self.tracer is None:
+                    return method(self, *args, **kwargs)
+                trace, started = begin(self, args, kwargs), time.perf_counter()
+                token = CURRENT_TRACE.set(trace)
+                try:
+                    result = method(self, *args, **kwargs)
+                finally:
+                    CURRENT_TRACE.reset(token)
+                finish(self, trace, result, started)
+                return result
+        return wrapper
+    return decorate
+
+
+class TraceRecorder:
+    """
+    Appends trace records to TRACE_DIR/trace-<pid>-<start ms>.trace
+    Each worker process writes its own file (opened lazily, so forked
+    workers never share a handle), which keeps appends lock-free across
+    processes and rotation a matter of starting a new file. write() only
+    queues the record: a writer thread (one per process) encodes,
+    compresses, appends and flushes it, and records are dropped rather
+    than queued past max_pending
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, max_files=20, level=1, max_pending=1000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.level = level
+        self.max_pending = max_pending
+        self.records = 0
+        self.dropped = 0
+        self.errors = 0
+        self._file = None
+        self._pid = None
+        self._size = 0
+        self._queue = None
+        self._writer_pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, trace):
+        """Queue one record for the writer thread; recording never fails or blocks the traced call"""
+        # Work still running after the call (a late model answer) may annotate the trace
+        trace = dict(trace, stages=dict(trace.get('stages', {})))
+        with self._lock:
+            if self._writer_pid != os.getpid():
+                # Threads do not survive a fork: start this process's writer
+                self._writer_pid = os.getpid()
+                self._queue = queue.Queue(self.max_pending)
+                threading.Thread(target=self._write_loop, args=(self._queue,), name='trace-writer', daemon=True).start()
+            try:
+                self._queue.put_nowait(trace)
+            except queue.Full:
+                self.dropped += 1
+
+    def _write_loop(self, pending):
+        while True:
+            traces = [pending.get()]
+            while True:
+                try:
+                    traces.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            for trace in traces:
+                self._append(trace)
+            if self._file is None:
+                continue
+            try:
+                self._file.flush()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error flushing traces: {e}")
+
+    def _append(self, trace):
+        try:
+            payload = zlib.compress(json.dumps(trace, separators=(',', ':'), default=str).encode('utf-8'), self.level)
+            frame = _FRAME.pack(len(payload), KINDS.index(trace['kind'])) + payload
+            if self._file is None or self._pid != os.getpid() or self._size + len(frame) > self.max_bytes:
+                self._rotate()
+            self._file.write(frame)
+            self._size += len(frame)
+            self.records += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Error recording trace: {e}")
+
+    def _rotate(self):
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+        self._pid = os.getpid()
+        path = os.path.join(self.directory, f"trace-{self._pid}-{int(time.time() * 1000)}.trace")
+        self._file = open(path, 'ab')
+        self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self._size = _FILE_HEADER.size
+
+        # Keep the newest max_files across every worker's files
+        files = sorted(trace_files(self.directory), key=os.path.getmtime)
+        for stale in files[:max(len(files) - self.max_files, 0)]:
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def stats(self):
+        pending = self._queue.qsize() if self._queue is not None and self._writer_pid == os.getpid() else 0
+        return {
+            "directory": self.directory, "records": self.records, "pending": pending,
+            "dropped": self.dropped, "errors": self.errors
+        }
+
+
+def trace_files(path):
+    """Trace files under a directory (or the file itself), oldest name first"""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, '*.trace')))
+    return [path]
+
+
+def read_traces(path):
+    """Yield every record of a trace file; a torn final frame ends the file"""
+    with open(path, 'rb') as f:
+        header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            return
+        magic, version = _FILE_HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} trace file")
+        while True:
+            frame = f.read(_FRAME.size)
+            if len(frame) < _FRAME.size:
+                return
+            length, _ = _FRAME.unpack(frame)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield json.loads(zlib.decompress(payload))
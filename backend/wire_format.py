@@ -0,0 +1,295 @@
+"""
+Compact binary encoding for /api/decide, plus response compression.
+
+A decide request is a fixed struct followed by length-prefixed strings;
+enemy types, enemy states, zones and actions travel as one-byte codes
+(values missing from the code tables are sent as strings instead). The
+encoding is lossy, and only carries what the decision needs:
+
+- health, enemy health, distance and deadline_ms are rounded to whole
+  numbers and clamped to 0..65535; energy is rounded and clamped to 0..255
+- environment is reduced to its zone, so runes are dropped; so is any
+  agent field but those above and onGround, any enemy field but those
+  above plus type and state, and any other top-level field
+- memory keeps only the text of the last 255 lessons
+- decisions keep action, reasoning, confidence (whole percent, 0..1),
+  valid_for_ms (clamped to 0..65535) and plan steps; condition bounds are
+  float32, and unknown condition keys and enemy states are dropped
+
+Clients opt in per request:
+
+    Content-Type: application/x-hollowzoo-state      (binary request body)
+    Accept: application/x-hollowzoo-decision         (binary response)
+
+frontend/wire_format.js mirrors these tables; bump VERSION when they change.
+"""
+import gzip
+import struct
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+from policy_engine import ACTIONS, ENEMY_STATES
+from world_state import WorldState
+
+VERSION = 1
+STATE_MIMETYPE = 'application/x-hollowzoo-state'
+DECISION_MIMETYPE = 'application/x-hollowzoo-decision'
+
+_world = WorldState()
+ENEMY_TYPES = tuple(_world.get_enemy_types())
+ZONES = tuple(_world.biomes)
+CONDITION_KEYS = tuple(
+    f"{field}_{op}" for field in ("health", "energy", "distance", "enemy_health") for op in ("gt", "lt")
+) + ("enemy_state_in", "enemy_state_not") + tuple(
+    f"{field}_{op}" for field in ("health", "energy", "distance", "enemy_health") for op in ("ge", "le")
+)  # inclusive bounds come last so the version 1 codes stay put
+UNKNOWN = 255  # code for a value sent as a string
+
+# version, flags, agent health, agent energy, enemy health, enemy distance,
+# enemy type, enemy state, zone, deadline ms; then strings for unknown codes,
+# the prompt and memory
+_STATE = struct.Struct('<BBHBHHBBBH')
+STATE_PLAN = 0x01
+STATE_ON_GROUND = 0x02
+STATE_DEADLINE = 0x04
+
+# version, flags, action, confidence percent (255 = none); then strings,
+# and for plans valid_for_ms plus the steps
+_DECISION = struct.Struct('<BBBB')
+DECISION_PLAN = 0x01
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+class WireFormatError(ValueError):
+    """A binary payload that cannot be decoded"""
+
+
+def _code(table, value):
+    try:
+        return table.index(value)
+    except ValueError:
+        return UNKNOWN
+
+
+def _clamp(value, high):
+    try:
+        return max(0, min(high, int(round(float(value)))))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def string(self, value):
+        data = str(value).encode('utf-8')
+        if len(data) > 0xFFFF:
+            # Cut at a character boundary so the string still decodes
+            data = data[:0xFFFF].decode('utf-8', 'ignore').encode('utf-8')
+        self.parts.append(struct.pack('<H', len(data)))
+        self.parts.append(data)
+
+    def enum(self, table, value):
+        """Write a code; unknown values also need a string() later"""
+        code = _code(table, value)
+        self.parts.append(bytes((code,)))
+        return code
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, layout):
+        try:
+            values = layout.unpack_from(self.data, self.offset)
+        except struct.error as e:
+            raise WireFormatError(f"Truncated payload: {e}")
+        self.offset += layout.size
+        return values
+
+    def byte(self):
+        return self.unpack(_BYTE)[0]
+
+    def string(self):
+        (length,) = self.unpack(_LENGTH)
+        data = self.data[self.offset:self.offset + length]
+        if len(data) != length:
+            raise WireFormatError("Truncated string")
+        self.offset += length
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise WireFormatError(f"Invalid UTF-8 string: {e}")
+
+    def enum(self, table, code):
+        return self.string() if code == UNKNOWN else _lookup(table, code)
+
+
+_BYTE = struct.Struct('<B')
+_LENGTH = struct.Struct('<H')
+_VALID_FOR = struct.Struct('<H')
+_NUMBER = struct.Struct('<f')
+
+
+def _lookup(table, code):
+    if code >= len(table):
+        raise WireFormatError(f"Unknown code {code}")
+    return table[code]
+
+
+def encode_state(data):
+    """Encode a decide request body (the JSON shape) as bytes"""
+    agent = data.get('agent') or {}
+    enemy = data.get('enemy') or {}
+    environment = data.get('environment') or {}
+    deadline_ms = data.get('deadline_ms')
+
+    flags = (STATE_PLAN if data.get('mode') == 'plan' else 0) \
+        | (STATE_ON_GROUND if agent.get('onGround') else 0) \
+        | (STATE_DEADLINE if deadline_ms is not None else 0)
+    enemy_type = enemy.get('type', 'Unknown')
+    enemy_state = enemy.get('state', 'idle')
+    zone = environment.get('zone', 'arena')
+
+    head = _STATE.pack(
+        VERSION, flags,
+        _clamp(agent.get('health', 100), 0xFFFF), _clamp(agent.get('energy', 100), 0xFF),
+        _clamp(enemy.get('health', 100), 0xFFFF), _clamp(enemy.get('distance', 100), 0xFFFF),
+        _code(ENEMY_TYPES, enemy_type), _code(ENEMY_STATES, enemy_state), _code(ZONES, zone),
+        _clamp(deadline_ms or 0, 0xFFFF)
+    )
+
+    tail = _Writer()
+    for table, value in ((ENEMY_TYPES, enemy_type), (ENEMY_STATES, enemy_state), (ZONES, zone)):
+        if _code(table, value) == UNKNOWN:
+            tail.string(value)
+    tail.string(data.get('user_prompt') or '')
+    memory = [m.get('memory', '') if isinstance(m, dict) else m for m in (data.get('memory') or [])][-255:]
+    tail.parts.append(bytes((len(memory),)))
+    for lesson in memory:
+        tail.string(lesson)
+    return head + tail.getvalue()
+
+
+def decode_state(payload):
+    """Decode a binary decide request into the same dict as its JSON body"""
+    reader = _Reader(payload)
+    (version, flags, health, energy, enemy_health, distance,
+     enemy_type, enemy_state, zone, deadline_ms) = reader.unpack(_STATE)
+    if version != VERSION:
+        raise WireFormatError(f"Unsupported wire format version {version} (expected {VERSION})")
+
+    data = {
+        "agent": {"health": health, "energy": energy, "onGround": bool(flags & STATE_ON_GROUND)},
+        "enemy": {
+            "type": reader.enum(ENEMY_TYPES, enemy_type),
+            "health": enemy_health,
+            "distance": distance,
+            "state": reader.enum(ENEMY_STATES, enemy_state)
+        },
+        "environment": {"zone": reader.enum(ZONES, zone)},
+        "user_prompt": reader.string(),
+        "mode": 'plan' if flags & STATE_PLAN else 'action'
+    }
+    data["memory"] = [reader.string() for _ in range(reader.byte())]
+    if flags & STATE_DEADLINE:
+        data["deadline_ms"] = deadline_ms
+    return data
+
+
+def encode_decision(decision):
+    """Encode a decision (or plan) as bytes; fields other than the schema's are dropped"""
+    plan = decision.get('plan')
+    confidence = decision.get('confidence')
+    confidence = UNKNOWN if not isinstance(confidence, (int, float)) else _clamp(confidence * 100, 100)
+
+    out = _Writer()
+    out.parts.append(struct.pack('<BB', VERSION, DECISION_PLAN if plan else 0))
+    action = decision.get('action', '')
+    code = out.enum(ACTIONS, action)
+    out.parts.append(bytes((confidence,)))
+    if code == UNKNOWN:
+        out.string(action)
+    out.string(decision.get('reasoning', ''))
+
+    if plan:
+        out.parts.append(_VALID_FOR.pack(_clamp(decision.get('valid_for_ms', 0), 0xFFFF)))
+        out.parts.append(bytes((len(plan),)))
+        for step in plan:
+            step_action = step.get('action', '')
+            if out.enum(ACTIONS, step_action) == UNKNOWN:
+                out.string(step_action)
+            out.string(step.get('reasoning', ''))
+
+            conditions = [(key, value) for key, value in (step.get('while') or {}).items() if key in CONDITION_KEYS]
+            out.parts.append(bytes((len(conditions),)))
+            for key, value in conditions:
+                out.parts.append(bytes((CONDITION_KEYS.index(key),)))
+                if key.startswith('enemy_state_'):
+                    mask = 0
+                    for state in value:
+                        if state in ENEMY_STATES:
+                            mask |= 1 << ENEMY_STATES.index(state)
+                    out.parts.append(bytes((mask,)))
+                else:
+                    out.parts.append(_NUMBER.pack(value))
+    return out.getvalue()
+
+
+def decode_decision(payload):
+    """Decode a binary decision back into its dict"""
+    reader = _Reader(payload)
+    (version, flags, action, confidence) = reader.unpack(_DECISION)
+    if version != VERSION:
+        raise WireFormatError(f"Unsupported wire format version {version} (expected {VERSION})")
+
+    decision = {"action": reader.enum(ACTIONS, action)}
+    decision["reasoning"] = reader.string()
+    if confidence != UNKNOWN:
+        decision["confidence"] = confidence / 100.0
+
+    if flags & DECISION_PLAN:
+        decision["valid_for_ms"] = reader.unpack(_VALID_FOR)[0]
+        steps = []
+        for _ in range(reader.byte()):
+            step = {"action": reader.enum(ACTIONS, reader.byte())}
+            step["reasoning"] = reader.string()
+            conditions = {}
+            for _ in range(reader.byte()):
+                key = _lookup(CONDITION_KEYS, reader.byte())
+                if key.startswith('enemy_state_'):
+                    mask = reader.byte()
+                    conditions[key] = [state for index, state in enumerate(ENEMY_STATES) if mask & (1 << index)]
+                else:
+                    conditions[key] = round(reader.unpack(_NUMBER)[0], 3)
+            step["while"] = conditions
+            steps.append(step)
+        decision["plan"] = steps
+    return decision
+
+
+def pick_encoding(accept_encoding):
+    """Best content coding we can produce for an Accept-Encoding header, or None"""
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    """Compress a response body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
@@ -1,11 +1,60 @@
+import bisect
+import hashlib
+import json
+
+# World data only changes with a deploy; clients revalidate with the ETag after this
+CACHE_MAX_AGE = 300
+
+
+class CachedResponse:
+    """JSON body serialized once, with its strong ETag and cache headers"""
+
+    __slots__ = ('body', 'etag', 'headers', 'encoded')
+
+    def __init__(self, payload, max_age=CACHE_MAX_AGE):
+        self.body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+        self.headers = {
+            "ETag": f'"{self.etag}"',
+            "Cache-Control": f"public, max-age={max_age}"
+        }
+        self.encoded = {}  # content coding -> (compressed body, headers), filled on first use
+
+
 class WorldState:
     """
     Manages the game world: biomes, enemies, and environmental data
+    Lookups go through indexes built at startup, and API responses are
+    serialized once and served as bytes with an ETag
     """
 
     def __init__(self):
         self.biomes = self._initialize_biomes()
         self.enemy_types = self._initialize_enemies()
+        self._build_indexes()
+        self._build_responses()
+
+    def _build_indexes(self):
+        """Reverse (enemy -> biomes) and sorted secondary indexes over the static data"""
+        self.enemy_biomes = {name: [] for name in self.enemy_types}
+        for biome_name, biome in self.biomes.items():
+            for enemy in biome.get('enemies', []):
+                self.enemy_biomes.setdefault(enemy, []).append(biome_name)
+
+        # (sorted values, names in the same order) per numeric stat
+        self._stat_indexes = {}
+        for stat in ('aggression', 'health', 'intelligence'):
+            ranked = sorted((info[stat], name) for name, info in self.enemy_types.items())
+            self._stat_indexes[stat] = ([value for value, _ in ranked], [name for _, name in ranked])
+
+    def _build_responses(self):
+        """Serialize every biome and the common enemy listings up front"""
+        self._biome_responses = {name: CachedResponse(biome) for name, biome in self.biomes.items()}
+        self._unknown_biome_response = CachedResponse(self.get_biome(None))
+        self._enemy_responses = {}
+        self.enemies_response()
+        for biome_name in self.biomes:
+            self.enemies_response(biome=biome_name)
 
     def _initialize_biomes(self):
         """Define all zoo biomes"""
@@ -147,6 +196,49 @@ class WorldState:
             "intelligence": 50
         })
 
+    def get_enemy_biome(self, enemy_type):
+        """Get the name of the biome an enemy appears in (None if unknown)"""
+        biomes = self.enemy_biomes.get(enemy_type)
+        return biomes[0] if biomes else None
+
+    def find_enemies(self, biome=None, **ranges):
+        """
+        Names of enemies in a biome and/or within stat ranges, in definition order
+        ranges are min_<stat>/max_<stat> keywords for aggression, health and intelligence
+        """
+        names = None
+        if biome is not None:
+            names = set(self.get_biome(biome).get('enemies', []))
+
+        for stat, (values, ranked) in self._stat_indexes.items():
+            low, high = ranges.get(f'min_{stat}'), ranges.get(f'max_{stat}')
+            if low is None and high is None:
+                continue
+            start = bisect.bisect_left(values, low) if low is not None else 0
+            end = bisect.bisect_right(values, high) if high is not None else len(values)
+            matched = set(ranked[start:end])
+            names = matched if names is None else names & matched
+
+        if names is None:
+            return tuple(self.enemy_types)
+        return tuple(name for name in self.enemy_types if name in names)
+
+    def biome_response(self, biome_name):
+        """Pre-serialized /api/world/biome response"""
+        return self._biome_responses.get(biome_name, self._unknown_biome_response)
+
+    def enemies_response(self, biome=None, **ranges):
+        """
+        Pre-serialized /api/world/enemies response for a filter
+        Each distinct result set is serialized once and reused
+        """
+        names = self.find_enemies(biome, **ranges)
+        response = self._enemy_responses.get(names)
+        if response is None:
+            response = CachedResponse({"enemies": {name: self.enemy_types[name] for name in names}})
+            self._enemy_responses[names] = response
+        return response
+
     def get_biome_enemies(self, biome_name):
         """Get enemies that appear in a specific biome"""
         biome = self.get_biome(biome_name)
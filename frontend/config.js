@@ -3,6 +3,11 @@ const GameConfig = {
     // API Configuration
     API_BASE_URL: 'http://localhost:5000/api',
     USE_FAKE_AI: true,  // Hollow Knight-style overhaul defaults to the diegetic simulator
+    USE_DECISION_CHANNEL: true,  // Stream decisions over a WebSocket instead of one POST per tick
+    CHANNEL_TIMEOUT: 2000,
+    USE_ACTION_PLANS: true,  // Ask for multi-step plans and only re-query when one breaks
+    USE_STREAMING_DECISIONS: true,  // Without plans: act on the streamed action, show reasoning when it arrives
+    USE_BINARY_WIRE: true,  // Plain POST /decide sends the compact binary state (see wire_format.js)
 
     // Game Settings
     WIDTH: 1180,
@@ -299,17 +304,324 @@ const SimulatedAI = {
     }
 };
 
+// Persistent WebSocket decision channel: state frames up, tick-tagged decisions down
+const DecisionChannel = {
+    socket: null,
+    tick: 0,
+    pending: new Map(),
+
+    connect() {
+        if (this.socket || typeof WebSocket === 'undefined') return;
+
+        const socket = new WebSocket(
+            `${GameConfig.API_BASE_URL.replace(/^http/, 'ws')}/ws/decide?player=${encodeURIComponent(API.playerId())}`
+        );
+        socket.onmessage = event => this.handleMessage(event);
+        socket.onerror = () => socket.close();
+        socket.onclose = () => {
+            this.socket = null;
+            this.pending.forEach(entry => entry.resolve(null));
+            this.pending.clear();
+        };
+        this.socket = socket;
+    },
+
+    isOpen() {
+        return Boolean(this.socket) && this.socket.readyState === WebSocket.OPEN;
+    },
+
+    handleMessage(event) {
+        const message = JSON.parse(event.data);
+
+        // The server drops older ticks once a newer one is answered
+        this.pending.forEach((entry, tick) => {
+            if (tick < message.tick) {
+                entry.resolve(null);
+                this.pending.delete(tick);
+            }
+        });
+
+        const entry = this.pending.get(message.tick);
+        if (!entry) return;
+        this.pending.delete(message.tick);
+        entry.resolve(message.error ? { error: message.error } : message.decision);
+    },
+
+    request(frame, timeoutMs) {
+        const tick = ++this.tick;
+        return new Promise(resolve => {
+            const timer = setTimeout(() => {
+                this.pending.delete(tick);
+                resolve(null);
+            }, timeoutMs);
+            this.pending.set(tick, {
+                resolve: value => {
+                    clearTimeout(timer);
+                    resolve(value);
+                }
+            });
+            this.socket.send(JSON.stringify({ ...frame, tick }));
+        });
+    }
+};
+
+// Multi-step action plans: follow the current step until its preconditions break or the plan expires
+const ActionPlan = {
+    from(response, now) {
+        if (!response || !Array.isArray(response.plan) || response.plan.length === 0) return null;
+        return {
+            steps: response.plan,
+            index: 0,
+            confidence: response.confidence,
+            expiresAt: now + (response.valid_for_ms || 0)
+        };
+    },
+
+    holds(conditions = {}, agentState, enemyState) {
+        const values = {
+            health: agentState.health,
+            energy: agentState.energy,
+            distance: enemyState.distance,
+            enemy_health: enemyState.health
+        };
+        return Object.entries(conditions).every(([key, bound]) => {
+            if (key === 'enemy_state_in') return bound.includes(enemyState.state);
+            if (key === 'enemy_state_not') return !bound.includes(enemyState.state);
+
+            const value = values[key.slice(0, -3)];
+            if (typeof value !== 'number') return false;
+            switch (key.slice(-3)) {
+                case '_gt': return value > bound;
+                case '_lt': return value < bound;
+                case '_ge': return value >= bound;
+                case '_le': return value <= bound;
+                default: return false;
+            }
+        });
+    },
+
+    nextStep(plan, agentState, enemyState, now) {
+        if (!plan || now > plan.expiresAt) return null;
+
+        // A step repeats while it holds, then the next step that holds takes over
+        while (plan.index < plan.steps.length) {
+            const step = plan.steps[plan.index];
+            if (this.holds(step.while, agentState, enemyState)) {
+                return { action: step.action, reasoning: step.reasoning, confidence: plan.confidence };
+            }
+            plan.index++;
+        }
+        return null;
+    }
+};
+
 // API Helper Functions
 const API = {
-    async decide(agentState, enemyState, environment, userPrompt, memory) {
+    // Server-side battle session: prompt and memory are sent once, ticks send deltas
+    session: null,
+
+    // Lessons are kept per player; this browser's id persists across visits
+    playerId() {
+        let id = localStorage.getItem('hollowzoo_player_id');
+        if (!id) {
+            id = crypto.randomUUID();
+            localStorage.setItem('hollowzoo_player_id', id);
+        }
+        return id;
+    },
+
+    headers() {
+        return { 'Content-Type': 'application/json', 'X-Player-Id': this.playerId() };
+    },
+
+    async openSession(enemyType, environment, userPrompt, memory) {
+        if (GameConfig.USE_FAKE_AI) return null;
+
+        try {
+            const response = await fetch(`${GameConfig.API_BASE_URL}/session`, {
+                method: 'POST',
+                headers: this.headers(),
+                body: JSON.stringify({
+                    enemy_type: enemyType,
+                    environment: environment,
+                    user_prompt: userPrompt,
+                    memory: memory
+                })
+            });
+            const data = await response.json();
+            this.session = {
+                id: data.session_id,
+                enemyType,
+                userPrompt,
+                memory,
+                last: { agent: {}, enemy: {}, environment: {} }
+            };
+            return this.session;
+        } catch (error) {
+            console.error('API Error:', error);
+            this.session = null;
+            return null;
+        }
+    },
+
+    async closeSession() {
+        const session = this.session;
+        this.session = null;
+        if (!session) return;
+
+        try {
+            await fetch(`${GameConfig.API_BASE_URL}/session/${session.id}`, { method: 'DELETE' });
+        } catch (error) {
+            console.error('API Error:', error);
+        }
+    },
+
+    changedFields(previous, next) {
+        const delta = {};
+        Object.keys(next || {}).forEach(key => {
+            const value = next[key];
+            const changed = (value !== null && typeof value === 'object')
+                ? JSON.stringify(value) !== JSON.stringify(previous[key])
+                : value !== previous[key];
+            if (changed) {
+                delta[key] = value;
+            }
+        });
+        return delta;
+    },
+
+    async decideInSession(agentState, enemyState, environment, mode = 'action') {
+        const session = this.session;
+        const response = await fetch(`${GameConfig.API_BASE_URL}/session/${session.id}/decide`, {
+            method: 'POST',
+            headers: this.headers(),
+            body: JSON.stringify({
+                agent: this.changedFields(session.last.agent, agentState),
+                enemy: this.changedFields(session.last.enemy, enemyState),
+                environment: this.changedFields(session.last.environment, environment),
+                mode
+            })
+        });
+
+        if (response.status === 404) {
+            // Session expired server-side: reopen it and send the full state this tick
+            await this.openSession(session.enemyType, environment, session.userPrompt, session.memory);
+            throw new Error('Battle session expired');
+        }
+
+        session.last = {
+            agent: { ...agentState },
+            enemy: { ...enemyState },
+            environment: { ...environment }
+        };
+        return await response.json();
+    },
+
+    async decideOverChannel(agentState, enemyState, environment, userPrompt, memory, mode = 'action') {
+        const session = this.session;
+        const frame = session
+            ? {
+                session_id: session.id,
+                agent: this.changedFields(session.last.agent, agentState),
+                enemy: this.changedFields(session.last.enemy, enemyState),
+                environment: this.changedFields(session.last.environment, environment),
+                mode
+            }
+            : { agent: agentState, enemy: enemyState, environment, user_prompt: userPrompt, memory, mode };
+
+        if (session) {
+            // The server applies the delta as soon as the frame arrives
+            session.last = {
+                agent: { ...agentState },
+                enemy: { ...enemyState },
+                environment: { ...environment }
+            };
+        }
+
+        const decision = await DecisionChannel.request(frame, GameConfig.CHANNEL_TIMEOUT);
+        if (decision && decision.error && session) {
+            await this.openSession(session.enemyType, environment, session.userPrompt, session.memory);
+        }
+        return decision;
+    },
+
+    async decide(agentState, enemyState, environment, userPrompt, memory, mode = 'action') {
         if (GameConfig.USE_FAKE_AI) {
             return SimulatedAI.decide(agentState, enemyState, environment, userPrompt, memory);
         }
 
+        if (GameConfig.USE_DECISION_CHANNEL && DecisionChannel.isOpen()) {
+            const decision = await this.decideOverChannel(agentState, enemyState, environment, userPrompt, memory, mode);
+            if (decision === null) {
+                // Timed out or superseded: act locally rather than wait again
+                return SimulatedAI.decide(agentState, enemyState, environment, userPrompt, memory);
+            }
+            if (!decision.error) {
+                return decision;
+            }
+        }
+
+        if (this.session) {
+            try {
+                return await this.decideInSession(agentState, enemyState, environment, mode);
+            } catch (error) {
+                console.warn('Session decide failed, sending full state:', error);
+            }
+        }
+
+        const state = {
+            agent: agentState,
+            enemy: enemyState,
+            environment: environment,
+            user_prompt: userPrompt,
+            memory: memory,
+            mode: mode
+        };
+
         try {
+            if (GameConfig.USE_BINARY_WIRE) {
+                const response = await fetch(`${GameConfig.API_BASE_URL}/decide`, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': WireFormat.STATE_MIMETYPE,
+                        'Accept': WireFormat.DECISION_MIMETYPE,
+                        'X-Player-Id': this.playerId()
+                    },
+                    body: WireFormat.encodeState(state)
+                });
+                if (response.headers.get('Content-Type') === WireFormat.DECISION_MIMETYPE) {
+                    return WireFormat.decodeDecision(await response.arrayBuffer());
+                }
+                if (response.status !== 415) {
+                    return await response.json();
+                }
+                // Server without the binary format: stay on JSON from now on
+                GameConfig.USE_BINARY_WIRE = false;
+            }
+
             const response = await fetch(`${GameConfig.API_BASE_URL}/decide`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: this.headers(),
+                body: JSON.stringify(state)
+            });
+            return await response.json();
+        } catch (error) {
+            console.error('API Error:', error);
+            return SimulatedAI.decide(agentState, enemyState, environment, userPrompt, memory);
+        }
+    },
+
+    // Streamed decision: resolves with the action as soon as the server has it;
+    // onDecision(decision) receives the full decision with reasoning afterwards
+    async decideStream(agentState, enemyState, environment, userPrompt, memory, onDecision) {
+        if (GameConfig.USE_FAKE_AI) {
+            return SimulatedAI.decide(agentState, enemyState, environment, userPrompt, memory);
+        }
+
+        try {
+            const response = await fetch(`${GameConfig.API_BASE_URL}/decide/stream`, {
+                method: 'POST',
+                headers: this.headers(),
                 body: JSON.stringify({
                     agent: agentState,
                     enemy: enemyState,
@@ -318,7 +630,41 @@ const API = {
                     memory: memory
                 })
             });
-            return await response.json();
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let action = null;
+
+            const readRest = async () => {
+                while (true) {
+                    const newline = buffer.indexOf('\n');
+                    if (newline >= 0) {
+                        const event = JSON.parse(buffer.slice(0, newline));
+                        buffer = buffer.slice(newline + 1);
+                        if (event.event === 'action' && !action) {
+                            action = event;
+                            return { action: event.action, reasoning: '…', confidence: null };
+                        }
+                        if (event.event === 'decision') {
+                            if (onDecision) onDecision(event);
+                            return event;
+                        }
+                        continue;
+                    }
+                    const { value, done } = await reader.read();
+                    if (done) return null;
+                    buffer += decoder.decode(value, { stream: true });
+                }
+            };
+
+            const first = await readRest();
+            if (!first) throw new Error('Decision stream ended early');
+            if (action) {
+                // Keep reading for the reasoning without holding up the action
+                readRest().catch(error => console.error('API Error:', error));
+            }
+            return first;
         } catch (error) {
             console.error('API Error:', error);
             return SimulatedAI.decide(agentState, enemyState, environment, userPrompt, memory);
@@ -333,13 +679,26 @@ const API = {
         try {
             const response = await fetch(`${GameConfig.API_BASE_URL}/reflect`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: this.headers(),
                 body: JSON.stringify({
                     battle_data: battleData,
                     outcome: outcome
                 })
             });
-            return await response.json();
+            const { job_id: jobId } = await response.json();
+
+            // The reflection runs in the background; long-poll until it is done
+            for (let attempt = 0; attempt < 4; attempt++) {
+                const poll = await fetch(`${GameConfig.API_BASE_URL}/reflect/${jobId}?wait=15`);
+                const job = await poll.json();
+                if (job.status === 'done') {
+                    return job.reflection;
+                }
+                if (poll.status !== 202) {
+                    break;
+                }
+            }
+            return SimulatedAI.reflect(battleData, outcome);
         } catch (error) {
             console.error('API Error:', error);
             return SimulatedAI.reflect(battleData, outcome);
@@ -352,7 +711,7 @@ const API = {
         }
 
         try {
-            const response = await fetch(`${GameConfig.API_BASE_URL}/memory`);
+            const response = await fetch(`${GameConfig.API_BASE_URL}/memory`, { headers: this.headers() });
             const data = await response.json();
             return data.memory || [];
         } catch (error) {
@@ -367,7 +726,7 @@ const API = {
         try {
             await fetch(`${GameConfig.API_BASE_URL}/memory`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: this.headers(),
                 body: JSON.stringify({ memory: memory })
             });
         } catch (error) {
@@ -253,6 +253,19 @@ class ZooScene extends Phaser.Scene {
     setupAI() {
         this.aiDecisionInterval = (this.levelData.modifiers?.aiInterval) || GameConfig.AI_DECISION_INTERVAL;
         this.lastDecision = null;
+        this.activePlan = null;
+
+        if (!GameConfig.USE_FAKE_AI && GameConfig.USE_DECISION_CHANNEL) {
+            DecisionChannel.connect();
+        }
+
+        // Send prompt and memory once; decision ticks then only carry state deltas
+        API.openSession(
+            this.enemy.enemyType,
+            { zone: GameState.currentBiome, lighting: 'dim', hazards: 'dynamic', runes: { ...GameState.coaching } },
+            GameState.missionPrompt,
+            GameState.memory.slice(-5).map(m => m.memory || m)
+        );
         this.scheduleNextDecision();
     }
 
@@ -331,14 +344,38 @@ class ZooScene extends Phaser.Scene {
         // Get recent memories (last 5)
         const recentMemories = GameState.memory.slice(-5).map(m => m.memory || m);
 
-        // Request AI decision with user's tactical prompt
-        const decision = await API.decide(
-            agentState,
-            enemyState,
-            environment,
-            GameState.missionPrompt,  // Send user prompt instead of coaching sliders
-            recentMemories
-        );
+        // Keep following the current plan while its preconditions hold
+        let decision = ActionPlan.nextStep(this.activePlan, agentState, enemyState, Date.now());
+
+        if (!decision && !GameConfig.USE_ACTION_PLANS && GameConfig.USE_STREAMING_DECISIONS) {
+            // Act on the streamed action; the reasoning replaces the thought when it arrives
+            decision = await API.decideStream(
+                agentState,
+                enemyState,
+                environment,
+                GameState.missionPrompt,
+                recentMemories,
+                (full) => {
+                    if (!this.battleEnded && this.lastDecision && this.lastDecision.action === full.action) {
+                        this.thoughtPanel.showThought(full);
+                    }
+                }
+            );
+        }
+
+        if (!decision) {
+            // Request AI decision (or a fresh plan) with user's tactical prompt
+            const response = await API.decide(
+                agentState,
+                enemyState,
+                environment,
+                GameState.missionPrompt,  // Send user prompt instead of coaching sliders
+                recentMemories,
+                GameConfig.USE_ACTION_PLANS ? 'plan' : 'action'
+            );
+            this.activePlan = ActionPlan.from(response, Date.now());
+            decision = ActionPlan.nextStep(this.activePlan, agentState, enemyState, Date.now()) || response;
+        }
 
         this.lastDecision = decision;
 
@@ -403,12 +440,14 @@ class ZooScene extends Phaser.Scene {
         if (this.aiDecisionTimer) {
             this.aiDecisionTimer.remove();
         }
+        API.closeSession();
 
         // Calculate battle stats
         const battleDuration = Date.now() - this.battleStartTime;
 
         const battleData = {
             enemy_type: this.enemy.enemyType,
+            biome: GameState.currentBiome,
             duration: battleDuration,
             damageTaken: this.damageTaken,
             damageDealt: this.damageDealt,
@@ -416,17 +455,16 @@ class ZooScene extends Phaser.Scene {
             level: this.levelData.id
         };
 
-        // Get AI reflection (for memory)
-        const reflection = await API.reflect(battleData, outcome);
-
-        // Add to memory
-        if (reflection.lesson) {
-            GameState.memory.push({
-                timestamp: new Date().toISOString(),
-                memory: reflection.lesson
-            });
-            await API.saveMemory(reflection.lesson);
-        }
+        // Get AI reflection (for memory) without holding up the result screen;
+        // the backend stores the lesson itself
+        API.reflect(battleData, outcome).then((reflection) => {
+            if (reflection && reflection.lesson) {
+                GameState.memory.push({
+                    timestamp: new Date().toISOString(),
+                    memory: reflection.lesson
+                });
+            }
+        });
 
         // Transition to Result Scene
         this.scene.start('ResultScene', {
@@ -0,0 +1,136 @@
+// Compact binary encoding for /api/decide (mirrors backend/wire_format.py)
+const WireFormat = {
+    VERSION: 1,
+    STATE_MIMETYPE: 'application/x-hollowzoo-state',
+    DECISION_MIMETYPE: 'application/x-hollowzoo-decision',
+
+    ENEMY_TYPES: ['Nyx, Owl Warden', 'Vey, Serpent Matron', 'Oran, Leviathan Seal', 'Maul, Briar Bear', 'Rex, Lion Regent'],
+    ZONES: ['LanternAviary', 'Serpentarium', 'TidePens', 'ThornSanctum', 'CrownChamber'],
+    ACTIONS: ['ATTACK', 'JUMP_ATTACK', 'DODGE', 'BLOCK', 'RETREAT', 'MOVE_CLOSER', 'MOVE_AWAY', 'WAIT_AND_OBSERVE'],
+    ENEMY_STATES: ['idle', 'moving', 'attacking', 'observing', 'circling'],
+    CONDITION_KEYS: [
+        'health_gt', 'health_lt', 'energy_gt', 'energy_lt', 'distance_gt', 'distance_lt',
+        'enemy_health_gt', 'enemy_health_lt', 'enemy_state_in', 'enemy_state_not',
+        'health_ge', 'health_le', 'energy_ge', 'energy_le', 'distance_ge', 'distance_le',
+        'enemy_health_ge', 'enemy_health_le'
+    ],
+    UNKNOWN: 255,
+
+    _clamp(value, high) {
+        const number = Math.round(Number(value));
+        return Number.isFinite(number) ? Math.max(0, Math.min(high, number)) : 0;
+    },
+
+    _code(table, value) {
+        const index = table.indexOf(value);
+        return index === -1 ? this.UNKNOWN : index;
+    },
+
+    // UTF-8 bytes of a string, cut to what a u16 length prefix can hold
+    // (at a character boundary, as backend/wire_format.py does)
+    _utf8(value) {
+        const bytes = new TextEncoder().encode(String(value));
+        if (bytes.length <= 0xFFFF) return bytes;
+        let end = 0xFFFF;
+        while ((bytes[end] & 0xC0) === 0x80) end--;
+        return bytes.subarray(0, end);
+    },
+
+    encodeState(data) {
+        const agent = data.agent || {};
+        const enemy = data.enemy || {};
+        const environment = data.environment || {};
+        const enemyType = enemy.type ?? 'Unknown';
+        const enemyState = enemy.state ?? 'idle';
+        const zone = environment.zone ?? 'arena';
+        const hasDeadline = data.deadline_ms !== undefined && data.deadline_ms !== null;
+
+        const strings = [];
+        [[this.ENEMY_TYPES, enemyType], [this.ENEMY_STATES, enemyState], [this.ZONES, zone]].forEach(([table, value]) => {
+            if (this._code(table, value) === this.UNKNOWN) {
+                strings.push(this._utf8(value));
+            }
+        });
+        strings.push(this._utf8(data.user_prompt || ''));
+        const memory = (data.memory || []).map(m => (typeof m === 'object' ? m.memory || '' : m)).slice(-255);
+        const lessons = memory.map(lesson => this._utf8(lesson));
+
+        const size = 14 + strings.concat(lessons).reduce((total, bytes) => total + 2 + bytes.length, 0) + 1;
+        const view = new DataView(new ArrayBuffer(size));
+        const flags = (data.mode === 'plan' ? 0x01 : 0) | (agent.onGround ? 0x02 : 0) | (hasDeadline ? 0x04 : 0);
+        view.setUint8(0, this.VERSION);
+        view.setUint8(1, flags);
+        view.setUint16(2, this._clamp(agent.health ?? 100, 0xFFFF), true);
+        view.setUint8(4, this._clamp(agent.energy ?? 100, 0xFF));
+        view.setUint16(5, this._clamp(enemy.health ?? 100, 0xFFFF), true);
+        view.setUint16(7, this._clamp(enemy.distance ?? 100, 0xFFFF), true);
+        view.setUint8(9, this._code(this.ENEMY_TYPES, enemyType));
+        view.setUint8(10, this._code(this.ENEMY_STATES, enemyState));
+        view.setUint8(11, this._code(this.ZONES, zone));
+        view.setUint16(12, this._clamp(data.deadline_ms || 0, 0xFFFF), true);
+
+        let offset = 14;
+        const writeString = (bytes) => {
+            view.setUint16(offset, bytes.length, true);
+            new Uint8Array(view.buffer, offset + 2, bytes.length).set(bytes);
+            offset += 2 + bytes.length;
+        };
+        strings.forEach(writeString);
+        view.setUint8(offset++, lessons.length);
+        lessons.forEach(writeString);
+        return view.buffer;
+    },
+
+    decodeDecision(buffer) {
+        const view = new DataView(buffer);
+        const decoder = new TextDecoder();
+        let offset = 0;
+        const byte = () => view.getUint8(offset++);
+        const string = () => {
+            const length = view.getUint16(offset, true);
+            const text = decoder.decode(new Uint8Array(buffer, offset + 2, length));
+            offset += 2 + length;
+            return text;
+        };
+        const action = (code) => (code === this.UNKNOWN ? string() : this.ACTIONS[code]);
+
+        const version = byte();
+        if (version !== this.VERSION) {
+            throw new Error(`Unsupported wire format version ${version}`);
+        }
+        const flags = byte();
+        const actionCode = byte();
+        const confidence = byte();
+
+        const decision = { action: action(actionCode) };
+        decision.reasoning = string();
+        if (confidence !== this.UNKNOWN) {
+            decision.confidence = confidence / 100;
+        }
+
+        if (flags & 0x01) {
+            decision.valid_for_ms = view.getUint16(offset, true);
+            offset += 2;
+            const steps = byte();
+            decision.plan = [];
+            for (let i = 0; i < steps; i++) {
+                const step = { action: action(byte()) };
+                step.reasoning = string();
+                step.while = {};
+                const conditions = byte();
+                for (let j = 0; j < conditions; j++) {
+                    const key = this.CONDITION_KEYS[byte()];
+                    if (key.startsWith('enemy_state_')) {
+                        const mask = byte();
+                        step.while[key] = this.ENEMY_STATES.filter((_, index) => mask & (1 << index));
+                    } else {
+                        step.while[key] = Math.round(view.getFloat32(offset, true) * 1000) / 1000;
+                        offset += 4;
+                    }
+                }
+                decision.plan.push(step);
+            }
+        }
+        return decision;
+    }
+};